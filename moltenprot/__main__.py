@@ -20,6 +20,9 @@
 # CLI interface
 import argparse
 
+# batch summary
+import csv
+
 # get available cpus
 from multiprocessing import cpu_count
 
@@ -30,6 +33,9 @@ import sys
 # deleting folders
 from shutil import rmtree
 
+# timing of batch processing
+from time import perf_counter
+
 from moltenprot import core
 
 
@@ -104,11 +110,26 @@ def CLIparser():
         help=core.defaults["j_h"],
     )
 
+    # process many files in parallel
+    gen_grp.add_argument(
+        "--batch",
+        action="store_true",
+        help="Process input files in parallel, one file per job (the amount of jobs is set with --n_jobs), and print a summary table",
+    )
+
     # a switch to enable "verbose" version of the script
     gen_grp.add_argument(
         "-v", "--verbose", action="store_true", help="Print additional information"
     )
 
+    # a switch to print only fatal errors (e.g. for batch runs)
+    gen_grp.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Print only fatal errors; all messages are saved to messages.csv in the result folder",
+    )
+
     # citation
     gen_grp.add_argument(
         "--citation", action="store_true", help="Print the current MoltenProt reference"
@@ -213,6 +234,15 @@ def CLIparser():
         help="XLSX input only: supply a different model for scattering analysis",
     )
 
+    # fit more models and rank them
+    ana_grp.add_argument(
+        "--compare_models",
+        nargs="+",
+        default=core.analysis_defaults["compare_models"],
+        choices=[i for i in core.avail_models.keys() if i != "skip"],
+        help=core.analysis_defaults["compare_models_h"],
+    )
+
     # pre-evaluation of the baselines
     ana_grp.add_argument(
         "--baseline_fit",
@@ -228,6 +258,56 @@ def CLIparser():
         help=core.analysis_defaults["baseline_bounds_h"],
     )
 
+    # separable least squares for the baseline parameters
+    ana_grp.add_argument(
+        "--varpro",
+        action="store_true",
+        help=core.analysis_defaults["varpro_h"],
+    )
+
+    # fit binned curves first
+    ana_grp.add_argument(
+        "--coarse",
+        type=float,
+        default=core.analysis_defaults["coarse"],
+        help=core.analysis_defaults["coarse_h"],
+    )
+
+    # starting values of the transitions from the derivative
+    ana_grp.add_argument(
+        "--peak_init",
+        action="store_true",
+        help=core.analysis_defaults["peak_init_h"],
+    )
+
+    # skip the curves without a transition
+    ana_grp.add_argument(
+        "--prescreen",
+        type=float,
+        default=core.analysis_defaults["prescreen"],
+        help=core.analysis_defaults["prescreen_h"],
+    )
+
+    # limits of the fitting time
+    ana_grp.add_argument(
+        "--max_nfev",
+        type=int,
+        default=core.analysis_defaults["max_nfev"],
+        help=core.analysis_defaults["max_nfev_h"],
+    )
+    ana_grp.add_argument(
+        "--fit_timeout",
+        type=float,
+        default=core.analysis_defaults["fit_timeout"],
+        help=core.analysis_defaults["fit_timeout_h"],
+    )
+    ana_grp.add_argument(
+        "--deadline",
+        type=float,
+        default=core.analysis_defaults["deadline"],
+        help=core.analysis_defaults["deadline_h"],
+    )
+
     # heat capacity change of unfolding for all samples (per-sample heat-capacity can be specfied in the layout)
     # NOTE this setting is overridden by the layout
     ana_grp.add_argument(
@@ -286,6 +366,14 @@ def CLIparser():
         help='For XLSX input: indicate if "raw" rather than "processed" file is provided',
     )
 
+    # fit one readout first and use its results as starting values for the others
+    xls_grp.add_argument(
+        "--lead_readout",
+        type=str,
+        default=None,
+        help="For XLSX input: analyse this readout (e.g. Ratio) first and use its fit results as starting values of the transition parameters in the other readouts; not used with the lumry_eyring model",
+    )
+
     # panta device
     xls_grp.add_argument(
         "--panta-rhei",
@@ -312,6 +400,21 @@ def CLIparser():
         help="Make a report in PDF, XLSX or HTML format",
     )
 
+    # HTML report without per-sample images
+    out_grp.add_argument(
+        "--embed_curves",
+        action="store_true",
+        help="For HTML reports: embed the curves in the report instead of creating an image for each sample",
+    )
+
+    # keep the pages of PDF reports between runs
+    out_grp.add_argument(
+        "--pdf_cache",
+        type=str,
+        default=None,
+        help="For PDF reports: a folder to keep the rendered pages between runs, only the pages with changed samples are rendered again",
+    )
+
     # argument for *.xlsx export
     out_grp.add_argument(
         "-x",
@@ -347,6 +450,25 @@ def CLIparser():
         "--hm_ref", type=str, help=argparse.SUPPRESS
     )  #'Specify the reference for heatmaps (doesn\'t work without --heatmap option)')
 
+    # timing of the analysis stages and per-well fit statistics
+    out_grp.add_argument(
+        "--trace",
+        default=None,
+        choices=["chrome", "speedscope"],
+        help="Save the timing of analysis stages and fits as a trace file (for chrome://tracing or speedscope.app) and per-well fit statistics to fit_statistics.csv",
+    )
+
+    # profiling of the analysis and output
+    out_grp.add_argument(
+        "--profile",
+        nargs="?",
+        type=int,
+        const=30,
+        default=None,
+        metavar="N",
+        help="Profile the analysis and output with cProfile (also in the worker processes); the merged profile is saved to profile.prof and the top N functions (default 30) to profile_hotspots.txt",
+    )
+
     return parser
 
 
@@ -370,6 +492,9 @@ def MoltenprotCLI(args):
     if args.verbose:
         core.showVersionInformation()
 
+    if args.quiet:
+        core.set_quiet()
+
     # check if --input option is provided and the file exists
     if args.input is None:
         # NOTE this part is only required when neither --gui nor --input are supplied, but at least one other option is supplied
@@ -385,141 +510,330 @@ def MoltenprotCLI(args):
                 )
             )
 
+    # in batch mode the files are processed in parallel
+    if args.batch:
+        sys.exit(MoltenprotBatch(args))
+
     # if something is provided, than we have to cycle through it
     for input_file in args.input:
-        print("Information: processing file {}".format(input_file))
-        # check file existence
-        if not os.path.exists(input_file):
-            # check if file exists, if not then break the loop
-            # and continue to the next file
-            print("Fatal: {} does not exist!".format(input_file))
-            continue
-
-        # generate output folder and file extension
-        resultfolder, file_ext = os.path.splitext(input_file)
-
-        # if -o is not supplied, create the output folder in the same folder as input file
-        # otherwise create a requested folder and dump all outputs there
-        if args.output is not None:
-            resultfolder = os.path.join(args.output, os.path.basename(resultfolder))
-
-        # check if the output folder exists and delete if necessary
-        if os.path.exists(resultfolder):
-            if args.force:
-                print("Information: Removing previously calculated results...")
-                try:
-                    rmtree(resultfolder)
-                except OSError:
-                    print(
-                        "Fatal: cannot remove results file, because some other program is using it"
-                    )
-                    continue
-            else:
-                print(
-                    "Fatal: cannot create result folder, because a folder with the same name already exists!"
-                )
+        ProcessFile(input_file, args, n_jobs=args.n_jobs)
+
+
+def _result_folder(input_file, args):
+    """
+    Returns the output folder for an input file: if -o is not supplied, the folder is created
+    in the same folder as input file, otherwise in the requested folder
+    """
+    resultfolder = os.path.splitext(input_file)[0]
+    if args.output is not None:
+        resultfolder = os.path.join(args.output, os.path.basename(resultfolder))
+    return resultfolder
+
+
+def _claim_result_folder(input_file, args, claimed):
+    """
+    Checks that the output folder of an input file is not used by another input file
+    (e.g. X.csv and X.xlsx), so that the results do not overwrite each other
+
+    Parameters
+    ----------
+    input_file : str
+        path to the input file
+    args : namespace
+        CLI paramater namespace
+    claimed : dict
+        result folders that are already used (result folder -> input file), updated in place
+
+    Returns
+    -------
+    True if the input file can be processed
+    """
+    resultfolder = _result_folder(input_file, args)
+    if claimed.setdefault(resultfolder, input_file) != input_file:
+        return False
+    return True
+
+
+def ProcessFile(input_file, args, n_jobs=1):
+    """
+    Read, analyse and write the results for a single input file
+
+    Parameters
+    ----------
+    input_file : str
+        path to the input file
+    args : namespace
+        CLI paramater namespace
+    n_jobs : int
+        number of parallel jobs within this file
+
+    Returns
+    -------
+    A tuple of status ("done" or "failed") and a short description
+    """
+    print("Information: processing file {}".format(input_file))
+    # check file existence
+    if not os.path.exists(input_file):
+        print("Fatal: {} does not exist!".format(input_file))
+        return "failed", "file does not exist"
+
+    # generate output folder and file extension
+    resultfolder = _result_folder(input_file, args)
+    file_ext = os.path.splitext(input_file)[1]
+
+    # check if the output folder exists and delete if necessary
+    if os.path.exists(resultfolder):
+        if args.force:
+            print("Information: Removing previously calculated results...")
+            try:
+                rmtree(resultfolder)
+            except OSError:
                 print(
-                    "Information: You can specify --force option to override this error"
-                )
-                continue
-
-        # after all checks are done, the folder can be created
-        os.makedirs(resultfolder)
-
-        if file_ext == ".csv":
-            if args.spectrum:
-                data = core.parse_spectrum_csv(
-                    input_file,
-                    scan_rate=args.scan_rate,
-                    sep=args.sep,
-                    dec=args.dec,
-                    denaturant=args.denaturant,
-                    readout=args.readout,
-                )
-            else:
-                data = core.parse_plain_csv(
-                    input_file,
-                    scan_rate=args.scan_rate,
-                    sep=args.sep,
-                    dec=args.dec,
-                    layout=args.layout,
-                    denaturant=args.denaturant,
-                    readout=args.readout,
+                    "Fatal: cannot remove results file, because some other program is using it"
                 )
-        elif file_ext == ".xlsx":
-            LE = args.model == "lumry_eyring"
+                return "failed", "cannot remove previous results"
+        else:
+            print(
+                "Fatal: cannot create result folder, because a folder with the same name already exists!"
+            )
+            print(
+                "Information: You can specify --force option to override this error"
+            )
+            return "failed", "result folder exists"
 
-            data = core.parse_prom_xlsx(
+    # after all checks are done, the folder can be created
+    os.makedirs(resultfolder)
+
+    if file_ext == ".csv":
+        if args.spectrum:
+            data = core.parse_spectrum_csv(
                 input_file,
-                raw=args.raw,
-                refold=args.refold,
-                LE=LE,
-                panta_rhei=args.panta_rhei,
+                scan_rate=args.scan_rate,
+                sep=args.sep,
+                dec=args.dec,
+                denaturant=args.denaturant,
+                readout=args.readout,
             )
-
-        elif file_ext == ".json":
-            # NOTE currently this would mean that the previous JSON session is re-analysed with new settings
-            # TODO how to auto-set the outfolder here?
-            data = core.mp_from_json(input_file)
         else:
-            print('Fatal: unsupported file format "{}"'.format(file_ext))
-            continue
-
-        if args.print_readouts:
-            print("These readouts are available in the input file:")
-            print(" ".join(data.GetDatasets()))
-            continue
-
-        # extract analysis-related settings in a separate dict
-        analysis_kwargs = core.analysis_kwargs(args.__dict__)
-        data.SetAnalysisOptions("all", **analysis_kwargs)
-
-        # HACK if the instance was made from JSON, let it know that LE analysis will be run
-        if file_ext == ".json" and args.model == "lumry_eyring":
-            data.__class__ = core.MoltenProtFitMultipleLE
-
-        # special settings for scattering (this give a second set-analysis message to the log)
-        # NOTE this will not affect LE mode, because the Scattering settings are hard-coded in method
-        # PrepareAndAnalyseAll
-        if "Scattering" in data.GetDatasets():
-            if args.model_sct:
-                analysis_kwargs["model"] = args.model_sct
-            data.SetAnalysisOptions("Scattering", **analysis_kwargs)
-
-        # set model to "skip" for readouts that should not be processed (the data will be still available)
-        if args.exclude_readout is not None:
-            for readout in args.exclude_readout:
-                if data.datasets.get(readout):
-                    data.datasets[readout].model = "skip"
-                    cont = False
-                else:
-                    print(
-                        "Fatal: readout {} not found in the input file; use --print_readouts to get available readouts".format(
-                            readout
-                        )
+            data = core.parse_plain_csv(
+                input_file,
+                scan_rate=args.scan_rate,
+                sep=args.sep,
+                dec=args.dec,
+                layout=args.layout,
+                denaturant=args.denaturant,
+                readout=args.readout,
+            )
+    elif file_ext == ".xlsx":
+        LE = args.model == "lumry_eyring"
+
+        data = core.parse_prom_xlsx(
+            input_file,
+            raw=args.raw,
+            refold=args.refold,
+            LE=LE,
+            panta_rhei=args.panta_rhei,
+        )
+
+    elif file_ext == ".json":
+        # NOTE currently this would mean that the previous JSON session is re-analysed with new settings
+        # TODO how to auto-set the outfolder here?
+        data = core.mp_from_json(input_file)
+    else:
+        print('Fatal: unsupported file format "{}"'.format(file_ext))
+        return "failed", "unsupported file format"
+
+    if args.print_readouts:
+        print("These readouts are available in the input file:")
+        print(" ".join(data.GetDatasets()))
+        return "done", "printed readouts"
+
+    # extract analysis-related settings in a separate dict
+    analysis_kwargs = core.analysis_kwargs(args.__dict__)
+    data.SetAnalysisOptions("all", **analysis_kwargs)
+
+    # HACK if the instance was made from JSON, let it know that LE analysis will be run
+    if file_ext == ".json" and args.model == "lumry_eyring":
+        data.__class__ = core.MoltenProtFitMultipleLE
+
+    # special settings for scattering (this give a second set-analysis message to the log)
+    # NOTE this will not affect LE mode, because the Scattering settings are hard-coded in method
+    # PrepareAndAnalyseAll
+    if "Scattering" in data.GetDatasets():
+        if args.model_sct:
+            analysis_kwargs["model"] = args.model_sct
+        data.SetAnalysisOptions("Scattering", **analysis_kwargs)
+
+    # set model to "skip" for readouts that should not be processed (the data will be still available)
+    if args.exclude_readout is not None:
+        for readout in args.exclude_readout:
+            if data.datasets.get(readout):
+                data.datasets[readout].model = "skip"
+            else:
+                print(
+                    "Fatal: readout {} not found in the input file; use --print_readouts to get available readouts".format(
+                        readout
                     )
-                    # terminate this loop and signal to the file loop that the next file must be processed
-                    cont = True
-                    break
-            if cont:
-                continue
+                )
+                return "failed", "readout {} not found".format(readout)
+
+    if args.lead_readout is not None and not data.datasets.get(args.lead_readout):
+        print(
+            "Fatal: readout {} not found in the input file; use --print_readouts to get available readouts".format(
+                args.lead_readout
+            )
+        )
+        return "failed", "readout {} not found".format(args.lead_readout)
+
+    profiler = None
+    if args.profile is not None:
+        profiler = core.RunProfiler()
+
+    data.PrepareAndAnalyseAll(n_jobs=n_jobs, profile=profiler, lead=args.lead_readout)
+
+    # each input file gets its own page cache
+    pdf_cache = None
+    if args.pdf_cache is not None:
+        pdf_cache = os.path.join(args.pdf_cache, os.path.basename(resultfolder))
+
+    if args.json:
+        core.mp_to_json(data, os.path.join(resultfolder, "MP_session.json"))
+    else:
+        data.WriteOutputAll(
+            outfolder=resultfolder,
+            report_format=args.report_format,
+            xlsx=args.xlsx,
+            genpics=args.genpics,
+            heatmaps=args.heatmaps,
+            n_jobs=n_jobs,
+            session=True,
+            heatmap_cmap=args.hm_cmap,
+            pdf_cache=pdf_cache,
+            embed_curves=args.embed_curves,
+            profile=profiler,
+        )
+    if args.trace is not None:
+        trace_file = "trace.json" if args.trace == "chrome" else "trace.speedscope.json"
+        data.WriteTrace(os.path.join(resultfolder, trace_file), trace_format=args.trace)
+        data.GetFitStatistics().to_csv(
+            os.path.join(resultfolder, "fit_statistics.csv"), index=False
+        )
+    if profiler is not None:
+        profiler.write(resultfolder, top=args.profile)
+    if args.quiet:
+        data.GetMessages().to_csv(os.path.join(resultfolder, "messages.csv"), index=False)
+    return "done", " ".join(data.GetDatasets())
+
+
+def _batch_task(input_file, args):
+    """
+    Process a single file in batch mode; errors are caught, so that they do not stop other files
+
+    Returns
+    -------
+    A tuple of input file, status, description and processing time in seconds
+    """
+    start = perf_counter()
+    try:
+        status, description = ProcessFile(input_file, args)
+    except SystemExit:
+        # fatal errors in core stop the program, the message has been printed already
+        status, description = "failed", "fatal error (see the messages above)"
+    except Exception as error:
+        status, description = "failed", "{}: {}".format(type(error).__name__, error)
+    return input_file, status, description, perf_counter() - start
+
+
+def MoltenprotBatch(args):
+    """
+    Process all input files in a pool of --n_jobs workers (one file per worker)
+
+    Parameters
+    ----------
+    args : namespace
+        CLI paramater namespace
 
-        data.PrepareAndAnalyseAll(n_jobs=args.n_jobs)
+    Returns
+    -------
+    Exit code: 0 if all files were processed and 1 otherwise
 
-        if args.json:
-            core.mp_to_json(data, os.path.join(resultfolder, "MP_session.json"))
+    Notes
+    -----
+    Each file is read, analysed and written by a single worker, so that the stages of different
+    files overlap. A summary table is printed at the end and, if -o is supplied, also saved
+    to batch_summary.csv in the output folder.
+    """
+    # files with the same output folder would overwrite each other
+    results = []
+    input_files = []
+    result_folders = {}
+    for input_file in args.input:
+        if _claim_result_folder(input_file, args, result_folders):
+            input_files.append(input_file)
         else:
-            data.WriteOutputAll(
-                outfolder=resultfolder,
-                report_format=args.report_format,
-                xlsx=args.xlsx,
-                genpics=args.genpics,
-                heatmaps=args.heatmaps,
-                n_jobs=args.n_jobs,
-                session=True,
-                heatmap_cmap=args.hm_cmap,
+            results.append(
+                (input_file, "failed", "same result folder as another input file", 0.0)
             )
 
+    n_jobs = max(1, min(args.n_jobs, len(input_files)))
+    print(
+        "Information: processing {} files with {} parallel jobs".format(
+            len(input_files), n_jobs
+        )
+    )
+    start = perf_counter()
+    if core.parallelization and n_jobs > 1:
+        from joblib import Parallel, delayed
+
+        # dispatch files one by one, so that long files do not hold up a queue of others
+        results += Parallel(n_jobs=n_jobs, batch_size=1)(
+            delayed(_batch_task)(input_file, args) for input_file in input_files
+        )
+    else:
+        results += [_batch_task(input_file, args) for input_file in input_files]
+    total_time = perf_counter() - start
+
+    # print the summary table (in the order of input files)
+    order = {input_file: i for i, input_file in enumerate(args.input)}
+    results.sort(key=lambda result: order[result[0]])
+    header = ("File", "Status", "Time, s", "Details")
+    rows = [
+        (input_file, status, "{:.1f}".format(run_time), description)
+        for input_file, status, description, run_time in results
+    ]
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    print("\nBatch summary:")
+    for row in [header] + rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+    n_failed = sum(status != "done" for _, status, _, _ in results)
+    print(
+        "Information: {} of {} files processed successfully in {:.1f} s".format(
+            len(results) - n_failed, len(results), total_time
+        )
+    )
+    if args.output is not None:
+        os.makedirs(args.output, exist_ok=True)
+        with open(
+            os.path.join(args.output, "batch_summary.csv"), "w", newline=""
+        ) as summary:
+            csv.writer(summary).writerows([header] + rows)
+
+    return 1 if n_failed else 0
+
+
+def UseHeadlessBackend():
+    """
+    Selects the non-interactive Agg backend of matplotlib for runs without GUI
+
+    Notes
+    -----
+    * must be called before pyplot is imported, so that no GUI toolkit is probed or initialized
+    * the setting is passed to worker processes via the environment
+    """
+    os.environ["MPLBACKEND"] = "Agg"
+    if "matplotlib" in sys.modules:
+        sys.modules["matplotlib"].use("Agg")
+
 
 def MoltenprotGUI():
     "Launches the GUI"
@@ -532,6 +846,18 @@ def MoltenprotGUI():
 ##  \brief Main function for the startup script
 def main():
     """Main function for the startup script"""
+    # long-running folder watcher and analysis server have their own sets of options
+    if sys.argv[1:2] == ["watch"]:
+        from moltenprot.watch import main as watch_main
+
+        watch_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["serve"]:
+        from moltenprot.server import main as serve_main
+
+        serve_main(sys.argv[2:])
+        return
+
     # create the parser object
     parser = CLIparser()
     # put the args in variables
@@ -549,6 +875,7 @@ def main():
     if args.gui:
         MoltenprotGUI()
     else:
+        UseHeadlessBackend()
         MoltenprotCLI(args)
 
 
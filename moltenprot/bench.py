@@ -0,0 +1,421 @@
+"Benchmarks for the analysis, I/O and reporting stages of MoltenProt (python -m moltenprot.bench)"
+# Copyright 2018-2021,2025 Vadim Kotov, Thomas C. Marlovits
+#
+#     This file is part of MoltenProt.
+#
+#     MoltenProt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     MoltenProt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with MoltenProt.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Each benchmark case is a synthetic plate (48, 96, 384 or 1536 wells) generated and analysed
+with one model (see moltenprot.synthetic).
+The stages of a case are run in order and timed separately:
+
+read
+    parse_plain_csv of the synthetic plate
+read_xlsx
+    parse_prom_xlsx of a user-supplied file (only with --xlsx)
+prepare
+    MoltenProtFit.PrepareData
+process
+    MoltenProtFit.ProcessData
+json_write, json_read
+    mp_to_json and mp_from_json of the analysed instance
+genpics
+    MoltenProtFit.WriteOutput(genpics=True), one PNG per well
+pdf
+    MoltenProtFit.PdfReport
+
+Peak memory of each stage is measured in a separate run with tracemalloc (it slows down
+the code, so it is not done during timing). The results are written as JSON and can be
+compared to the results of another version with --compare.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from statistics import median
+
+import numpy as np
+import pandas as pd
+
+from moltenprot import core
+from moltenprot.__main__ import UseHeadlessBackend
+from moltenprot.synthetic import PLATE_SIZES, synthetic_plate, write_layout, write_plain_csv
+
+STAGES = (
+    "read",
+    "read_xlsx",
+    "prepare",
+    "process",
+    "json_write",
+    "json_read",
+    "genpics",
+    "pdf",
+)
+
+
+class StageTimer:
+    """
+    Runs the stages of a benchmark case and records their run time and (optionally) peak memory
+    """
+
+    def __init__(self, memory=False):
+        """
+        Parameters
+        ----------
+        memory
+            measure the peak memory with tracemalloc instead of the time
+        """
+        self.memory = memory
+        self.values = {}
+
+    def run(self, stage, function, *args, **kwargs):
+        """
+        Run a function and record its run time (in s) or peak memory (in MB) as stage
+
+        Returns
+        -------
+        the return value of the function
+        """
+        if self.memory:
+            tracemalloc.start()
+            try:
+                result = function(*args, **kwargs)
+                self.values[stage] = tracemalloc.get_traced_memory()[1] / 1024**2
+            finally:
+                tracemalloc.stop()
+            return result
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.values[stage] = time.perf_counter() - start
+        return result
+
+
+def run_case(n_wells, model, stages, folder, seed=0, xlsx=None, memory=False):
+    """
+    Run the selected stages for one plate size and model
+
+    Parameters
+    ----------
+    n_wells
+        plate size
+    model
+        model name from core.avail_models
+    stages
+        stage names to record (the stages needed by later ones are run anyway)
+    folder
+        folder for the input and output files
+    seed
+        seed for the synthetic plate
+    xlsx
+        path to an XLSX file for the read_xlsx stage
+    memory
+        measure peak memory instead of time
+
+    Returns
+    -------
+    dict stage -> time (s) or peak memory (MB)
+    """
+    timer = StageTimer(memory=memory)
+
+    def step(stage):
+        return timer.run if stage in stages else _untimed
+
+    input_file = os.path.join(folder, "{}_{}.csv".format(model, n_wells))
+    layout_file = os.path.join(folder, "layout_{}.csv".format(n_wells))
+    if not os.path.exists(input_file):
+        data, _ = synthetic_plate(model, n_wells, seed=seed)
+        write_plain_csv(data, input_file)
+        write_layout(data, layout_file)
+
+    if "read_xlsx" in stages and xlsx is not None:
+        timer.run("read_xlsx", core.parse_prom_xlsx, xlsx)
+
+    mp = step("read")(
+        "read", core.parse_plain_csv, input_file, scan_rate=1.0, layout=layout_file
+    )
+    mp.SetAnalysisOptions(model=model)
+    dataset = mp.datasets[core.defaults["readout"]]
+    if set(stages) - {"read", "read_xlsx"}:
+        step("prepare")("prepare", dataset.PrepareData)
+        step("process")("process", dataset.ProcessData)
+    json_file = os.path.join(folder, "session.json")
+    if "json_write" in stages or "json_read" in stages:
+        step("json_write")("json_write", core.mp_to_json, mp, json_file)
+    if "json_read" in stages:
+        timer.run("json_read", core.mp_from_json, json_file)
+    if "genpics" in stages:
+        dataset.resultfolder = os.path.join(folder, "genpics")
+        os.makedirs(dataset.resultfolder, exist_ok=True)
+        timer.run("genpics", dataset.WriteOutput, genpics=True, no_data=True)
+    if "pdf" in stages:
+        timer.run("pdf", dataset.PdfReport, os.path.join(folder, "report.pdf"))
+    return {stage: timer.values[stage] for stage in STAGES if stage in timer.values}
+
+
+def _untimed(stage, function, *args, **kwargs):
+    "Same signature as StageTimer.run, but nothing is recorded"
+    return function(*args, **kwargs)
+
+
+def run_benchmarks(
+    wells=(48, 96, 384, 1536),
+    models=None,
+    stages=STAGES,
+    repeat=1,
+    memory=True,
+    seed=0,
+    xlsx=None,
+    progress=print,
+):
+    """
+    Run the benchmark for all combinations of plate sizes and models
+
+    Parameters
+    ----------
+    wells
+        plate sizes
+    models
+        model names (default: all models in core.avail_models)
+    stages
+        stages to run
+    repeat
+        how many times each case is timed
+    memory
+        also measure the peak memory of each stage
+    seed
+        seed for the synthetic plates
+    xlsx
+        path to an XLSX file for the read_xlsx stage
+    progress
+        a callable that accepts status messages (or None)
+
+    Returns
+    -------
+    dict with the environment description and a list of results (one per case and stage)
+    """
+    if models is None:
+        models = [i for i in core.avail_models if i != "skip"]
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for n_wells in wells:
+            for model in models:
+                if progress is not None:
+                    progress(
+                        "Information: benchmarking {} wells, model {}".format(
+                            n_wells, model
+                        )
+                    )
+                times = {}
+                peak_memory = {}
+                error = None
+                try:
+                    for _ in range(repeat):
+                        for stage, value in run_case(
+                            n_wells, model, stages, folder, seed=seed, xlsx=xlsx
+                        ).items():
+                            times.setdefault(stage, []).append(value)
+                    if memory:
+                        peak_memory = run_case(
+                            n_wells,
+                            model,
+                            stages,
+                            folder,
+                            seed=seed,
+                            xlsx=xlsx,
+                            memory=True,
+                        )
+                except (Exception, SystemExit) as exception:
+                    # fatal errors in core call sys.exit
+                    error = "{}: {}".format(type(exception).__name__, exception)
+                    if progress is not None:
+                        progress(
+                            "Warning: {} wells, model {} failed ({})".format(
+                                n_wells, model, error
+                            )
+                        )
+                for stage, values in times.items():
+                    results.append(
+                        {
+                            "wells": n_wells,
+                            "model": model,
+                            "stage": stage,
+                            "times": values,
+                            "median": median(values),
+                            "min": min(values),
+                            "peak_memory_mb": peak_memory.get(stage),
+                        }
+                    )
+                if error is not None:
+                    results.append(
+                        {"wells": n_wells, "model": model, "stage": None, "error": error}
+                    )
+    return {
+        "moltenprot": core.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scipy": core.scipy_version,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": repeat,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare_results(current, baseline, tolerance=0.1):
+    """
+    Compare two benchmark results (e.g. of two MoltenProt versions)
+
+    Parameters
+    ----------
+    current, baseline
+        dicts returned by run_benchmarks
+    tolerance
+        relative slow-down of the median time that is reported as a regression
+
+    Returns
+    -------
+    pd.DataFrame with the median times, their ratio and a regression flag for each common case and stage
+    """
+    columns = ["wells", "model", "stage", "median"]
+
+    def _table(data):
+        rows = [i for i in data["results"] if i.get("stage") is not None]
+        return pd.DataFrame(rows, columns=columns).set_index(columns[:3])["median"]
+
+    output = pd.concat(
+        [_table(baseline).rename("baseline"), _table(current).rename("current")],
+        axis=1,
+        join="inner",
+    )
+    output["ratio"] = output["current"] / output["baseline"]
+    output["regression"] = output["ratio"] > 1 + tolerance
+    return output
+
+
+def format_results(data):
+    "Returns a text table with the benchmark results"
+    rows = [i for i in data["results"] if i.get("stage") is not None]
+    if not rows:
+        return "No results"
+    table = pd.DataFrame(rows).set_index(["wells", "model", "stage"])
+    table = table[["median", "min", "peak_memory_mb"]].rename(
+        columns={"median": "median, s", "min": "min, s", "peak_memory_mb": "peak memory, MB"}
+    )
+    return table.to_string(float_format="{:.3f}".format)
+
+
+def BenchParser():
+    """
+    Creates the argument parser for the benchmarks
+
+    Returns
+    -------
+    parser
+        arparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m moltenprot.bench",
+        description="Benchmarks for the analysis, I/O and reporting stages of MoltenProt on synthetic plates",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--wells",
+        type=int,
+        nargs="+",
+        default=list(PLATE_SIZES),
+        choices=list(PLATE_SIZES),
+        help="Plate sizes",
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=None,
+        choices=[i for i in core.avail_models if i != "skip"],
+        help="Models to benchmark (default: all)",
+    )
+    parser.add_argument(
+        "--stages", nargs="+", default=list(STAGES), choices=STAGES, help="Stages to run"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="How many times each case is timed"
+    )
+    parser.add_argument(
+        "--no_memory",
+        action="store_true",
+        help="Do not measure peak memory (saves one run per case)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic plates")
+    parser.add_argument(
+        "--xlsx", type=str, default=None, help="XLSX file for the read_xlsx stage"
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, default=None, help="Write the results to this JSON file"
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default=None,
+        help="JSON file with earlier results; the exit code is 1 if any stage became slower",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Relative slow-down that is considered a regression",
+    )
+    return parser
+
+
+def main(argv=None):
+    """Entry point for python -m moltenprot.bench"""
+    args = BenchParser().parse_args(argv)
+    UseHeadlessBackend()
+    data = run_benchmarks(
+        wells=args.wells,
+        models=args.models,
+        stages=args.stages,
+        repeat=args.repeat,
+        memory=not args.no_memory,
+        seed=args.seed,
+        xlsx=args.xlsx,
+    )
+    print(format_results(data))
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(data, output_file, indent=4)
+        print("Information: results written to {}".format(args.output))
+    if args.compare is not None:
+        with open(args.compare, "r") as baseline_file:
+            comparison = compare_results(data, json.load(baseline_file), args.tolerance)
+        print(comparison.to_string(float_format="{:.3f}".format))
+        if comparison["regression"].any():
+            print(
+                "Warning: {} stages are slower than in {}".format(
+                    comparison["regression"].sum(), args.compare
+                )
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
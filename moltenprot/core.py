@@ -18,7 +18,16 @@
 
 
 ### Modules
-from io import StringIO
+from io import BytesIO, StringIO
+
+# lazy iteration
+import itertools
+
+# caching of repeatedly used objects
+from functools import lru_cache, wraps
+
+# timing of analysis stages
+from contextlib import contextmanager, nullcontext
 
 # for generating htmls
 from string import Template
@@ -29,9 +38,23 @@ from inspect import currentframe, getframeinfo
 # handling exceptions
 import sys
 
+# console output and the event log of the analysis
+import logging
+
 # creating folders
 import os
 
+# Path objects (e.g. input filenames) are stored as strings in JSON sessions
+from pathlib import PurePath
+
+# checking optional modules without importing them
+from importlib import import_module, metadata
+from importlib.util import find_spec
+
+# temporary folders and hashing of PDF report pages
+import tempfile
+import hashlib
+
 # function to recognize module versions
 try:
     from distutils.version import LooseVersion
@@ -45,7 +68,7 @@ import json
 # for compression of output JSON
 # import gzip
 # for timestamps
-from time import strftime
+from time import strftime, perf_counter, time
 
 # data processing
 import pandas as pd
@@ -53,21 +76,9 @@ import pandas as pd
 # some useful mathematical functions
 import numpy as np
 
-# fitting routine from scipy
-from scipy.optimize import curve_fit
-
-# median filtering
-from scipy.signal import medfilt
-
-# interpolation
-from scipy.interpolate import interp1d
-
-# plotting
-import matplotlib.pyplot as plt
-from matplotlib import gridspec
-
-# for color conversion
-from matplotlib.colors import rgb2hex
+# NOTE scipy submodules (optimize, signal, interpolate), matplotlib, joblib and pypdf are imported
+# in the functions that use them, so that importing core (e.g. for a CLI run without plots) stays fast
+import scipy
 
 # import the fitting models
 from . import models
@@ -96,35 +107,54 @@ with open(os.path.join(__location__, "VERSION"), "r") as version_file:
     __version__ = version_file.read().strip()
 
 # get scipy version (some methods may not be available in earlier versions)
-scipy_version = sys.modules["scipy"].__version__
+scipy_version = scipy.__version__
 
 # check if running from a PyInstaller bundle https://pyinstaller.org/en/stable/runtime-information.html
 from_pyinstaller = getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS")
 
+
+def _module_version(name):
+    """
+    Returns the version of an installed module without importing it, or None if the module is not available
+
+    Notes
+    -----
+    * if package metadata is missing (e.g. in a PyInstaller bundle) the module is imported to get the version
+    """
+    if find_spec(name) is None:
+        return None
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return getattr(import_module(name), "__version__", "0")
+
+
 # for parallel processing of some for loops using joblib (may hang up)
-try:
-    from joblib import Parallel, delayed
-
-    # this is only needed if we want to auto-estimate the available cores - currently done in MoltenProtMain
-    # import multiprocessing
-    # cores = multiprocessing.cpu_count()
-    # access module version without importing the whole module:
-    joblib_version = sys.modules["joblib"].__version__
-    # check joblib version: only 0.12 and above can pickle instance methods (which is used in mp)
-    if LooseVersion(joblib_version) >= LooseVersion("0.12"):
-        parallelization = True
-    else:
-        print(
-            "Warning: available joblib version ({}) is incompatible with current code parallelization".format(
-                joblib_version
-            )
-        )
-        print("Information: Consider updating to joblib 0.12 or above")
-        parallelization = False
-except ImportError:
+# this is only needed if we want to auto-estimate the available cores - currently done in MoltenProtMain
+# import multiprocessing
+# cores = multiprocessing.cpu_count()
+joblib_version = _module_version("joblib")
+if joblib_version is None:
     print("Warning: joblib module not found, parallelization of code is not possible.")
     joblib_version = "None"  # only for printing version info
     parallelization = False
+# check joblib version: only 0.12 and above can pickle instance methods (which is used in mp)
+elif LooseVersion(joblib_version) >= LooseVersion("0.12"):
+    parallelization = True
+else:
+    print(
+        "Warning: available joblib version ({}) is incompatible with current code parallelization".format(
+            joblib_version
+        )
+    )
+    print("Information: Consider updating to joblib 0.12 or above")
+    parallelization = False
+
+# merging of separately rendered PDF report pages (optional, parallel/incremental PDF reports)
+pdf_merging = find_spec("pypdf") is not None
+
+# compiled model functions (optional, see jit.py); set to False to always use the NumPy models
+jit_compilation = find_spec("numba") is not None
 
 # NOTE MoltenProtFit and MoltenProtFitMultiple have different parallelization approaches:
 # MoltenProtFit - can only parallelize figure plotting and n_jobs=3 works well
@@ -135,15 +165,90 @@ except ImportError:
 R = models.R
 T_std = models.T_std
 
+
+def row_labels(n_rows):
+    """
+    Returns a list of plate row names: A, B, ..., Z, AA, AB, ...
+
+    Parameters
+    ----------
+    n_rows : int
+        number of plate rows
+    """
+    labels = []
+    for i in range(n_rows):
+        label = ""
+        i += 1
+        while i > 0:
+            i, remainder = divmod(i - 1, 26)
+            label = chr(65 + remainder) + label
+        labels.append(label)
+    return labels
+
+
+def plate_index(n_rows=8, n_cols=12):
+    """
+    Returns well IDs of a plate in row-major order (A1, A2, ..., B1, ...)
+
+    Parameters
+    ----------
+    n_rows, n_cols : int
+        plate dimensions (8x12 for a 96-well plate)
+
+    Returns
+    -------
+    pd.Series called ID
+    """
+    rows = np.repeat(row_labels(n_rows), n_cols)
+    cols = np.tile(np.arange(1, n_cols + 1).astype(str), n_rows)
+    return pd.Series(data=np.char.add(rows, cols), name="ID")
+
+
+def well_position(well_ids):
+    """
+    Converts well IDs (e.g. A1, H12, AF48) to zero-based row and column numbers
+
+    Parameters
+    ----------
+    well_ids
+        an iterable with well IDs
+
+    Returns
+    -------
+    tuple of two int arrays (rows, columns); invalid IDs get -1 in both
+    """
+    parts = pd.Series(list(well_ids), dtype=object).astype(str).str.extract(
+        r"^([A-Z]+)(\d+)$"
+    )
+    # row letters are few, so a mapping of unique values is sufficient
+    row_numbers = {}
+    for label in parts[0].dropna().unique():
+        number = 0
+        for letter in label:
+            number = number * 26 + ord(letter) - 64
+        row_numbers[label] = number - 1
+    rows = parts[0].map(row_numbers).fillna(-1).astype(int).values
+    cols = pd.to_numeric(parts[1]).fillna(0).astype(int).values - 1
+    invalid = rows < 0
+    cols[invalid] = -1
+    return rows, cols
+
+
+def plate_shape(well_ids, min_rows=8, min_cols=12):
+    """
+    Returns the plate dimensions (rows, columns) that can hold all supplied well IDs;
+    the plate is never smaller than min_rows x min_cols
+    """
+    rows, cols = well_position(well_ids)
+    if len(rows) > 0:
+        min_rows = max(min_rows, rows.max() + 1)
+        min_cols = max(min_cols, cols.max() + 1)
+    return int(min_rows), int(min_cols)
+
+
 # Standard plate index
 # NOTE currently the software requires the layout to contain A1-H12 index, even if only a small part is used
-alphanumeric_index = []
-for k in ["A", "B", "C", "D", "E", "F", "G", "H"]:
-    for l in range(1, 13):
-        alphanumeric_index.append(k + str(l))
-# convert index to pandas Series and set its name
-alphanumeric_index = pd.Series(data=alphanumeric_index)
-alphanumeric_index.name = "ID"
+alphanumeric_index = plate_index(8, 12)
 
 # dictionary holding the default values and and their description for CLI interface/tooltips
 # dictionary key is the name of the option, each entry contains a tuple of default parameter value and its descriptions
@@ -181,6 +286,22 @@ analysis_defaults = {
     "onset_threshold_h": "Percent unfolded to define the onset of unfolding",
     "savgol": 10,
     "savgol_h": "Set window size (in temperature units) for Savitzky-Golay filter used to calculate the derivative",
+    "varpro": False,
+    "varpro_h": "Fit only the nonlinear parameters (e.g. Tm and dHm) and compute the baseline parameters exactly by linear least squares at each step (variable projection); baseline_bounds is then not used",
+    "prescreen": 0,
+    "prescreen_h": "Skip the fitting of curves without a transition: empty wells, curves whose signal change is below this signal-to-noise ratio and curves without a peak in the derivative (10 is a good starting value); set to 0 to fit all curves",
+    "coarse": 0,
+    "coarse_h": "Fit the curves averaged to this temperature step first and refine the fit on the full curves (fewer model evaluations on long curves, e.g. 1 degree for Prometheus data); set to 0 to fit the full curves directly",
+    "peak_init": False,
+    "peak_init_h": "Compute the starting values of the transition parameters (e.g. Tm and dHm, or the onset temperatures) from the position and width of the peaks of the derivative; two peaks are used for three-state models",
+    "max_nfev": 0,
+    "max_nfev_h": "Stop the fit of a sample after this many model evaluations; set to 0 for no limit",
+    "fit_timeout": 0,
+    "fit_timeout_h": "Stop the fit of a sample after this time (in seconds); set to 0 for no limit",
+    "deadline": 0,
+    "deadline_h": "Stop fitting the samples of a dataset this many seconds after the fitting started, the remaining samples are not fit; set to 0 for no limit",
+    "compare_models": [],
+    "compare_models_h": "Also fit these models to each sample and rank all fitted models by the Akaike and Bayesian information criteria (columns AIC_<model>, BIC_<model>, best_AIC and best_BIC in the results); the fit parameters are reported for the main model, the other models start from the peaks of the derivative (see peak_init)",
 }
 
 # all other settings for MoltenProtFit
@@ -251,6 +372,35 @@ def normalize(inseries:pd.Series, new_min=0, new_max=1, from_input=False) -> pd.
     return inseries
 
 
+def bin_plate(plate, step):
+    """
+    Averages the data points of a plate in temperature bins of a given size
+
+    Parameters
+    ----------
+    plate
+        pd.DataFrame with Temperature in index
+    step
+        bin size in temperature units
+
+    Returns
+    -------
+    pd.DataFrame indexed by the start temperature of each bin (bins without data points are NaN)
+    """
+    # create the range for Temperature binning (will be also used as the index)
+    bin_range = np.arange(
+        np.floor(min(plate.index)),
+        np.ceil(max(plate.index)) + step,
+        step,
+    )
+    binned = pd.DataFrame(index=bin_range[:-1], columns=plate.columns, dtype="float64")
+
+    # average values using the temperature range (binned index, binned index + bin step)
+    for i in binned.index:
+        binned.loc[i, :] = plate[(plate.index > i) & (plate.index < i + step)].mean()
+    return binned
+
+
 def to_odd(inval:float, step:float):
     """Helper function to convert the window length in temperature units to an odd number of datapoints
 
@@ -306,6 +456,95 @@ def showVersionInformation():
         print("(PyInstaller bundle)")
     pd.show_versions(as_json=False)  # matplotlib is also there
     print("joblib           : {}".format(joblib_version))
+    print("numba            : {}".format(_module_version("numba")))
+
+
+### Logging
+"""
+Messages of MoltenProtFit/MoltenProtFitMultiple (see print_message) are recorded as events,
+i.e. dicts with the message type (i/w/f), text, dataset and well (if the message concerns
+a single well). The events are stored in the instances and rendered to protocolString on
+demand. They are also sent to the "moltenprot" logger, which prints them to the console;
+other handlers can use the structured fields of the record attribute "event".
+"""
+
+# logging levels and console prefixes of the message types
+message_levels = {"i": logging.INFO, "w": logging.WARNING, "f": logging.CRITICAL}
+message_prefixes = {"i": "Information", "w": "Warning", "f": "Fatal"}
+
+logger = logging.getLogger("moltenprot")
+
+
+def format_event(event):
+    """
+    Returns the text of an event as it appears in the console and protocolString
+    """
+    return "{}: {} ({})".format(
+        message_prefixes[event["type"]], event["text"], event["dataset"]
+    )
+
+
+class _EventFormatter(logging.Formatter):
+    """
+    Formats the events in the classic MoltenProt style; in debug mode the source line
+    of Warnings and Fatals is printed as well
+    """
+
+    def format(self, record):
+        event = getattr(record, "event", None)
+        if event is None:
+            return super().format(record)
+        text = format_event(event)
+        if getattr(record, "debug", False) and record.levelno >= logging.WARNING:
+            text = "Line {}, in file {}\n{}".format(record.lineno, record.pathname, text)
+        return text
+
+
+class _ConsoleHandler(logging.StreamHandler):
+    """
+    Writes to the current sys.stdout (it can be replaced after import, e.g. by the GUI or tests)
+    """
+
+    def emit(self, record):
+        self.stream = sys.stdout
+        super().emit(record)
+
+
+_console_handler = _ConsoleHandler()
+_console_handler.setFormatter(_EventFormatter())
+logger.addHandler(_console_handler)
+logger.propagate = False
+# NOTE the environment variable passes quiet mode to worker processes
+logger.setLevel(logging.ERROR if os.environ.get("MOLTENPROT_QUIET") else logging.INFO)
+
+
+def set_quiet(quiet=True):
+    """
+    Switch quiet mode on or off; in quiet mode only Fatal messages are logged, but all messages
+    are still recorded in the events of the datasets
+
+    Parameters
+    ----------
+    quiet
+        enable or disable quiet mode
+    """
+    if quiet:
+        logger.setLevel(logging.ERROR)
+        os.environ["MOLTENPROT_QUIET"] = "1"
+    else:
+        logger.setLevel(logging.INFO)
+        os.environ.pop("MOLTENPROT_QUIET", None)
+
+
+def _log_event(event, debug=False):
+    """
+    Sends an event to the logger (the source line is that of the print_message caller)
+    """
+    level = message_levels[event["type"]]
+    if logger.isEnabledFor(level):
+        logger.log(
+            level, event["text"], extra={"event": event, "debug": debug}, stacklevel=3
+        )
 
 
 ### Wrappers
@@ -389,6 +628,8 @@ def serialize(obj):
             "version": __version__,
             "timestamp": strftime("%c"),
         }
+    if isinstance(obj, PurePath):
+        return str(obj)
     return obj
 
 def deserialize(input_dict):
@@ -432,9 +673,1169 @@ def deserialize(input_dict):
     return input_dict
 
 
+### Plotting helpers
+
+
+# NOTE the text paths are the same for all heatmaps, so they are cached
+@lru_cache(maxsize=None)
+def _label_path(label, size):
+    """
+    Returns a text path for label centered around (0, 0), in points
+    """
+    from matplotlib.textpath import TextPath
+    from matplotlib.transforms import Affine2D
+
+    path = TextPath((0, 0), label, size=size)
+    extents = path.get_extents()
+    return path.transformed(
+        Affine2D().translate(
+            -(extents.x0 + extents.x1) / 2, -(extents.y0 + extents.y1) / 2
+        )
+    )
+
+
+def _well_labels(axis, plate96):
+    """
+    Create a single collection with well IDs placed in the cell centers of a heatmap
+
+    Parameters
+    ----------
+    axis
+        matplotlib axes with the heatmap
+    plate96
+        dataframe created with method converter96
+
+    Returns
+    -------
+    matplotlib PathCollection to be added to the axes
+    """
+    from matplotlib import rcParams
+    from matplotlib.collections import PathCollection
+    from matplotlib.transforms import IdentityTransform
+
+    n_rows, n_cols = plate96.shape
+    labels = plate_index(n_rows, n_cols)
+    size = rcParams["font.size"]
+    paths = [_label_path(i, size) for i in labels]
+    offsets = np.column_stack(
+        (
+            np.tile(np.arange(n_cols), n_rows) + 0.5,
+            np.repeat(np.arange(n_rows), n_cols) + 0.5,
+        )
+    )
+    # with size 1 the paths are scaled from points to pixels (same as scatter markers)
+    labels = PathCollection(
+        paths,
+        sizes=[1.0],
+        offsets=offsets,
+        offset_transform=axis.transData,
+        facecolors="k",
+        edgecolors="none",
+        zorder=3,
+    )
+    labels.set_transform(IdentityTransform())
+    return labels
+
+
+### Curve fitting
+
+
+def fit_separable(basis, T, y, p0, bounds=(-np.inf, np.inf), n_linear=4, max_nfev=None):
+    """
+    Fits a model that is linear in its first n_linear parameters by variable projection:
+    the nonlinear search covers only the remaining parameters, the linear ones are
+    obtained by linear least squares at each step
+
+    Parameters
+    ----------
+    basis
+        a function basis(T, *nonlinear) returning a matrix with one column per linear parameter
+        (see MoltenProtModel.linear_basis)
+    T, y
+        the data
+    p0
+        starting values of all parameters (only the nonlinear ones are used)
+    bounds
+        lower and upper bounds of all parameters as in curve_fit (the linear ones are not bounded)
+    n_linear
+        the number of linear parameters
+    max_nfev
+        the maximal number of evaluations of the basis in the nonlinear search (default as in least_squares)
+
+    Returns
+    -------
+    p, covm
+        the fitted parameters (linear ones first) and their covariance matrix, same as curve_fit
+
+    Notes
+    -----
+    Same as curve_fit, a RuntimeError is raised if the optimization did not converge
+    """
+    from scipy.optimize import least_squares
+
+    y = np.asarray(y, dtype=float)
+    n_params = len(p0)
+    lower, upper = (
+        np.broadcast_to(np.asarray(bound, dtype=float), (n_params,))[n_linear:]
+        for bound in bounds
+    )
+    theta0 = np.clip(np.asarray(p0, dtype=float)[n_linear:], lower, upper)
+
+    def project(theta):
+        "Returns the basis matrix and the least-squares estimate of the linear parameters"
+        matrix = basis(T, *theta)
+        return matrix, np.linalg.lstsq(matrix, y, rcond=None)[0]
+
+    def residuals(theta):
+        matrix = basis(T, *theta)
+        # NOTE invalid parameter combinations (e.g. T_onset == Tm) get a large residual
+        if not np.all(np.isfinite(matrix)):
+            return np.full_like(y, 1e10)
+        return matrix @ np.linalg.lstsq(matrix, y, rcond=None)[0] - y
+
+    result = least_squares(residuals, theta0, bounds=(lower, upper), max_nfev=max_nfev)
+    if not result.success:
+        raise RuntimeError("Optimal parameters not found: " + result.message)
+    theta = result.x
+    matrix, coef = project(theta)
+    fitted = matrix @ coef
+
+    # Jacobian of the full model: the columns of linear parameters are the basis itself,
+    # the nonlinear ones are computed by forward differences
+    jacobian = np.empty((len(y), n_params))
+    jacobian[:, :n_linear] = matrix
+    for j, value in enumerate(theta):
+        step = np.sqrt(np.finfo(float).eps) * max(1.0, abs(value))
+        shifted = theta.copy()
+        shifted[j] += step
+        jacobian[:, n_linear + j] = (basis(T, *shifted) @ coef - fitted) / step
+
+    # covariance matrix is computed the same way as in curve_fit
+    _, singular, VT = np.linalg.svd(jacobian, full_matrices=False)
+    singular_min = np.finfo(float).eps * max(jacobian.shape) * singular[0]
+    VT = VT[singular > singular_min]
+    singular = singular[singular > singular_min]
+    covm = (VT.T / singular**2) @ VT
+    if len(y) > n_params:
+        covm = covm * np.sum((fitted - y) ** 2) / (len(y) - n_params)
+    else:
+        covm.fill(np.inf)
+    return np.concatenate([coef, theta]), covm
+
+
+def prescreen_curve(data, derivative, fit_length, min_snr, min_prominence=0.25):
+    """
+    Checks if a curve has a transition that is worth fitting
+
+    Parameters
+    ----------
+    data
+        pd.Series with the signal (Temperature in index, no NaN values)
+    derivative
+        pd.Series with the derivative of the signal (same index as data)
+    fit_length
+        length (in temperature degrees) of the baseline regions at the start and end of the data
+    min_snr
+        the smallest accepted signal-to-noise ratio
+    min_prominence
+        the smallest accepted prominence of the largest derivative peak, relative to the peak height
+
+    Returns
+    -------
+    dict with the following entries:
+        snr - the signal change that a straight line cannot explain divided by the noise
+        (stdev of the residuals of straight lines through the baseline regions),
+        inf for noise-free baselines
+        prominence - relative prominence of the largest peak of the absolute derivative
+        (peaks at the ends of the temperature range do not count)
+        monotonicity - abs(sum(derivative)) / sum(abs(derivative)), 1 for a monotonic curve
+        reason - why the curve should not be fit, or an empty string
+    """
+    from scipy.signal import find_peaks
+
+    output = {"snr": np.nan, "prominence": np.nan, "monotonicity": np.nan, "reason": ""}
+    T = np.float64(data.index.values)
+    y = np.float64(data.values)
+    if len(T) < 2:
+        output["reason"] = "too few data points"
+        return output
+    # same conversion of the baseline length to datapoints as in _estimate_baseline
+    fit_datapoints = int(fit_length / ((T[-1] - T[0]) / (len(T) - 1)))
+    if fit_datapoints < 3 or len(T) < 2 * fit_datapoints:
+        output["reason"] = "too few data points"
+        return output
+    if np.ptp(y) == 0:
+        output["reason"] = "constant signal"
+        return output
+
+    residuals = []
+    for region in (slice(None, fit_datapoints), slice(-fit_datapoints, None)):
+        line = np.polyfit(T[region], y[region], 1)
+        residuals.append(y[region] - np.polyval(line, T[region]))
+    noise = np.std(np.concatenate(residuals), ddof=2)
+    detrended = y - np.polyval(np.polyfit(T, y, 1), T)
+    output["snr"] = np.ptp(detrended) / noise if noise > 0 else np.inf
+
+    slope = np.float64(derivative.values)
+    if not np.isfinite(slope).all():
+        # NOTE the derivative is NaN everywhere if the curve had missing values
+        slope = np.gradient(y, T)
+    if np.isfinite(slope).all() and np.abs(slope).max() > 0:
+        peaks, properties = find_peaks(np.abs(slope), prominence=0)
+        output["prominence"] = (
+            properties["prominences"].max() / np.abs(slope).max() if len(peaks) else 0.0
+        )
+        output["monotonicity"] = abs(slope.sum()) / np.abs(slope).sum()
+
+    if np.isnan(output["snr"]):
+        output["reason"] = "signal-to-noise ratio is undefined"
+    elif output["snr"] < min_snr:
+        output["reason"] = "signal change is within noise (S/N {:.1f})".format(
+            output["snr"]
+        )
+    elif not np.isfinite(output["prominence"]):
+        output["reason"] = "derivative is undefined"
+    elif output["prominence"] < min_prominence:
+        output["reason"] = "no peak in the derivative (relative prominence {:.2f})".format(
+            output["prominence"]
+        )
+    return output
+
+
+def derivative_peaks(derivative, max_peaks=2, min_prominence=0.25):
+    """
+    Finds the transitions in the derivative of a curve
+
+    Parameters
+    ----------
+    derivative
+        pd.Series with the derivative (Temperature in index); it must be oriented so that the
+        transitions are maxima
+    max_peaks
+        the maximal number of peaks to return
+    min_prominence
+        the smallest prominence of a peak relative to the most prominent one
+
+    Returns
+    -------
+    a list of (temperature, width, prominence) tuples sorted by temperature, where width is the
+    full width at half maximum of the peak in temperature units (see MoltenProtModel.param_init_peaks);
+    the list is empty if there are no peaks or the derivative has missing values
+    """
+    from scipy.signal import find_peaks, peak_widths
+
+    T = np.float64(derivative.index.values)
+    values = np.float64(derivative.values)
+    if not np.isfinite(values).all():
+        return []
+    peaks, properties = find_peaks(values, prominence=0)
+    if len(peaks) == 0:
+        return []
+    prominences = properties["prominences"]
+    # keep the most prominent peaks
+    keep = np.argsort(prominences)[::-1][:max_peaks]
+    keep = keep[prominences[keep] >= min_prominence * prominences.max()]
+    peaks = peaks[keep]
+    # NOTE the widths are measured in datapoints, convert them to temperature (the step may be uneven)
+    _, _, left, right = peak_widths(values, peaks, rel_height=0.5)
+    positions = np.arange(len(T))
+    widths = np.interp(right, positions, T) - np.interp(left, positions, T)
+    return sorted(
+        (T[peak], width, prominence)
+        for peak, width, prominence in zip(peaks, widths, prominences[keep])
+        if width > 0
+    )
+
+
+class FitBudgetExceeded(Exception):
+    """
+    Raised by the model function when the fit of a sample ran out of its budget (see
+    max_nfev, fit_timeout and deadline in analysis_defaults)
+
+    Attributes
+    ----------
+    status
+        nfev_limit, timeout or deadline
+
+    Notes
+    -----
+    The budget is checked before each evaluation of the model function, so a single slow
+    evaluation (e.g. an ODE solve of a kinetic model) is not interrupted
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _FitBudget:
+    """
+    Counts the model evaluations of the fits of a dataset and stops a fit that ran out of
+    its budget (see max_nfev, fit_timeout and deadline in analysis_defaults, 0 - no limit)
+
+    Attributes
+    ----------
+    nfev
+        the number of model evaluations since the last call of start
+    """
+
+    def __init__(self, max_nfev=0, fit_timeout=0, deadline=0):
+        self.max_nfev = int(max_nfev)
+        self.fit_timeout = fit_timeout
+        self.deadline = deadline
+        self.deadline_time = perf_counter() + deadline if deadline > 0 else np.inf
+        self.fit_deadline_time = np.inf
+        self.nfev = 0
+
+    def start(self, timed=False):
+        """
+        Resets the evaluation counter for a new well; with timed=True the fit_timeout
+        of the well starts
+        """
+        self.nfev = 0
+        if timed and self.fit_timeout > 0:
+            self.fit_deadline_time = perf_counter() + self.fit_timeout
+        else:
+            self.fit_deadline_time = np.inf
+
+    def expired(self):
+        "Returns True if the deadline of the dataset has passed"
+        return perf_counter() > self.deadline_time
+
+    def check(self, count=True):
+        """
+        Raises FitBudgetExceeded if the fit ran out of its budget
+
+        Parameters
+        ----------
+        count
+            check the number of model evaluations, otherwise only the time limits
+            (e.g. for the Jacobian)
+        """
+        if count and self.max_nfev > 0 and self.nfev >= self.max_nfev:
+            raise FitBudgetExceeded(
+                "nfev_limit", "more than {} model evaluations".format(self.max_nfev)
+            )
+        now = perf_counter()
+        if now > self.deadline_time:
+            raise FitBudgetExceeded(
+                "deadline",
+                "dataset deadline of {} s has passed".format(self.deadline),
+            )
+        if now > self.fit_deadline_time:
+            raise FitBudgetExceeded(
+                "timeout", "fit took longer than {} s".format(self.fit_timeout)
+            )
+
+    def counted(self, function):
+        "Returns function that checks the budget and counts the evaluations"
+
+        def wrapper(*args):
+            self.check()
+            self.nfev += 1
+            return function(*args)
+
+        return wrapper
+
+    def timed(self, function):
+        "Returns function that only checks the time limits (the calls are not counted)"
+
+        def wrapper(*args):
+            self.check(count=False)
+            return function(*args)
+
+        return wrapper
+
+
+### Instrumentation
+
+
+def _instrumented(stage):
+    """
+    Decorator for MoltenProtFit methods: records the wall time of the method as an analysis stage
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._timed(stage):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _active_bounds(param_names, values, bounds, rtol=1e-6):
+    """
+    Returns the names of the fit parameters that ended up at their lower or upper bound
+
+    Parameters
+    ----------
+    param_names
+        names of the parameters
+    values
+        fitted values
+    bounds
+        a tuple of lower and upper bounds (scalars or one value per parameter), or None
+    """
+    if bounds is None:
+        return []
+    values = np.asarray(values, dtype=float)
+    active = np.zeros(len(values), dtype=bool)
+    for bound in bounds:
+        bound = np.broadcast_to(np.asarray(bound, dtype=float), values.shape)
+        finite = np.isfinite(bound)
+        active[finite] |= np.isclose(
+            values[finite], bound[finite], rtol=rtol, atol=rtol
+        )
+    return [name for name, is_active in zip(param_names, active) if is_active]
+
+
+def _trace_records(stages, wells):
+    """
+    Converts stage and well records (see MoltenProtFitMultiple.GetStageTimes/GetFitStatistics)
+    to a list of tuples (name, start, duration, process, thread, args) sorted by start time
+    """
+    # NOTE values are converted to Python types for JSON output
+    records = []
+    for row in stages.itertuples(index=False):
+        records.append(
+            (row.stage, float(row.start), float(row.time), int(row.pid), row.Dataset, {})
+        )
+    for row in wells.itertuples(index=False):
+        args = {
+            "nfev": int(row.nfev),
+            "status": row.status,
+            "bounds_active": row.bounds_active,
+        }
+        if row.baseline_time > 0:
+            records.append(
+                (
+                    "baseline {}".format(row.well),
+                    float(row.start),
+                    float(row.baseline_time),
+                    int(row.pid),
+                    row.Dataset,
+                    {},
+                )
+            )
+        records.append(
+            (
+                "fit {}".format(row.well),
+                float(row.start + row.baseline_time),
+                float(row.fit_time),
+                int(row.pid),
+                row.Dataset,
+                args,
+            )
+        )
+    records.sort(key=lambda record: (record[1], -record[2]))
+    return records
+
+
+def write_trace(stages, wells, filename, trace_format="chrome"):
+    """
+    Writes the analysis stages and per-well fits as a trace file
+
+    Parameters
+    ----------
+    stages, wells
+        DataFrames from MoltenProtFitMultiple.GetStageTimes and GetFitStatistics
+    filename
+        output file
+    trace_format
+        chrome - Chrome trace event format (chrome://tracing, Perfetto)
+        speedscope - speedscope evented profiles (one profile per dataset)
+    """
+    records = _trace_records(stages, wells)
+    t0 = min((record[1] for record in records), default=0)
+    if trace_format == "chrome":
+        datasets = sorted(set(record[4] for record in records))
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": datasets.index(dataset),
+                "args": {"name": dataset},
+            }
+            for pid, dataset in sorted(set((record[3], record[4]) for record in records))
+        ]
+        for name, start, duration, pid, dataset, args in records:
+            events.append(
+                {
+                    "name": name,
+                    "cat": "moltenprot",
+                    "ph": "X",
+                    "ts": (start - t0) * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": pid,
+                    "tid": datasets.index(dataset),
+                    "args": args,
+                }
+            )
+        output = {"traceEvents": events, "displayTimeUnit": "ms"}
+    elif trace_format == "speedscope":
+        frames = []
+        frame_ids = {}
+        profiles = []
+        for dataset in sorted(set(record[4] for record in records)):
+            events = []
+            stack = []  # end times of the open frames
+            for name, start, duration, _, record_dataset, _ in records:
+                if record_dataset != dataset:
+                    continue
+                start -= t0
+                # close the frames that ended, clip the new one to its parent (evented profiles must nest)
+                while stack and stack[-1][1] <= start:
+                    frame, end = stack.pop()
+                    events.append({"type": "C", "frame": frame, "at": end})
+                end = start + duration
+                if stack:
+                    end = min(end, stack[-1][1])
+                if name not in frame_ids:
+                    frame_ids[name] = len(frames)
+                    frames.append({"name": name})
+                events.append({"type": "O", "frame": frame_ids[name], "at": start})
+                stack.append((frame_ids[name], end))
+            while stack:
+                frame, end = stack.pop()
+                events.append({"type": "C", "frame": frame, "at": end})
+            profiles.append(
+                {
+                    "type": "evented",
+                    "name": dataset,
+                    "unit": "seconds",
+                    "startValue": events[0]["at"] if events else 0,
+                    "endValue": max((i["at"] for i in events), default=0),
+                    "events": events,
+                }
+            )
+        output = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+            "name": "MoltenProt analysis",
+            "exporter": "MoltenProt " + __version__,
+        }
+    else:
+        raise ValueError("Unknown trace format '{}'".format(trace_format))
+    with open(filename, "w") as file:
+        json.dump(output, file)
+
+
+def _profiled_call(function, *args, **kwargs):
+    """
+    Runs a function under cProfile (used in joblib worker processes)
+
+    Returns
+    -------
+    a tuple of the return value and the raw profile statistics (a picklable dict)
+    """
+    import cProfile
+
+    profile = cProfile.Profile()
+    result = profile.runcall(function, *args, **kwargs)
+    profile.create_stats()
+    return result, profile.stats
+
+
+class _RawStats:
+    """
+    Wraps raw profile statistics, so that they can be loaded by pstats.Stats
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class RunProfiler:
+    """
+    Collects cProfile statistics of an analysis run, including the joblib worker processes
+
+    The main process is profiled while the profiler is entered as a context manager (nested
+    entries are allowed). The methods of MoltenProtFitMultiple that accept a profile argument
+    enter the profiler themselves and run the worker tasks under cProfile as well; the
+    statistics of the workers are merged with the main process.
+
+    Example
+    -------
+    profiler = RunProfiler()
+    mp.PrepareAndAnalyseAll(n_jobs=4, profile=profiler)
+    mp.WriteOutputAll(outfolder, n_jobs=4, profile=profiler)
+    profiler.write(outfolder)
+    """
+
+    def __init__(self):
+        import cProfile
+
+        self._profile = cProfile.Profile()
+        self._depth = 0
+        self._worker_stats = []
+
+    def __enter__(self):
+        if self._depth == 0:
+            self._profile.enable()
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            self._profile.disable()
+
+    def collect(self, results):
+        """
+        Takes the outputs of _profiled_call from the workers, stores the statistics and
+        returns the list of the actual results
+        """
+        output = []
+        for result, stats in results:
+            self._worker_stats.append(stats)
+            output.append(result)
+        return output
+
+    def get_stats(self, stream=None):
+        """
+        Returns
+        -------
+        pstats.Stats with the merged statistics of the main and worker processes
+        """
+        import pstats
+
+        self._profile.create_stats()
+        merged = pstats.Stats(_RawStats(dict(self._profile.stats)), stream=stream)
+        for stats in self._worker_stats:
+            merged.add(_RawStats(stats))
+        return merged
+
+    def write(self, folder, top=30):
+        """
+        Writes the merged statistics to profile.prof (readable by pstats, snakeviz etc)
+        and the top functions by cumulative and own time to profile_hotspots.txt
+
+        Parameters
+        ----------
+        folder
+            output folder
+        top
+            amount of functions in the hotspot summary
+        """
+        with open(os.path.join(folder, "profile_hotspots.txt"), "w") as file:
+            stats = self.get_stats(stream=file)
+            stats.dump_stats(os.path.join(folder, "profile.prof"))
+            file.write(
+                "MoltenProt {} profile, {} worker task(s) merged\n".format(
+                    __version__, len(self._worker_stats)
+                )
+            )
+            stats.sort_stats("cumulative").print_stats(top)
+            stats.sort_stats("tottime").print_stats(top)
+
+
 ### Classes
 
 
+class CurvePlotter:
+    """
+    Renders plots of individual wells (data, fit, baselines, derivative) using a single
+    figure that is created only once
+
+    Attributes
+    ----------
+    figure
+        matplotlib Figure with the data and derivative axes
+    canvas
+        Agg canvas attached to the figure, used to write PNG files
+
+    Notes
+    -----
+    The appearance of the plots is the same as in MoltenProtFit.plotfig, but the figure,
+    axes and line artists are re-used: for each well only the line data, axis limits and
+    labels are updated. This avoids the costly set-up of a new figure for every well.
+    """
+
+    def __init__(self, readout_type, xlim, plotlines, dpi=100):
+        """
+        Parameters
+        ----------
+        readout_type
+            the name of the readout (for plot Y-axis)
+        xlim
+            the range for x-axis in overview plots
+        plotlines
+            names of the parameters shown as vertical lines in overview plots
+        dpi
+            resolution of the output images
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        self.xlim = xlim
+        self.readout_type = readout_type
+        # NOTE currently all internal manipulations are done in K
+        self.xlabel = "Temperature, K"
+
+        self.figure = Figure(figsize=(8, 7), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        gs = self.figure.add_gridspec(3, 1, height_ratios=[4, 2, 0.05])
+        self.data_ax = self.figure.add_subplot(gs[0])
+        self.deriv_ax = self.figure.add_subplot(gs[1])
+
+        # line artists are created empty and their data is set for each well
+        (self.data_line,) = self.data_ax.plot([], [], "k.", mew=1, label="Experiment")
+        (self.fit_line,) = self.data_ax.plot([], [], label="Fit")
+        (self.post_line,) = self.data_ax.plot(
+            [], [], label="Post- baseline", linestyle="--"
+        )
+        (self.pre_line,) = self.data_ax.plot(
+            [], [], label="Pre- baseline", linestyle="--"
+        )
+        (self.deriv_line,) = self.deriv_ax.plot([], [], color="k")
+
+        # vertical lines and their text labels (not shown in the legend)
+        self.vlines = []
+        for parameter_name in plotlines:
+            vline = self.data_ax.axvline(0, ls="dotted", c="b", lw=3)
+            vtext = self.data_ax.text(0, 0, " " + parameter_name, fontsize=12)
+            self.vlines.append((vline, vtext))
+
+        self.legend = self.figure.legend(
+            handles=[self.data_line, self.fit_line, self.post_line, self.pre_line],
+            loc="lower center",
+            ncol=4,
+            fontsize=12,
+        )
+
+        self.data_ax.grid(True, which="both")
+        self.deriv_ax.grid(True, which="both")
+        self.deriv_ax.set_xlabel(self.xlabel)
+        self.deriv_ax.set_ylabel("d({})/dT".format(readout_type))
+        self.deriv_ax.set_xlim(xlim)
+
+    def render(
+        self,
+        outfile,
+        wellID,
+        temperature,
+        signal,
+        fit=None,
+        derivative=None,
+        baselines=None,
+        vlines=None,
+    ):
+        """
+        Update the figure with the data of a single well and write it to a PNG file
+
+        Parameters
+        ----------
+        outfile
+            where to write the image
+        wellID
+            sample ID (used in the title)
+        temperature
+            array with temperature values
+        signal
+            array with the experimental signal
+        fit, derivative
+            arrays with the fit curve and the derivative; if fit is None, only the
+            experimental data is shown (as done for failed/excluded samples)
+        baselines
+            a tuple of (kN, bN, kU, bU) for pre- and post-transition baselines
+        vlines
+            a list of values for the vertical lines (same order as plotlines)
+        """
+        overview = fit is not None
+        self.data_line.set_data(temperature, signal)
+
+        for artist in (self.fit_line, self.post_line, self.pre_line, self.legend):
+            artist.set_visible(overview)
+        for vline, vtext in self.vlines:
+            vline.set_visible(overview)
+            vtext.set_visible(overview)
+        self.deriv_ax.set_visible(overview)
+
+        if overview:
+            self.fit_line.set_data(temperature, fit)
+            kN, bN, kU, bU = baselines
+            self.pre_line.set_data(temperature, kN * temperature + bN)
+            self.post_line.set_data(temperature, kU * temperature + bU)
+            self.deriv_line.set_data(temperature, derivative)
+
+            # calculate the offsets for the plot based on the overall length
+            max_val = np.nanmax(signal)
+            min_val = np.nanmin(signal)
+            y_range = max_val - min_val
+            self.data_ax.set_ylim([min_val - 0.1 * y_range, max_val + 0.1 * y_range])
+            self.data_ax.set_xlim(self.xlim)
+            for (vline, vtext), value in zip(self.vlines, vlines):
+                vline.set_xdata([value, value])
+                vtext.set_position((value, min_val - 0.05 * y_range))
+
+            self.deriv_ax.relim()
+            self.deriv_ax.autoscale_view(scalex=False)
+            self.data_ax.set_ylabel(self.readout_type)
+            # the X-label is shown on the derivative axes
+            self.data_ax.set_xlabel("")
+        else:
+            self.data_ax.set_autoscale_on(True)
+            self.data_ax.relim(visible_only=True)
+            self.data_ax.autoscale_view()
+            self.data_ax.set_ylabel(self.readout_type)
+            self.data_ax.set_xlabel(self.xlabel)
+
+        self.data_ax.set_title("Sample " + str(wellID), fontsize=12, y=1.05)
+        self.canvas.print_png(outfile)
+
+
+# the most recently used CurvePlotter of a worker process (kept between batches)
+_worker_plotters = {}
+
+
+def _render_well_plots(output_path, plotter_kwargs, well_data, plotters=None):
+    """
+    Plot a list of wells with a single CurvePlotter instance (used by parallel workers)
+
+    Parameters
+    ----------
+    output_path
+        folder where the images are written
+    plotter_kwargs
+        keyword arguments to create a CurvePlotter
+    well_data
+        a list of dicts as returned by MoltenProtFit._plot_data
+    plotters
+        a dict to keep the CurvePlotter between calls (default: the one of the worker process)
+
+    Returns
+    -------
+    number of written images
+    """
+    if plotters is None:
+        plotters = _worker_plotters
+    # NOTE the figure template is only re-created if the dataset changes
+    cache_key = repr(sorted(plotter_kwargs.items()))
+    plotter = plotters.get(cache_key)
+    if plotter is None:
+        plotters.clear()
+        plotter = CurvePlotter(**plotter_kwargs)
+        plotters[cache_key] = plotter
+    for well in well_data:
+        plotter.render(
+            os.path.join(output_path, str(well["wellID"]) + ".png"), **well
+        )
+    return len(well_data)
+
+
+def _batched(iterable, batch_size):
+    """
+    Helper generator to split an iterable into lists of batch_size elements
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class PlotService:
+    """
+    Renders plots of individual wells in a pool of persistent worker processes
+
+    The pool is started when entering the context and is shared by all render() calls,
+    so the workers import matplotlib and build the figure template only once. Only
+    compact per-well arrays are sent to the workers. The number of batches in flight is
+    limited, so that the memory use does not grow with the size of the plate.
+
+    Example
+    -------
+    with PlotService(n_jobs=4) as plot_service:
+        plot_service.render(output_path, plotter_kwargs, well_data)
+    """
+
+    def __init__(self, n_jobs=1, batch_size=8, max_pending=None, profiler=None):
+        """
+        Parameters
+        ----------
+        n_jobs
+            number of worker processes; with 1 (or without joblib) plots are rendered in the main process
+        batch_size
+            number of wells sent to a worker at once
+        max_pending
+            maximum number of batches in flight (default: two per worker)
+        profiler
+            a RunProfiler to collect the profile statistics of the worker tasks
+        """
+        self.n_jobs = n_jobs if parallelization else 1
+        self.profiler = profiler
+        self.batch_size = batch_size
+        if max_pending is None:
+            max_pending = 2 * self.n_jobs
+        self.max_pending = max_pending
+        self._parallel = None
+        # the CurvePlotter for serial rendering (workers keep their own)
+        self._plotters = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._plotters.clear()
+        if self._parallel is not None:
+            self._parallel.__exit__(*exc_info)
+            self._parallel = None
+
+    def _get_parallel(self):
+        """
+        Returns the running joblib.Parallel instance (the pool is started on first use)
+        or None for serial rendering (also if joblib is not available)
+        """
+        if self.n_jobs > 1 and parallelization and self._parallel is None:
+            from joblib import Parallel
+
+            self._parallel = Parallel(n_jobs=self.n_jobs)
+            self._parallel.__enter__()
+        return self._parallel
+
+    def render(self, output_path, plotter_kwargs, well_data, total=None, progress=None):
+        """
+        Render plots for a collection of wells
+
+        Parameters
+        ----------
+        output_path
+            folder where the images are written
+        plotter_kwargs
+            keyword arguments to create a CurvePlotter
+        well_data
+            an iterable (preferably a generator) of dicts as returned by MoltenProtFit._plot_data
+        total
+            total amount of wells (only used for progress reports)
+        progress
+            a callable accepting the number of rendered and total wells, called after each group of batches
+
+        Returns
+        -------
+        number of written images
+        """
+        batches = _batched(well_data, self.batch_size)
+        done = 0
+        while True:
+            # take only a limited amount of batches, the rest of the data is not yet created
+            wave = []
+            for batch in batches:
+                wave.append(batch)
+                if len(wave) == self.max_pending:
+                    break
+            if not wave:
+                break
+            if self._get_parallel() is None:
+                tasks = (
+                    (output_path, plotter_kwargs, batch, self._plotters)
+                    for batch in wave
+                )
+            else:
+                tasks = ((output_path, plotter_kwargs, batch) for batch in wave)
+            done += sum(self.map(_render_well_plots, tasks))
+            if progress is not None:
+                progress(done, total)
+        return done
+
+    def map(self, function, tasks):
+        """
+        Run a module-level function for each set of arguments in the worker pool
+
+        Parameters
+        ----------
+        function
+            a picklable function
+        tasks
+            an iterable of argument tuples
+
+        Returns
+        -------
+        list of results in the same order as tasks
+        """
+        parallel = self._get_parallel()
+        if parallel is None:
+            return [function(*args) for args in tasks]
+        from joblib import delayed
+
+        if self.profiler is not None:
+            return self.profiler.collect(
+                parallel(delayed(_profiled_call)(function, *args) for args in tasks)
+            )
+        return parallel(delayed(function)(*args) for args in tasks)
+
+
+def _draw_well(
+    axis,
+    readout_type,
+    xlim,
+    plotlines,
+    wellID,
+    temperature,
+    signal,
+    fit=None,
+    derivative=None,
+    baselines=None,
+    vlines=None,
+):
+    """
+    Draw a single well in the axes of a PDF report page
+
+    Parameters
+    ----------
+    axis
+        matplotlib axes to draw in
+    readout_type, xlim, plotlines
+        same as for CurvePlotter
+    wellID, temperature, signal, fit, baselines, vlines
+        same as for CurvePlotter.render; the derivative is not shown in PDF reports
+
+    Notes
+    -----
+    The appearance is the same as in MoltenProtFit.plotfig with data_ax and vline_legend
+    """
+    axis.plot(temperature, signal, "k.", mew=1, label="Experiment")
+    axis.set_ylabel(readout_type)
+    axis.set_xlabel("Temperature, K")
+    axis.set_title("Sample " + str(wellID), fontsize=12, y=1.05)
+    axis.grid(True, which="both")
+    if fit is None:
+        # failed/excluded samples: only the experimental data
+        return
+
+    axis.plot(temperature, fit, label="Fit")
+    max_val = np.nanmax(signal)
+    min_val = np.nanmin(signal)
+    y_range = max_val - min_val
+    axis.set_ylim([min_val - 0.1 * y_range, max_val + 0.1 * y_range])
+    axis.set_xlim(xlim)
+
+    kN, bN, kU, bU = baselines
+    axis.plot(
+        temperature, kU * temperature + bU, label="Post- baseline", linestyle="--"
+    )
+    axis.plot(temperature, kN * temperature + bN, label="Pre- baseline", linestyle="--")
+    for parameter_name, value in zip(plotlines, vlines):
+        axis.axvline(value, ls="dotted", c="b", lw=3, label=parameter_name)
+        axis.text(value, min_val - 0.05 * y_range, " " + parameter_name, fontsize=12)
+
+
+def _curve_page(title, plotter_kwargs, well_data, page_label=None):
+    """
+    Create a PDF report page with plots of up to 11 wells and a legend
+
+    Parameters
+    ----------
+    title
+        page title
+    plotter_kwargs
+        readout_type, xlim and plotlines of the dataset
+    well_data
+        a list of dicts as returned by MoltenProtFit._plot_data
+    page_label
+        text in the bottom of the page (page number), None if it is added later (see _merge_pdf)
+
+    Returns
+    -------
+    matplotlib Figure
+    """
+    from matplotlib.figure import Figure
+
+    page = Figure(figsize=(8.3, 11.7))
+    page.suptitle(title, fontweight="bold", fontsize="x-large")
+    plot_axs = list(page.subplots(4, 3, sharex=False, sharey=False).flat)
+    for axis, data in zip(plot_axs, well_data):
+        _draw_well(axis, **plotter_kwargs, **data)
+    # make legend in the next axes and hide remaining unused axes
+    plot_counter = len(well_data)
+    plot_axs[plot_counter].legend(
+        handles=plot_axs[plot_counter - 1].get_lines(), mode="expand", ncol=1
+    )
+    for axis in plot_axs[plot_counter:]:
+        axis.set_axis_off()
+    page.tight_layout(rect=(0.02, 0.05, 0.98, 0.95))  # rect leaves some margins empty
+    if page_label is not None:
+        _add_page_label(page, page_label)
+    return page
+
+
+def _add_page_label(page, page_label):
+    """
+    Write the page label (page number) in the bottom of a report page
+    """
+    page.text(0.5, 0.025, page_label, fontstyle="italic", ha="center")
+
+
+def _render_pdf_page(outfile, title, plotter_kwargs, well_data):
+    """
+    Write a single-page PDF with plots of individual wells (without page label)
+
+    Returns
+    -------
+    outfile
+    """
+    page = _curve_page(title, plotter_kwargs, well_data)
+    # write to a temporary name first, so that an interrupted run leaves no broken pages
+    page.savefig(outfile + ".tmp", format="pdf")
+    os.replace(outfile + ".tmp", outfile)
+    return outfile
+
+
+def _pdf_page_key(title, plotter_kwargs, well_data):
+    """
+    Returns a hash of everything that is shown on a PDF report page with well plots
+
+    Notes
+    -----
+    The page label is not part of the key (it is added in _merge_pdf), so the pages
+    can be re-used when the number of pages in the report changes
+    """
+    digest = hashlib.sha1(
+        repr((__version__, title, sorted(plotter_kwargs.items()))).encode()
+    )
+    for data in well_data:
+        for key in sorted(data):
+            value = data[key]
+            digest.update(key.encode())
+            if isinstance(value, np.ndarray):
+                digest.update(np.ascontiguousarray(value).tobytes())
+            else:
+                digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+def _merge_pdf(page_files, outfile, page_labels):
+    """
+    Merge single-page PDF files into one document (in the order of page_files)
+    and write the page labels on the pages
+    """
+    from matplotlib.figure import Figure
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for page_file, page_label in zip(page_files, page_labels):
+        writer.append(page_file)
+        # the label is drawn on an empty transparent page of the same size
+        # and put on top of the report page
+        label_page = Figure(figsize=(8.3, 11.7))
+        _add_page_label(label_page, page_label)
+        label_pdf = BytesIO()
+        label_page.savefig(label_pdf, format="pdf", transparent=True)
+        writer.pages[-1].merge_page(PdfReader(label_pdf).pages[0])
+    with open(outfile, "wb") as pdf_file:
+        writer.write(pdf_file)
+
+
 class MoltenProtFit:
     """
     Stores and analyses a single dataset
@@ -456,6 +1857,7 @@ class MoltenProtFit:
     filename - the name of the input file
     Lists holding removed wells:
     bad_fit - ID of wells that could not be fit
+    over_budget - ID of wells whose fit was stopped by max_nfev, fit_timeout or deadline
     blanks - blank wells (subtracted prior to analysis) -> now part of SetAnalysisOptions
     exclude - supplied by user through --exclude option -> now part of SetAnalysisOptions
     bad_Tm - the melting temperature is out of range of T
@@ -464,7 +1866,8 @@ class MoltenProtFit:
     Notes
     -----
     This is an internal class, do not create it manually.
-    All official messages must be sent through print_message() method (enforces selecting message type)
+    All official messages must be sent through print_message() method (enforces selecting message type),
+    the messages are recorded in the events attribute and rendered to protocolString
     Output information style:
     "Fatal: " - error that causes the program to stop
     "Warning: " - something may be messed up, but the program can proceed
@@ -601,9 +2004,23 @@ class MoltenProtFit:
         self.plate_raw_corr = None
         self.baseline_fit = None
         self.baseline_bounds = None
+        self.varpro = analysis_defaults["varpro"]
+        self.prescreen = analysis_defaults["prescreen"]
+        self.peak_init = analysis_defaults["peak_init"]
+        self.coarse = analysis_defaults["coarse"]
+        self.max_nfev = analysis_defaults["max_nfev"]
+        self.fit_timeout = analysis_defaults["fit_timeout"]
+        self.deadline = analysis_defaults["deadline"]
+        self.compare_models = analysis_defaults["compare_models"]
         self.invert = None
         self.plate_results = None
         self.plate_results_stdev = None
+        # timings of analysis stages and per-well fit statistics (lists of dicts)
+        self.instrumentation = {"stages": [], "wells": []}
+        # messages printed during the analysis (a list of dicts, see print_message)
+        self.events = []
+        # starting parameters from another dataset (see SetWarmStart)
+        self.warm_start = None
 
         if input_type == "from_dict":
             # this would return an empty object
@@ -612,8 +2029,6 @@ class MoltenProtFit:
         else:
             # NOTE the logic of overwriting etc is handled by CLI/GUI code
             self.resultfolder = None
-            # attribute to hold diagnostic messages.
-            self.protocolString = ""
             self.scan_rate = scan_rate
             self.fixed_params = None
             # load the dataset into the plate variable
@@ -634,7 +2049,9 @@ class MoltenProtFit:
                 # the filename is needed for report title
                 self.filename = filename
             elif input_type == "from_xlsx":
-                self.plate = filename
+                # work on a copy: the index is converted to Kelvins below
+                # and the caller's DataFrame must stay untouched
+                self.plate = filename.copy()
                 # BUG this is only needed for report generation, a dummy value
                 # Ideally, it should be the name of parent xlsx file
                 self.filename = parent_filename
@@ -681,6 +2098,95 @@ class MoltenProtFit:
         output["plotfig"] = self.plotfig
         return output
 
+    def _record_stage(self, stage, start, duration):
+        """
+        Adds a stage record to instrumentation
+
+        Parameters
+        ----------
+        stage
+            stage name
+        start
+            start time (seconds since epoch)
+        duration
+            wall time in seconds
+        """
+        # sessions from older versions have no instrumentation
+        instrumentation = self.__dict__.setdefault(
+            "instrumentation", {"stages": [], "wells": []}
+        )
+        instrumentation["stages"].append(
+            {"stage": stage, "start": start, "time": duration, "pid": os.getpid()}
+        )
+
+    @contextmanager
+    def _timed(self, stage):
+        """
+        Context manager that records the wall time of the enclosed code as an analysis stage
+        """
+        start = time()
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self._record_stage(stage, start, perf_counter() - started)
+
+    def GetStageTimes(self):
+        """
+        Returns a DataFrame with the wall time (in s) of the analysis stages of the last run
+
+        Notes
+        -----
+        * stages may be nested (e.g. fit and CalculateThermodynamic are part of ProcessData)
+        * start is the time in seconds since epoch, pid is the process that ran the stage
+        """
+        return pd.DataFrame(
+            getattr(self, "instrumentation", {}).get("stages", []),
+            columns=["stage", "start", "time", "pid"],
+        )
+
+    def GetFitStatistics(self):
+        """
+        Returns a DataFrame with fit statistics of each well in the last run
+
+        Columns
+        -------
+        well, model
+        start
+            time when the processing of the well started (seconds since epoch)
+        baseline_time, fit_time
+            wall time (in s) of the baseline pre-fitting and of the curve fitting
+        nfev
+            number of model function evaluations (including those for the Jacobian)
+        status
+            converged, failed, skipped (by the pre-screen, see prescreen_curve),
+            nfev_limit, timeout or deadline (the fit ran out of its budget, see FitBudgetExceeded)
+        message
+            the error message of a failed fit or the reason to skip or stop the fit
+        bounds_active
+            comma-separated parameters that ended up at their bounds
+        backend
+            numpy or numba (compiled model functions, see jit.py)
+        pid
+            the process that ran the fit
+        """
+        return pd.DataFrame(
+            getattr(self, "instrumentation", {}).get("wells", []),
+            columns=[
+                "well",
+                "model",
+                "start",
+                "baseline_time",
+                "fit_time",
+                "nfev",
+                "status",
+                "message",
+                "bounds_active",
+                "backend",
+                "pid",
+            ],
+        )
+
     def converter96(self, use_column, reference=None):
         """
         Reads self.plate_results with well ID in the index (A1, A2 etc) and some values in columns (Tm_fit, etc) and returns a DataFrame emulating a 96-well plate where each well has a normalized respective column value.
@@ -702,29 +2208,30 @@ class MoltenProtFit:
         Reference code _was not maintained_ for a while and is probably faulty!
         """
 
-        # create a DataFrame emulating a 96-well plate
-        output = pd.DataFrame(
-            index=["A", "B", "C", "D", "E", "F", "G", "H"],
-            columns=list(range(1, 13)),
-            dtype=np.float32,
-        )
-
+        self.print_message("Creating heatmap for column {}".format(use_column), "i")
         # check if the use_column value is a valid one
-        self.print_message(
-            "Creating heatmap for column {}".format(
-                self.plate_results[use_column].name
-            ),
-            "i",
+        if use_column in self.plate_results.columns:
+            # NOTE non-numeric columns raise a ValueError here
+            values = self.plate_results[use_column].astype(np.float32)
+        else:
+            self.print_message(
+                "Column {} not found in the results, the heatmap will be empty".format(
+                    use_column
+                ),
+                "w",
+            )
+            values = pd.Series(index=self.plate_results.index, dtype=np.float32)
+
+        # create a DataFrame emulating a plate (96-well or bigger, if needed)
+        # the values are placed in the plate by reindexing to the plate's well IDs
+        n_rows, n_cols = plate_shape(values.index)
+        well_ids = plate_index(n_rows, n_cols)
+        output = pd.DataFrame(
+            values.reindex(well_ids).values.reshape(n_rows, n_cols),
+            index=row_labels(n_rows),
+            columns=list(range(1, n_cols + 1)),
+            dtype=np.float32,
         )
-        for i in output.index:
-            for j in output.columns:
-                a = i + str(j)
-                if (use_column in self.plate_results.columns) and (
-                    a in self.plate_results.index
-                ):
-                    output.loc[[i], [j]] = np.float32(
-                        self.plate_results.loc[a, use_column]
-                    )
 
         # if reference value is supplied, subtract it from the values
         if reference is not None:
@@ -803,8 +2310,11 @@ class MoltenProtFit:
         save
             if True, save image to disk
         """
+        from matplotlib import colormaps
+        from matplotlib.figure import Figure
+
         # tweak colormap to have outside values colored as gray
-        cmap = plt.get_cmap(heatmap_cmap)
+        cmap = colormaps[heatmap_cmap].copy()
         cmap.set_over("0.5")
 
         # check if there are negative values
@@ -844,14 +2354,14 @@ class MoltenProtFit:
         # A4 is 8.3 x 11.7 inches, for report the whole page is needed
         # for other outputs we need half the hight (i.e. A5 in landscape orientation)
         if pdf_report:
-            # fig = plt.figure(figsize=(8.3, 11.7))
-            fig, ax = plt.subplots(3, 1, figsize=(8.3, 11.7))
+            fig = Figure(figsize=(8.3, 11.7))
+            ax = fig.subplots(3, 1)
             cbar_shrink = 0.3
             cbar_orient = "horizontal"
             heatmap_axis = ax[0]
             axis_aspect = ["auto"]
         else:
-            fig = plt.figure(figsize=(8.3, 11.7 / 2), tight_layout=True)
+            fig = Figure(figsize=(8.3, 11.7 / 2), tight_layout=True)
             cbar_shrink = 8 / 12
             cbar_orient = "vertical"
             heatmap_axis = fig.gca()
@@ -870,18 +2380,8 @@ class MoltenProtFit:
         """
         c = heatmap_axis.pcolor(plate96, edgecolors="k", cmap=cmap, vmin=vmin, vmax=1)
 
-        # cycle through all wells and write there the ID
-        for i in plate96.index:
-            for j in plate96.columns:
-                x = plate96.columns.get_loc(j)
-                y = plate96.index.get_loc(i)
-                heatmap_axis.text(
-                    x + 0.5,
-                    y + 0.5,
-                    i + str(j),
-                    horizontalalignment="center",
-                    verticalalignment="center",
-                )
+        # write the well IDs in the centers of the cells (a single artist for all labels)
+        heatmap_axis.add_collection(_well_labels(heatmap_axis, plate96), autolim=False)
 
         # y axis has to be inverted so that well A1 is in top left corner
         heatmap_axis.invert_yaxis()
@@ -909,17 +2409,16 @@ class MoltenProtFit:
             return (fig, ax)
 
         if save:
-            plt.savefig(
+            fig.savefig(
                 os.path.join(output_path, "heatmap_" + str(use_column) + ".png"),
                 dpi=(200),
-                tight_layout=True,
+                # NOTE savefig does not accept tight_layout, crop the margins instead
+                bbox_inches="tight",
             )
-        # clean up after plotting so that no parameters are carried over to genpics
-        plt.close("all")
 
-    def print_message(self, text, message_type):
+    def print_message(self, text, message_type, well=None):
         """
-        Prints messages and saves them to protocolString
+        Logs a message and records it in events
 
         Parameters
         ----------
@@ -927,28 +2426,44 @@ class MoltenProtFit:
             message text
         message_type : i/w/f
             type of message (Information, Warning, Fatal)
+        well
+            the well that the message is about (if any)
         """
-
-        # line No and file name are only printed in debug mode and only for Fatals and Warnings
-        if self.debug and (message_type != "i"):
-            curr_frame = currentframe()
-            curr_file = getframeinfo(curr_frame).filename
-            print("Line {}, in file {}".format(curr_frame.f_back.f_lineno, curr_file))
+        if message_type not in message_levels:
+            raise ValueError("Unknown message type '{}'".format(message_type))
+        event = {
+            "type": message_type,
+            "text": text,
+            "dataset": self.readout_type,
+            "well": well,
+        }
+        _log_event(event, self.debug)
         if message_type == "f":
-            print("Fatal: " + text + " ({})".format(self.readout_type))
             sys.exit(1)
-        elif message_type == "w":
-            msg = "Warning: " + text + " ({})".format(self.readout_type)
-            print(msg)
-            msg = msg + "\n"
-            self.protocolString = self.protocolString + msg
-        elif message_type == "i":
-            msg = "Information: " + text + " ({})".format(self.readout_type)
-            print(msg)
-            msg = msg + "\n"
-            self.protocolString = self.protocolString + msg
-        else:
-            raise ValueError("Unknown message type '{}'".format(message_type))
+        self.events.append(event)
+
+    @property
+    def protocolString(self):
+        """
+        Text protocol of the analysis (all Information and Warning messages), rendered from events
+        """
+        # NOTE sessions from older versions contain the protocol as text
+        return self.__dict__.get("protocolString", "") + "".join(
+            format_event(event) + "\n" for event in self.__dict__.get("events", [])
+        )
+
+    @protocolString.setter
+    def protocolString(self, value):
+        self.__dict__["protocolString"] = value
+        self.events = []
+
+    def GetMessages(self):
+        """
+        Returns a DataFrame with the messages (columns type, text, dataset, well)
+        """
+        return pd.DataFrame(
+            self.__dict__.get("events", []), columns=["type", "text", "dataset", "well"]
+        )
 
     def _calculate_raw_corr(self):
         """
@@ -999,10 +2514,9 @@ class MoltenProtFit:
 
         self.plate.apply(calculate_raw_corr_series)
 
-    def _estimate_baseline(self, input_series, fit_length, estimate_Tm=False):
+    def _fit_baselines(self, input_series, fit_length):
         """
-        Estimates pre- and post-transition baselines for a series
-        function for a single Series (index is Temperature, name is sample ID, values are RFU's)
+        Fits straight lines to the start and the end of a series
 
         Parameters
         ----------
@@ -1010,8 +2524,11 @@ class MoltenProtFit:
             pd.Series with Temperature in index, name is sample ID, values are the signal
         fit_length
             number of degrees to be used from the start or end of data for fitting
-        estimate_Tm
-            additionally estimate melting temperature Tm with a heuristic
+
+        Returns
+        -------
+        a tuple with the coefficients of the pre-transition line, their covariance matrix
+        and the coefficients of the post-transition line (see np.polyfit)
         """
         # convert fit length in temperature degrees to datapoint number (using self.dT)
         fit_datapoints = int(fit_length / self.dT)
@@ -1032,6 +2549,31 @@ class MoltenProtFit:
             1,
             cov=True,
         )
+        return pre_fit, pre_covm, post_fit
+
+    def _estimate_baseline(
+        self, input_series, fit_length, estimate_Tm=False, baseline_cache=None
+    ):
+        """
+        Estimates pre- and post-transition baselines for a series
+        function for a single Series (index is Temperature, name is sample ID, values are RFU's)
+
+        Parameters
+        ----------
+        input_series
+            pd.Series with Temperature in index, name is sample ID, values are the signal
+        fit_length
+            number of degrees to be used from the start or end of data for fitting
+        estimate_Tm
+            additionally estimate melting temperature Tm with a heuristic
+        baseline_cache
+            a dict with the results of _fit_baselines for sample IDs, used instead of fitting
+            the baselines again (e.g. when several models are fit to the same data)
+        """
+        if baseline_cache is not None and input_series.name in baseline_cache:
+            pre_fit, pre_covm, post_fit = baseline_cache[input_series.name]
+        else:
+            pre_fit, pre_covm, post_fit = self._fit_baselines(input_series, fit_length)
         self.plate_results.loc[["kN_init"], [input_series.name]] = pre_fit[0]
         self.plate_results.loc[["bN_init"], [input_series.name]] = pre_fit[1]
         self.plate_results.loc[["kU_init"], [input_series.name]] = post_fit[0]
@@ -1078,12 +2620,74 @@ class MoltenProtFit:
                             input_series.name
                         ),
                         "w",
+                        well=input_series.name,
                     )
                     self.print_message(
-                        "Using the middle of temperature range as Tm_init", "i"
+                        "Using the middle of temperature range as Tm_init",
+                        "i",
+                        well=input_series.name,
                     )
                     self.plate_results.loc["Tm_init", input_series.name] = tmid
 
+    def _estimate_transitions(self, well, data, model, param_bounds):
+        """
+        Sets the starting values of the transition parameters of a well from the peaks
+        of the derivative (see derivative_peaks and MoltenProtModel.param_init_peaks)
+
+        Parameters
+        ----------
+        well
+            sample ID
+        data
+            pd.Series with the signal that is fit (Temperature in index)
+        model
+            the model instance used for fitting
+        param_bounds
+            parameter bounds used for fitting, the starting values are kept within them
+
+        Notes
+        -----
+        The baselines must be estimated first (_estimate_baseline): the direction of the
+        transition is taken from the baselines, so that the transitions are maxima of the derivative
+        """
+        init_index = self.plate_results.index[: len(model.param_names())]
+        p0 = self.plate_results.loc[init_index, well]
+        # the difference between the post- and pre-transition baselines in the middle of the range
+        T_mid = (min(data.index) + max(data.index)) / 2
+        b_diff = (p0["kU_init"] - p0["kN_init"]) * T_mid + p0["bU_init"] - p0["bN_init"]
+        derivative = self.plate_derivative[well].loc[data.index]
+        peaks = derivative_peaks(derivative if b_diff >= 0 else -derivative)
+        if not peaks:
+            return
+        p0 = np.array(model.param_init_peaks(list(p0), peaks), dtype=float)
+        if param_bounds is not None:
+            lower, upper = (
+                np.broadcast_to(np.asarray(bound, dtype=float), p0.shape)
+                for bound in param_bounds
+            )
+            p0 = np.clip(p0, lower, upper)
+        self.plate_results.loc[init_index, well] = p0
+
+    def _apply_warm_start(self, well, model, param_bounds):
+        """
+        Sets the starting values of the nonlinear parameters of a well from warm_start
+        (see SetWarmStart); the values are kept within param_bounds
+        """
+        param_names = model.param_names()
+        init_index = self.plate_results.index[: len(param_names)]
+        p0 = np.array(self.plate_results.loc[init_index, well], dtype=float)
+        lower, upper = (
+            np.broadcast_to(np.asarray(bound, dtype=float), p0.shape)
+            for bound in (param_bounds if param_bounds is not None else (-np.inf, np.inf))
+        )
+        for position, name in enumerate(param_names):
+            if name in model.linear_params or name not in self.warm_start.index:
+                continue
+            value = self.warm_start.loc[name, well]
+            if np.isfinite(value):
+                p0[position] = np.clip(value, lower[position], upper[position])
+        self.plate_results.loc[init_index, well] = p0
+
     def _calc_Tons(self, Tm_col, dHm_col, onset_threshold):
         """
         Computes onset temperature Tons based on supplied column names with dHm and Tm
@@ -1171,9 +2775,17 @@ class MoltenProtFit:
         """
         if data_ax is None:
             # create the figure object
-            fig = plt.figure(1, figsize=(8, 7))
+            if show:
+                # interactive display requires a figure managed by pyplot
+                import matplotlib.pyplot as plt
+
+                fig = plt.figure(figsize=(8, 7))
+            else:
+                from matplotlib.figure import Figure
+
+                fig = Figure(figsize=(8, 7))
             # create a specification for the relative plot sizes
-            gs = gridspec.GridSpec(3, 1, height_ratios=[4, 2, 0.05], figure=fig)
+            gs = fig.add_gridspec(3, 1, height_ratios=[4, 2, 0.05])
             # get objects of individual subplots
             data_ax = fig.add_subplot(gs[0])  # experimental data, fit, etc
             deriv_ax = fig.add_subplot(gs[1])  # the derivative
@@ -1250,8 +2862,10 @@ class MoltenProtFit:
                 self.print_message("Invalid plotting source requested", "w")
 
             if datatype == "derivative":
-                # for derivative plots plot all values
-                plt.plot(sourcedf[i].index.values, sourcedf[i], label=i)
+                # for derivative plots plot all values (in the lower axes if present)
+                (data_ax if deriv_ax is None else deriv_ax).plot(
+                    sourcedf[i].index.values, sourcedf[i], label=i
+                )
             else:
                 data_ax.plot(
                     sourcedf[i].index.values,
@@ -1336,11 +2950,56 @@ class MoltenProtFit:
             return None
         if show:
             plt.show()
+            plt.close(fig)
         elif save:
-            plt.savefig(output_path + "/" + str(i) + ".png", dpi=100)
-        plt.close("all")
+            fig.savefig(output_path + "/" + str(i) + ".png", dpi=100)
         return None
 
+    def _plot_data(self, wellID, datatype="overview"):
+        """
+        Collect the arrays needed by CurvePlotter to draw a single well
+
+        Parameters
+        ----------
+        wellID
+            from which well to plot
+        datatype
+            overview (data, fit, derivative) or raw (unprocessed data only)
+
+        Returns
+        -------
+        dict with keyword arguments for CurvePlotter.render
+        """
+        if datatype == "raw":
+            signal = self.plate_raw[wellID]
+            return {
+                "wellID": wellID,
+                "temperature": np.asarray(signal.index.values, dtype=np.float64),
+                "signal": signal.values,
+            }
+        signal = self.plate[wellID]
+        return {
+            "wellID": wellID,
+            "temperature": np.asarray(signal.index.values, dtype=np.float64),
+            "signal": signal.values,
+            "fit": self.plate_fit[wellID].values,
+            "derivative": self.plate_derivative[wellID].values,
+            "baselines": tuple(
+                self.plate_results.loc[wellID, ["kN_fit", "bN_fit", "kU_fit", "bU_fit"]]
+            ),
+            "vlines": list(self.plate_results.loc[wellID, self.plotlines]),
+        }
+
+    def _plotter_kwargs(self):
+        """
+        Returns the keyword arguments to create a CurvePlotter for this dataset
+        """
+        return {
+            "readout_type": self.readout_type,
+            "xlim": self.xlim,
+            "plotlines": self.plotlines,
+        }
+
     ## internal methods for creating HTML report elements
     def html_heatmap(self, heatmap_cmap, display):
         """
@@ -1360,50 +3019,52 @@ class MoltenProtFit:
         -----
         The heatmap that the user sees when opening the HTML will have display=table, all other will start as display=none
         """
+        from matplotlib import colormaps
+        from matplotlib.colors import rgb2hex
 
         # this string template corresponds to a single sample entry (has to be wrapped within rows)
         # NOTE when gray cells are clicked a window still pops up but says that there is no such image
         # due to limitations of possible attributes within html, the possible layout info is stored in the
         # title attribute which also gets displayed as a tooltip (and will be also shown in the bottom of the heatmap)
-        sample = '        <div class="Cell" onmouseover="mouseOver(this.id, this.title)" title="$CONDITION" id="$ID" onclick="window.open(window.currentHeatmap + \'_resources/$ID.png\',\'Sample $ID\', \'width=450,height=450\')" style="background-color:$COLOR">$ID</div>\n'
-        sample = Template(sample)
+        sample = '        <div class="Cell" onmouseover="mouseOver(this.id, this.title)" title="{CONDITION}" id="{ID}" onclick="openPlot(this.id)" style="background-color:{COLOR}">{ID}</div>\n'
         # row template
         # TODO add extra spaces for readability of output HTML file
-        row = '<div class="Row" id=$ROWNAME>\n$SAMPLES</div>'
-        row = Template(row)
+        row = '<div class="Row" id=Row_{ROWNAME}>\n{SAMPLES}</div>'
 
         # extract the heatmap from matplotlib
-        cmap = plt.get_cmap(heatmap_cmap)
+        cmap = colormaps[heatmap_cmap]
 
         # by convention the model-specific final sorting parameter is stored in the last column
         # TODO add support creating HTML heatmaps for an arbitrary column
         colors = self.plate_results.iloc[:, -1]
         colors = normalize(colors)
 
-        # convert numbers to HEX colors
-        colors = colors.apply(lambda x: rgb2hex(cmap(x)))
-
-        # outer cycle creates rows, inner cycle creates lines for 1-12
-        row_output = ""
-        for i in ["A", "B", "C", "D", "E", "F", "G", "H"]:
-            line = ""
-            for j in range(1, 13):
-                # if a respective color exists then colorise the <div>
-                # if not, then set it to "lightgray"
-                sample_id = str(i) + str(j)
-                # NOTE modify this line to add additional information (e.g. Tm) to the text under heatmap
-                CONDITION = self.layout["Condition"][sample_id]
-
-                if sample_id in colors.index:
-                    line = line + sample.substitute(
-                        ID=sample_id, COLOR=colors[sample_id], CONDITION=CONDITION
-                    )
-                else:
-                    # lightgray blends with mid-range of coolwarm, so change to gray
-                    line = line + sample.substitute(
-                        ID=sample_id, COLOR="gray", CONDITION=CONDITION
-                    )
-            row_output = row_output + row.substitute(ROWNAME="Row_" + i, SAMPLES=line)
+        # all wells of the plate (at least A1-H12) in row-major order
+        n_rows, n_cols = plate_shape(self.layout.index.union(colors.index))
+        well_ids = plate_index(n_rows, n_cols)
+        # convert numbers to HEX colors, the cells without a value are set to gray
+        # (lightgray blends with mid-range of coolwarm)
+        rgba = cmap(colors.values)
+        colors = pd.Series(
+            [rgb2hex(color) for color in rgba], index=colors.index, dtype=object
+        )
+        colors = colors.reindex(well_ids).fillna("gray")
+        # NOTE modify this line to add additional information (e.g. Tm) to the text under heatmap
+        conditions = self.layout["Condition"].reindex(well_ids)
+
+        cells = [
+            sample.format(ID=sample_id, COLOR=color, CONDITION=condition)
+            for sample_id, color, condition in zip(
+                well_ids, colors.values, conditions.values
+            )
+        ]
+        row_output = "".join(
+            row.format(
+                ROWNAME=row_name,
+                SAMPLES="".join(cells[row_no * n_cols : (row_no + 1) * n_cols]),
+            )
+            for row_no, row_name in enumerate(row_labels(n_rows))
+        )
 
         # once the heatmap itself is created, it is wrapped around in the additional table
         # that would control if the hm is shown, define the title, etc
@@ -1430,6 +3091,63 @@ class MoltenProtFit:
         button_template = button_template.substitute(IDENTIFIER=self.readout_type)
         return button_template
 
+    def html_curves(self, max_points=250):
+        """
+        Returns the curves of all samples in a compact form to be embedded in the HTML report
+        and drawn by the browser (instead of an image per sample)
+
+        Parameters
+        ----------
+        max_points
+            the curves are downsampled to at most this amount of points
+
+        Returns
+        -------
+        A JSON-serializable dict with plot settings and a dict of samples; for each sample:
+        temperature (t), signal (y) and for successful fits also fit curve (fit),
+        derivative (d), baseline parameters kN, bN, kU, bU (base) and the values of plotlines (vlines)
+        """
+        # keep about 4 significant digits of the signal range
+        signal_range = np.nanmax(self.plate.values) - np.nanmin(self.plate.values)
+        decimals = 4 - int(np.floor(np.log10(signal_range))) if signal_range > 0 else 4
+
+        def compact(values, points):
+            return np.round(np.asarray(values, dtype=np.float64)[points], decimals).tolist()
+
+        samples = {}
+        failed_samples = self._get_failed_samples()
+        for datatype, sample_ids in (
+            ("overview", self.plate_results.index),
+            ("raw", failed_samples),
+        ):
+            for sample_id in sample_ids:
+                data = self._plot_data(sample_id, datatype)
+                # evenly spaced points, the first and the last point are always kept
+                n_points = len(data["temperature"])
+                points = np.unique(
+                    np.linspace(0, n_points - 1, min(n_points, max_points)).round()
+                ).astype(int)
+                curve = {
+                    "t": np.round(data["temperature"][points], 2).tolist(),
+                    "y": compact(data["signal"], points),
+                }
+                if datatype == "overview":
+                    curve["fit"] = compact(data["fit"], points)
+                    # derivative is much smaller than the signal
+                    curve["d"] = np.round(
+                        data["derivative"][points], decimals + 2
+                    ).tolist()
+                    curve["base"] = [float(i) for i in data["baselines"]]
+                    curve["vlines"] = [round(float(i), 2) for i in data["vlines"]]
+                samples[sample_id] = curve
+
+        return {
+            "ylabel": self.readout_type,
+            "xlim": [float(i) for i in self.xlim],
+            "plotlines": list(self.plotlines),
+            "samples": samples,
+        }
+
     ## Methods for GUI communication
     def printAnalysisSettings(self):
         """
@@ -1451,7 +3169,8 @@ class MoltenProtFit:
         """
         Check if analysis compleded and self.plate_results is created
         """
-        return "plate_results" in self.__dict__
+        # NOTE new instances (and those restored from JSON) start with plate_results=None
+        return self.__dict__.get("plate_results") is not None
 
     def testWellID(self, wellID, ignore_results=False):
         """
@@ -1504,6 +3223,14 @@ class MoltenProtFit:
         dCp=analysis_defaults["dCp"],
         # onset_threshold=analysis_defaults["onset_threshold"], # not exposed anywhere
         savgol=analysis_defaults["savgol"],
+        varpro=analysis_defaults["varpro"],
+        prescreen=analysis_defaults["prescreen"],
+        peak_init=analysis_defaults["peak_init"],
+        coarse=analysis_defaults["coarse"],
+        max_nfev=analysis_defaults["max_nfev"],
+        fit_timeout=analysis_defaults["fit_timeout"],
+        deadline=analysis_defaults["deadline"],
+        compare_models=analysis_defaults["compare_models"],
         # these are pre-processing options (defaults stored in a different dict)
         blanks=prep_defaults["blanks"],    # TODO set in layout instead? TODO use None and replace with []
         exclude=prep_defaults["exclude"],  # TODO set in layout instead? TODO use None and replace with []
@@ -1530,6 +3257,20 @@ class MoltenProtFit:
         self.baseline_bounds = baseline_bounds
         # the value for savgol window to compute the derivative
         self.savgol = savgol
+        # fit baseline parameters by linear least squares (variable projection)
+        self.varpro = varpro
+        # minimal signal-to-noise ratio of the curves to be fit (0 - fit all curves)
+        self.prescreen = prescreen
+        # starting values of the transitions from the derivative peaks
+        self.peak_init = peak_init
+        # temperature step for the coarse fit before the full fit (0 - no coarse fit)
+        self.coarse = coarse
+        # limits of the fitting time per sample and per dataset (0 - no limit)
+        self.max_nfev = max_nfev
+        self.fit_timeout = fit_timeout
+        self.deadline = deadline
+        # models that are fit in addition to model and ranked by information criteria
+        self.compare_models = compare_models
 
         self.blanks = blanks
         self.exclude = exclude
@@ -1617,10 +3358,273 @@ class MoltenProtFit:
         """
         self.fixed_params = fixed_params
 
+    def SetWarmStart(self, warm_start):
+        """
+        Takes a dataframe with alphanumeric columns (A1-H12) and index being names of the model
+        parameters (e.g. Tm, dHm) and uses the values as starting parameters of the fits
+        (e.g. the results of another readout of the same samples); None removes the warm start
+
+        Notes
+        -----
+        * only the nonlinear parameters of the model are used (the baselines differ between readouts)
+        * the values overwrite the starting values from param_init, peak_init and _estimate_baseline
+        """
+        self.warm_start = warm_start
+
+    def _subset(self, wells):
+        """
+        Returns a copy of the prepared dataset that contains only the given wells, e.g. to fit
+        a part of the wells in a worker process (the results are combined with _merge_wells)
+
+        Notes
+        -----
+        The data and the settings are shared with the original instance, the results, messages
+        and instrumentation are not
+        """
+        output = MoltenProtFit(None, input_type="from_dict")
+        output.__dict__.update(
+            (key, value) for key, value in self.__dict__.items() if key != "plotfig"
+        )
+        wells = list(wells)
+        output.plate = self.plate[wells]
+        output.plate_raw = self.plate_raw[self.plate_raw.columns.intersection(wells)]
+        output.plate_derivative = self.plate_derivative[wells]
+        output.plate_binned = None
+        if self.fixed_params is not None:
+            output.fixed_params = self.fixed_params[
+                self.fixed_params.columns.intersection(wells)
+            ]
+        if self.warm_start is not None:
+            output.warm_start = self.warm_start[
+                self.warm_start.columns.intersection(wells)
+            ]
+        output.events = []
+        output.bad_fit = []
+        output.bad_Tm = []
+        output.instrumentation = {"stages": [], "wells": []}
+        for attribute in (
+            "plate_results",
+            "plate_results_stdev",
+            "plate_fit",
+            "plate_raw_corr",
+        ):
+            output.__dict__.pop(attribute, None)
+        return output
+
+    def _merge_wells(self, parts):
+        """
+        Combines the results of processed subsets of this dataset (see _subset)
+
+        Parameters
+        ----------
+        parts
+            a list of MoltenProtFit instances returned by _subset after ProcessData
+        """
+        order = list(self.plate.columns)
+        # NOTE the messages and statistics are kept in the order of the wells
+        parts = sorted(
+            parts,
+            key=lambda part: order.index(part.plate.columns[0]) if len(part.plate.columns) else 0,
+        )
+        analysed = [part for part in parts if part.analysisHasBeenDone()]
+
+        def combine(attribute, axis):
+            frames = [
+                getattr(part, attribute)
+                for part in analysed
+                if getattr(part, attribute, None) is not None
+            ]
+            if not frames:
+                return None
+            output = pd.concat(frames, axis=axis)
+            labels = set(output.index if axis == 0 else output.columns)
+            return output.reindex([i for i in order if i in labels], axis=axis)
+
+        if analysed:
+            self.plate_results = combine("plate_results", 0)
+            self.plate_results_stdev = combine("plate_results_stdev", 0)
+            self.plate_fit = combine("plate_fit", 1)
+            self.plate_raw_corr = combine("plate_raw_corr", 1)
+            self.plotlines = analysed[0].plotlines
+            # sort the results as in ProcessData
+            sortby = getattr(avail_models.get(self.model), "sortby", None)
+            if sortby is not None:
+                self.plate_results.sort_values(by=sortby, inplace=True, ascending=False)
+            self.plate_results.index.name = "ID"
+            self.plate_results_stdev.index.name = "ID"
+        elif self.analysisHasBeenDone():
+            # remove the results of a previous run
+            del self.plate_results
+            del self.plate_results_stdev
+        self.bad_fit = [i for part in parts for i in part.bad_fit]
+        self.over_budget = [i for part in parts for i in getattr(part, "over_budget", [])]
+        for part in parts:
+            self.events.extend(part.events)
+            self.instrumentation["stages"].extend(part.instrumentation["stages"])
+            self.instrumentation["wells"].extend(part.instrumentation["wells"])
+
+    def _information_criteria(self):
+        """
+        Returns the Akaike and Bayesian information criteria of the fits of the processed samples
+        (a tuple of two pd.Series with sample IDs in index)
+
+        Notes
+        -----
+        For a least squares fit of n points with k parameters and the residual sum of squares RSS:
+        AIC = n*ln(RSS/n) + 2*k and BIC = n*ln(RSS/n) + k*ln(n); lower values are better
+
+        RSS is floored at the machine precision of the data, so that exact fits (e.g. of
+        noise-free data) do not give -inf and are ranked by the number of parameters
+        """
+        n_params = len(avail_models[self.model](scan_rate=self.scan_rate).param_names())
+        wells = list(self.plate_results.index)
+        data = self.plate[wells]
+        n_points = data.count()
+        rss = ((data - self.plate_fit[wells]) ** 2).sum()
+        rss = np.maximum(rss, n_points * (np.finfo(float).eps * data.abs().max()) ** 2)
+        log_likelihood = n_points * np.log(rss / n_points)
+        return (
+            log_likelihood + 2 * n_params,
+            log_likelihood + n_params * np.log(n_points),
+        )
+
+    def _compare_models(self, n_jobs=1, batch_size=8):
+        """
+        Implementation of ProcessData when compare_models is set: fits model and the models
+        in compare_models to all samples and ranks them by information criteria
+
+        The results of model are processed as usual; plate_results additionally gets the columns
+        AIC_<model> and BIC_<model> for each fitted model, and best_AIC and best_BIC with the name
+        of the model with the lowest criterion for the sample (see _information_criteria)
+
+        Parameters
+        ----------
+        n_jobs
+            the number of worker processes; with n_jobs > 1 the models are fit in parallel
+            in batches of wells (see _subset and _merge_wells)
+        batch_size
+            the number of wells in a task
+
+        Notes
+        -----
+        * the data is prepared and the baselines are estimated once for all models
+        * the models in compare_models always use peak_init (see analysis_defaults)
+        * messages of the other models are not kept, their fit statistics are
+        (see GetFitStatistics)
+        """
+        model_names = [self.model] + [
+            i for i in self.compare_models if i not in (self.model, "skip")
+        ]
+        for name in model_names[1:]:
+            if name not in avail_models.keys():
+                raise ValueError("Unknown model '{}'".format(name))
+            if name == "lumry_eyring":
+                raise ValueError(
+                    "Model lumry_eyring requires the results of the Scattering fit and cannot be compared to {}".format(
+                        self.model
+                    )
+                )
+
+        wells = list(self.plate.columns)
+        baseline_cache = {}
+        with self._timed("baselines"):
+            for i in wells:
+                try:
+                    baseline_cache[i] = self._fit_baselines(
+                        self.plate[i].dropna(), self.baseline_fit
+                    )
+                except (ValueError, TypeError, np.linalg.LinAlgError):
+                    # ProcessData handles the problems of such samples
+                    pass
+
+        def candidate(name, subset):
+            "A copy of the dataset for fitting model name to a subset of wells"
+            output = self._subset(subset)
+            output.model = name
+            output.compare_models = []
+            output._baseline_cache = {
+                i: baseline_cache[i] for i in subset if i in baseline_cache
+            }
+            # the fixed parameters (lumry_eyring) only apply to the main model
+            if name != self.model:
+                output.fixed_params = None
+                # start the transitions at the peaks of the derivative, otherwise the fits
+                # of a richer model often end in the optimum of a simpler one
+                output.peak_init = True
+            return output
+
+        parts = {name: [] for name in model_names}
+        if parallelization and n_jobs > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [
+                    (name, executor.submit(_process_wells, candidate(name, batch)))
+                    for name in model_names
+                    for batch in _batched(wells, batch_size)
+                ]
+                for name, future in futures:
+                    parts[name].append(future.result())
+        else:
+            for name in model_names:
+                dataset = candidate(name, wells)
+                dataset.ProcessData()
+                parts[name].append(dataset)
+
+        self.instrumentation["wells"] = []
+        self._merge_wells(parts[self.model])
+        criteria = {}
+        for name in model_names:
+            if name == self.model:
+                fitted = self
+            else:
+                fitted = candidate(name, wells)
+                fitted._merge_wells(parts[name])
+                self.instrumentation["wells"].extend(fitted.instrumentation["wells"])
+            if fitted.analysisHasBeenDone():
+                criteria[name] = fitted._information_criteria()
+        if not self.analysisHasBeenDone():
+            return None
+
+        samples = self.plate_results.index
+        aic = pd.DataFrame(
+            {name: values[0] for name, values in criteria.items()}, index=samples
+        )
+        bic = pd.DataFrame(
+            {name: values[1] for name, values in criteria.items()}, index=samples
+        )
+        comparison = pd.concat([aic.add_prefix("AIC_"), bic.add_prefix("BIC_")], axis=1)
+        comparison["best_AIC"] = aic.idxmin(axis=1)
+        comparison["best_BIC"] = bic.idxmin(axis=1)
+        # NOTE the last column is the sorting measure of the model (see getResultsColumns)
+        self.plate_results = pd.concat(
+            [
+                self.plate_results.iloc[:, :-1],
+                comparison,
+                self.plate_results.iloc[:, -1:],
+            ],
+            axis=1,
+        )
+        self.print_message(
+            "Best model by BIC: {}".format(
+                ", ".join(
+                    "{} ({} samples)".format(name, count)
+                    for name, count in comparison["best_BIC"].value_counts().items()
+                )
+            ),
+            "i",
+        )
+        return None
+
+    @_instrumented("PrepareData")
     def PrepareData(self):
         """
         Prepares input data for processing.
         """
+        from scipy.signal import medfilt
+
+        # a new analysis run starts here
+        self.instrumentation = {"stages": [], "wells": []}
 
         # copy raw data to the main plate
         # NOTE this is primarily needed for json i/o, to ensure that the analysis runs
@@ -1693,23 +3697,7 @@ class MoltenProtFit:
         # NOTE this must be done after median filtering (spikes are bad for averaging)
         if self.shrink is not None:
             if self.shrink > self.dT:
-                # create the range for Temperature binning (will be also used as the index)
-                bin_range = np.arange(
-                    np.floor(min(self.plate.index)),
-                    np.ceil(max(self.plate.index)) + self.shrink,
-                    self.shrink,
-                )
-                # temporary DataFrame for binning
-                self.plate_binned = pd.DataFrame(
-                    index=bin_range[:-1], columns=self.plate.columns, dtype="float64"
-                )
-
-                # average values using the temperature range (plate_binned index, plate_binned index + bin step)
-                for i in self.plate_binned.index:
-                    self.plate_binned.loc[i, :] = self.plate[
-                        (self.plate.index > i) & (self.plate.index < i + self.shrink)
-                    ].mean()
-
+                self.plate_binned = bin_plate(self.plate, self.shrink)
                 self.plate = self.plate_binned
                 # remove possible empty rows
                 self.print_message(
@@ -1737,56 +3725,361 @@ class MoltenProtFit:
             if len(self.plate.index) < window_length:
                 # NOTE the output may be confusing to the user, because user gives degrees, but gets datapoints
                 raise ValueError(
-                    "Specified savgol window size ({} datapoints) is bigger than the dataset length ({} datapoints)!".format(
-                        window_length, len(self.plate.index)
+                    "Specified savgol window size ({} datapoints) is bigger than the dataset length ({} datapoints)!".format(
+                        window_length, len(self.plate.index)
+                    )
+                )
+
+            # NOTE an additional check for savgol requirements (4 is polyorder used by default)
+            if window_length < 4:
+                raise ValueError(
+                    "Specified savgol window size ({} datapoints) is smaller than the polynomial order of the filter (4); increase savgol window size, or do not shrink the data".format(
+                        window_length
+                    )
+                )
+            """
+            NOTE default mode for savgol is interp, which just uses polynomial fit of the last window to
+            create the data values beyond the end of the dataset. This may create tails in the derivative
+            that interfere with peak detection. "nearest" mode just takes the first value and uses it
+            for the missing parts of the window at data edges; see here for other modes:
+            https://docs.scipy.org/doc/scipy-0.16.1/reference/generated/scipy.signal.savgol_filter.html
+            """
+            self.plate_derivative = self.plate.apply(
+                savgol_filter,
+                window_length=window_length,
+                polyorder=4,
+                deriv=1,
+                mode="nearest",
+            )
+        except:
+            """
+            NOTE usually, this exception would happen with old scipy version
+            However, this also happened in pyinstaller bundle for Windows:
+            LinAlgError: SVD did not converge in Linear Least Squares
+            The derivate is not a crucial element (fits usually converge even with a random Tm guess),
+            so it should be OK to proceed.
+            """
+            self.print_message(
+                "Cannot compute a smoothened derivative, fit results can be suboptimal",
+                "w",
+            )
+            self.print_message("Falling back to the difference method", "i")
+            self.plate_derivative = (self.plate - self.plate.shift(periods=1)) / self.dT
+
+    def _record_well(
+        self,
+        well,
+        start,
+        status,
+        message="",
+        nfev=0,
+        baseline_time=0.0,
+        fit_time=0.0,
+        bounds_active=(),
+        backend="numpy",
+    ):
+        "Adds the fit statistics of a sample to instrumentation"
+        self.instrumentation["wells"].append(
+            {
+                "well": well,
+                "model": self.model,
+                "start": start,
+                "baseline_time": baseline_time,
+                "fit_time": fit_time,
+                "nfev": nfev,
+                "status": status,
+                "message": message,
+                "bounds_active": ",".join(bounds_active),
+                "backend": backend,
+                "pid": os.getpid(),
+            }
+        )
+
+    def _fit_curve(self, x, y, start, bounds, fun, jac=None, n_linear=0, max_nfev=None):
+        """
+        Fits the model to a curve starting from the parameters start
+
+        Parameters
+        ----------
+        x, y
+            the curve
+        start
+            starting parameters
+        bounds
+            parameter bounds (None - no bounds)
+        fun
+            the model function, or its linear basis in variable projection mode
+        jac
+            the Jacobian of fun (None - finite differences)
+        n_linear
+            the number of linear parameters for variable projection (0 - fit all parameters)
+        max_nfev
+            the maximum number of evaluations (None - the default of the fitting method)
+
+        Returns
+        -------
+        the fit parameters and their covariance matrix (as curve_fit)
+        """
+        from scipy.optimize import curve_fit
+
+        # depending on scipy version enforce the parameter limits or not
+        if n_linear:
+            return fit_separable(
+                fun,
+                x,
+                y,
+                start,
+                bounds=bounds if bounds is not None else (-np.inf, np.inf),
+                n_linear=n_linear,
+                max_nfev=max_nfev,
+            )
+        if (LooseVersion(scipy_version) >= LooseVersion("0.17")) and (
+            bounds is not None
+        ):
+            # NOTE adding ftol=0.01 and xtol=0.01 may in some cases speed up the fitting (loosens the convergence criteria)
+            # default values 1e-8 are a bit too conservative; in preliminary tests the speedup was marginal
+            return curve_fit(
+                fun, x, y, start, bounds=bounds, jac=jac, max_nfev=max_nfev
+            )
+        # NOTE the Levenberg-Marquardt method uses maxfev (0 - the default of leastsq)
+        return curve_fit(fun, x, y, start, jac=jac, maxfev=max_nfev or 0)
+
+    def _fit_well(
+        self,
+        well,
+        curve,
+        model,
+        budget,
+        fit_options,
+        backend,
+        baseline_cache=None,
+        plate_coarse=None,
+    ):
+        """
+        Fits the model to a sample and adds the results to plate_results and plate_results_stdev
+        (samples that could not be fit are added to bad_fit or over_budget)
+
+        Parameters
+        ----------
+        well
+            sample ID
+        curve
+            pd.Series with the signal to fit (Temperature in index)
+        model
+            the model instance used for fitting
+        budget
+            _FitBudget of the dataset
+        fit_options
+            the model function and related options for _fit_curve
+        backend
+            the name of the model backend (for fit statistics)
+        baseline_cache
+            baseline estimates shared with the fits of other models (see _compare_models)
+        plate_coarse
+            the data binned to a coarse temperature step (see bin_plate), None - fit at full resolution
+        """
+        well_start = time()
+        baseline_time = 0.0
+        budget.start()
+        if budget.expired():
+            self.over_budget.append(well)
+            self._record_well(
+                well,
+                well_start,
+                "deadline",
+                "dataset deadline of {} s has passed".format(self.deadline),
+                backend=backend,
+            )
+            return None
+        # drop Nan values to prevent crashes of fitting
+        data = curve.dropna()
+        T = np.float64(data.index.values)
+        # do not spend time on curves without a transition (e.g. empty wells)
+        if self.prescreen > 0:
+            screen = prescreen_curve(
+                data,
+                self.plate_derivative[well].loc[data.index],
+                self.baseline_fit,
+                self.prescreen,
+            )
+            if screen["reason"]:
+                self.print_message(
+                    "Sample {} was not fit: {}".format(well, screen["reason"]),
+                    "w",
+                    well=well,
+                )
+                self.bad_fit.append(well)
+                self._record_well(
+                    well, well_start, "skipped", screen["reason"], backend=backend
+                )
+                return None
+        # guess initial parameters
+        p0 = model.param_init(data)
+        n_params = len(p0)
+        self.plate_results.loc[self.plate_results.iloc[0:n_params].index, well] = p0
+        # get parameter bounds
+        param_bounds = model.param_bounds(data)
+        # if the model has these parameters, then run a more precise initial parameter estimation
+        if set(["kN", "bN", "kU", "bU"]).issubset(model.param_names()):
+            # furthermore, if there is a Tm than run smart Tm pre-estimation
+            estimate_Tm = "Tm" in model.param_names()
+            started = perf_counter()
+            self._estimate_baseline(
+                data,
+                fit_length=self.baseline_fit,
+                estimate_Tm=estimate_Tm,
+                baseline_cache=baseline_cache,
+            )
+            baseline_time = perf_counter() - started
+
+            # Set bounds for kN, bN, kU, bU to be a multiple of stdev of baseline-prefitting
+            # NOTE this assumes that the parameters are the first four in the list of bounds/p0
+            # originally param_bounds is a tuple, so it has to be converted to a list...
+            # (not needed in variable projection mode, the baselines are computed exactly)
+            if self.baseline_bounds > 0 and not fit_options.get("n_linear"):
+                param_bounds = list(param_bounds)
+                param_bounds[0] = list(param_bounds[0])
+                param_bounds[1] = list(param_bounds[1])
+                param_bounds[0][:4] = list(
+                    self.plate_results[well][:4]
+                    - self.plate_results_stdev[well][:4] * self.baseline_bounds
+                )
+                param_bounds[1][:4] = list(
+                    self.plate_results[well][:4]
+                    + self.plate_results_stdev[well][:4] * self.baseline_bounds
+                )
+            elif self.baseline_bounds < 0:
+                raise ValueError(
+                    "Expected a non-negative int for baseline_bounds, but got {}".format(
+                        self.baseline_bounds
                     )
                 )
 
-            # NOTE an additional check for savgol requirements (4 is polyorder used by default)
-            if window_length < 4:
-                raise ValueError(
-                    "Specified savgol window size ({} datapoints) is smaller than the polynomial order of the filter (4); increase savgol window size, or do not shrink the data".format(
-                        window_length
+            if self.peak_init:
+                self._estimate_transitions(well, data, model, param_bounds)
+
+        # starting values from another readout
+        if self.warm_start is not None and well in self.warm_start.columns:
+            self._apply_warm_start(well, model, param_bounds)
+
+        # if this MoltenProtFit instance has any fixed parameter dataframe,
+        # they will be supplied to the model
+        if self.fixed_params is not None:
+            model.set_fixed(list(self.fixed_params[well]))
+        status = "converged"
+        message = ""
+        bounds_active = []
+        budget.start(timed=True)
+        started = perf_counter()
+        try:
+            # for some reason, pandas Series for initial parameters have to be converted to a list
+            # the fit gives two arrays: fit parameters (p) and covariance matrix (covm for stdev estimation)
+            start = list(self.plate_results[well][0:n_params])
+            data_coarse = (
+                plate_coarse[well].dropna() if plate_coarse is not None else ()
+            )
+            if len(data_coarse) > 2 * n_params:
+                # fit the binned curve, then refine the result on the full curve
+                # with a limited number of evaluations (or without a limit, if that fails)
+                # NOTE bin_plate puts the bin start to the index, the average is in the middle of the bin
+                start, _ = self._fit_curve(
+                    np.float64(data_coarse.index.values) + self.coarse / 2,
+                    data_coarse.values,
+                    start,
+                    param_bounds,
+                    **fit_options,
+                )
+                try:
+                    p, covm = self._fit_curve(
+                        T,
+                        data.values,
+                        start,
+                        param_bounds,
+                        max_nfev=10 * n_params,
+                        **fit_options,
+                    )
+                except RuntimeError:
+                    p, covm = self._fit_curve(
+                        T, data.values, start, param_bounds, **fit_options
                     )
+            else:
+                p, covm = self._fit_curve(
+                    T, data.values, start, param_bounds, **fit_options
                 )
-            """
-            NOTE default mode for savgol is interp, which just uses polynomial fit of the last window to
-            create the data values beyond the end of the dataset. This may create tails in the derivative
-            that interfere with peak detection. "nearest" mode just takes the first value and uses it
-            for the missing parts of the window at data edges; see here for other modes:
-            https://docs.scipy.org/doc/scipy-0.16.1/reference/generated/scipy.signal.savgol_filter.html
-            """
-            self.plate_derivative = self.plate.apply(
-                savgol_filter,
-                window_length=window_length,
-                polyorder=4,
-                deriv=1,
-                mode="nearest",
+            fit_index = self.plate_results.iloc[n_params : n_params * 2].index
+            self.plate_results.loc[fit_index, well] = p
+            # this is the official way to compute stdev error (from scipy docs)
+            self.plate_results_stdev.loc[fit_index, well] = np.sqrt(np.diagonal(covm))
+            bounds_active = _active_bounds(model.param_names(), p, param_bounds)
+        except FitBudgetExceeded as e:
+            status = e.status
+            message = str(e)
+            self.print_message(
+                "Curve fit for {} was stopped: {}".format(well, e), "w", well=well
             )
-        except:
-            """
-            NOTE usually, this exception would happen with old scipy version
-            However, this also happened in pyinstaller bundle for Windows:
-            LinAlgError: SVD did not converge in Linear Least Squares
-            The derivate is not a crucial element (fits usually converge even with a random Tm guess),
-            so it should be OK to proceed.
-            """
+            self.over_budget.append(well)
+        except RuntimeError as e:
+            status = "failed"
+            message = str(e)
+            # these probably correspond to bad fitting
             self.print_message(
-                "Cannot compute a smoothened derivative, fit results can be suboptimal",
+                "Curve fit for {} failed, probably invalid transition.".format(well),
                 "w",
+                well=well,
             )
-            self.print_message("Falling back to the difference method", "i")
-            self.plate_derivative = (self.plate - self.plate.shift(periods=1)) / self.dT
+            # generate a list of bad fits
+            self.bad_fit.append(well)
+        except ValueError as e:
+            status = "failed"
+            message = str(e)
+            self.print_message(str(e), "w", well=well)
+            # catch some problems of fitting with santoro1988d
+            self.print_message(
+                "Curve fit for {} failed unexpectedly (ValueError)".format(well),
+                "w",
+                well=well,
+            )
+            # generate a list of bad fits
+            self.bad_fit.append(well)
+        self._record_well(
+            well,
+            well_start,
+            status,
+            message,
+            nfev=budget.nfev,
+            baseline_time=baseline_time,
+            fit_time=perf_counter() - started,
+            bounds_active=bounds_active,
+            backend=backend,
+        )
 
-    def ProcessData(self):
+        # supply sqrt(n) for S calculation
+        # to calculate RMSE we don't care about the amount of parameters,
+        # however, they must be included for standrard error of estimate
+        # (more info here: http://people.duke.edu/~rnau/compare.htm)
+        try:
+            self.plate_results.loc["S", well] = np.sqrt(len(T) - n_params)
+        except TypeError:
+            self.print_message(
+                "Curve for sample {} has just one value!".format(well), "w", well=well
+            )
+            # add to bad samples list
+            self.bad_fit.append(well)
+
+    @_instrumented("ProcessData")
+    def ProcessData(self, n_jobs=1):
         """
         Performs curve fitting and creates results dataframes
 
+        Parameters
+        ----------
+        n_jobs
+            the number of worker processes to fit the models of compare_models (see _compare_models)
+
         Notes
         -----
         The names for the parameters and the contents of plate_results variable are different for various methods, so they are set up based on the selected analysis
         """
-
         if self.model == "skip":
             self.print_message("Dataset was omitted from analysis", "i")
             # check if there are plate_results attributes from previous analysis and delete them
@@ -1801,6 +4094,12 @@ class MoltenProtFit:
         if self.model not in avail_models.keys():
             raise ValueError("Unknown model '{}'".format(self.model))
 
+        if self.compare_models:
+            return self._compare_models(n_jobs)
+
+        # baseline estimates shared with the fits of other models (see _compare_models)
+        baseline_cache = self.__dict__.pop("_baseline_cache", None)
+
         model = avail_models[self.model](scan_rate=self.scan_rate)
 
         self.print_message("Processing data...", "i")
@@ -1811,8 +4110,19 @@ class MoltenProtFit:
         # kinetic models should raise a ValueError
         model.scan_rate = self.scan_rate
 
-        # the function to do curve fitting
-        f = model.fun
+        # the function to do curve fitting (an optimised version of model.fun)
+        # and its Jacobian (if None, curve_fit uses finite differences)
+        f = model.kernel
+        jac = None
+        backend = "numpy"
+        if jit_compilation:
+            from . import jit
+
+            compiled = jit.get_kernels(model)
+            if compiled is not None:
+                f, jac = compiled
+                backend = "numba"
+        self.print_message("Model backend: {}".format(backend), "i")
         # generate parameter names
         result_index = []
         for i in model.param_names():
@@ -1823,6 +4133,7 @@ class MoltenProtFit:
 
         # select dataframe to be fit (e.g. can be changed to plate_derivative)
         df_for_fitting = self.plate
+        n_params = len(model.param_names())
         # create dataframe to store results and populate with initial parameter values
         # NOTE by default empty dataframes get "object" data type, which can cause problems when using numpy
         # if the datatype is specified explicitly, the problem should not exist
@@ -1837,116 +4148,78 @@ class MoltenProtFit:
             index=result_index, columns=self.plate.columns.values, dtype="float64"
         )
 
-        # an empty p0 variable
-        p0 = []
         # run a cycle through all columns and calculate fits
         self.print_message("Fitting curves...", "i")
 
-        for i in df_for_fitting.columns.values:
-            # drop Nan values to prevent crashes of fitting
-            data = df_for_fitting[i].dropna()
-            T = np.float64(data.index.values)
-            # guess initial parameters
-            p0 = model.param_init(data)
-            self.plate_results.loc[self.plate_results.iloc[0 : len(p0)].index, i] = p0
-            # get parameter bounds
-            param_bounds = model.param_bounds(data)
-            # if the model has these parameters, then run a more precise initial parameter estimation
-            if set(["kN", "bN", "kU", "bU"]).issubset(model.param_names()):
-                # furthermore, if there is a Tm than run smart Tm pre-estimation
-                estimate_Tm = "Tm" in model.param_names()
-                self._estimate_baseline(
-                    data, fit_length=self.baseline_fit, estimate_Tm=estimate_Tm
-                )
-
-                # Set bounds for kN, bN, kU, bU to be a multiple of stdev of baseline-prefitting
-                # NOTE this assumes that the parameters are the first four in the list of bounds/p0
-                # originally param_bounds is a tuple, so it has to be converted to a list...
-                if self.baseline_bounds > 0:
-                    param_bounds = list(param_bounds)
-                    param_bounds[0] = list(param_bounds[0])
-                    param_bounds[1] = list(param_bounds[1])
-                    param_bounds[0][:4] = list(
-                        self.plate_results[i][:4]
-                        - self.plate_results_stdev[i][:4] * self.baseline_bounds
-                    )
-                    param_bounds[1][:4] = list(
-                        self.plate_results[i][:4]
-                        + self.plate_results_stdev[i][:4] * self.baseline_bounds
-                    )
-                elif self.baseline_bounds < 0:
-                    raise ValueError(
-                        "Expected a non-negative int for baseline_bounds, but got {}".format(
-                            self.baseline_bounds
-                        )
-                    )
-
-            # if this MoltenProtFit instance has any fixed parameter dataframe,
-            # they will be supplied to the model
-            if self.fixed_params is not None:
-                model.set_fixed(list(self.fixed_params[i]))
-            try:
-                # for some reason, pandas Series for initial parameters have to be converted to a list
-                # the fit gives two arrays: fit parameters (p) and covariance matrix (covm for stdev estimation)
-
-                # depending on scipy version enforce the parameter limits or not
-                if (LooseVersion(scipy_version) >= LooseVersion("0.17")) and (
-                    param_bounds is not None
-                ):
+        # the fits are stopped if they run out of the budget (see analysis_defaults)
+        budget = _FitBudget(self.max_nfev, self.fit_timeout, self.deadline)
+        fit_started = perf_counter()
+
+        # in variable projection mode the model is evaluated via its linear basis
+        if self.varpro and model.linear_params:
+            fit_options = {
+                "fun": budget.counted(model.linear_basis),
+                "n_linear": len(model.linear_params),
+            }
+            backend = "numpy"
+        else:
+            fit_options = {
+                "fun": budget.counted(f),
+                "jac": budget.timed(jac) if jac is not None else None,
+            }
+
+        # fit the curves binned to a coarse temperature step first (see analysis_defaults)
+        plate_coarse = None
+        if self.coarse and self.coarse > self.dT:
+            plate_coarse = bin_plate(df_for_fitting, self.coarse)
+        elif self.coarse:
+            self.print_message(
+                "The temperature step of the data is larger than the coarse step ({} degrees), fitting at full resolution".format(
+                    self.coarse
+                ),
+                "i",
+            )
 
-                    # NOTE adding ftol=0.01 and xtol=0.01 may in some cases speed up the fitting (loosens the convergence criteria)
-                    # default values 1e-8 are a bit too conservative; in preliminary tests the speedup was marginal
-                    p, covm = curve_fit(
-                        f,
-                        T,
-                        data,
-                        list(self.plate_results[i][0 : len(p0)]),
-                        bounds=param_bounds,
-                    )
-                else:
-                    p, covm = curve_fit(
-                        f, T, data.values, list(self.plate_results[i][0 : len(p0) + 1])
-                    )
-                self.plate_results.loc[
-                    self.plate_results.iloc[len(p0) : (len(p0)) * 2].index, i
-                ] = p
-                # this is the official way to compute stdev error (from scipy docs)
-                self.plate_results_stdev.loc[
-                    self.plate_results.iloc[len(p0) : (len(p0)) * 2].index, i
-                ] = np.sqrt(np.diagonal(covm))
-            except RuntimeError:
-                # these probably correspond to bad fitting
-                self.print_message(
-                    "Curve fit for {} failed, probably invalid transition.".format(i),
-                    "w",
-                )
-                # generate a list of bad fits
-                self.bad_fit.append(i)
-            except ValueError as e:
-                self.print_message(str(e), "w")
-                # catch some problems of fitting with santoro1988d
-                self.print_message(
-                    "Curve fit for {} failed unexpectedly (ValueError)".format(i), "w"
-                )
-                # generate a list of bad fits
-                self.bad_fit.append(i)
+        # samples that were not fit because they ran out of their budget
+        self.over_budget = []
+        self.instrumentation["wells"] = []
+        fit_start = time()
+        for i in df_for_fitting.columns.values:
+            self._fit_well(
+                i,
+                df_for_fitting[i],
+                model,
+                budget,
+                fit_options,
+                backend,
+                baseline_cache=baseline_cache,
+                plate_coarse=plate_coarse,
+            )
 
-            # supply sqrt(n) for S calculation
-            # to calculate RMSE we don't care about the amount of parameters,
-            # however, they must be included for standrard error of estimate
-            # (more info here: http://people.duke.edu/~rnau/compare.htm)
-            try:
-                self.plate_results.loc["S", i] = np.sqrt(len(T) - len(p0))
-            except TypeError:
-                self.print_message(
-                    "Curve for sample {} has just one value!".format(i), "w"
-                )
-                # add to bad samples list
-                self.bad_fit.append(i)
+        self._record_stage("fit", fit_start, perf_counter() - fit_started)
+        n_late = sum(
+            well["status"] == "deadline" for well in self.instrumentation["wells"]
+        )
+        if n_late:
+            self.print_message(
+                "{} samples were not fit before the deadline of {} s".format(
+                    n_late, self.deadline
+                ),
+                "w",
+            )
 
         # drop the wells that could not be fit
-        self.plate_results.drop(self.bad_fit, axis=1, inplace=True)
-        self.plate_results_stdev.drop(self.bad_fit, axis=1, inplace=True)
+        self.plate_results.drop(self.bad_fit + self.over_budget, axis=1, inplace=True)
+        self.plate_results_stdev.drop(
+            self.bad_fit + self.over_budget, axis=1, inplace=True
+        )
+        if self.plate_results.empty:
+            # e.g. all samples were skipped by the pre-screen or ran out of their budget
+            # without plate_results the dataset is not recognized as a processed one
+            self.print_message("No samples were fit", "w")
+            del self.plate_results
+            del self.plate_results_stdev
+            return None
 
         # empty DataFrame with temperature index to store computed fitted curves
         self.plate_fit = pd.DataFrame(index=self.plate.index)
@@ -1966,7 +4239,7 @@ class MoltenProtFit:
                             np.array(
                                 self.plate_fit.index, dtype=np.float32
                             ),  # since pandas 2.0 the float index is stored as objects and causes issues with numpy
-                            *list(input_series[len(p0) : (len(p0)) * 2]),
+                            *list(input_series[n_params : n_params * 2]),
                         ),
                         index=self.plate_fit.index,
                         name=input_series.name,
@@ -2015,7 +4288,7 @@ class MoltenProtFit:
 
         # remove *_init columns and S from self.plate_results_stdev
         self.plate_results_stdev.drop(
-            labels=result_index[: len(p0)], axis=1, inplace=True
+            labels=result_index[:n_params], axis=1, inplace=True
         )
         self.plate_results_stdev.drop(labels="S", axis=1, inplace=True)
 
@@ -2111,6 +4384,7 @@ class MoltenProtFit:
         self.plate_results_stdev.index.name = "ID"
         return None
 
+    @_instrumented("CalculateThermodynamic")
     def CalculateThermodynamic(self):
         """
         Calculates some thermodynamic characteristics of data and append them to self.plate_results:
@@ -2343,76 +4617,7 @@ class MoltenProtFit:
             return string[: length // 2] + " ... " + string[-length // 2 :]
         return string[:length] + "..."
 
-    def _plotfig_pdf(self, samples, failed=False):
-        """
-        A helper method for smart packing of individual sample plots into figures
-
-        Parameters
-        ----------
-        samples
-            a valid list of samples to be plotted
-        failed
-            indicate if samples are from failed fits
-
-        Returns
-        -------
-        A list of Figure objects to be added to pages list
-        """
-        if failed:
-            suptitle = "Excluded/failed samples"
-            datatype = "raw"
-        else:
-            suptitle = "Successful fits"
-            datatype = "overview"
-        pages = []
-        n_results = len(samples)
-        # intialize figures, axes, and plot counter
-        plot_fig, plot_axs = plt.subplots(
-            4, 3, sharex=False, sharey=False, figsize=(8.3, 11.7)
-        )
-        plot_fig.suptitle(suptitle, fontweight="bold", fontsize="x-large")
-        plot_axs = list(plot_axs.flat)
-        plot_counter = 0
-        for sample in samples:
-            if plot_counter < 11:
-                self.plotfig(
-                    "dummy_output",
-                    sample,
-                    datatype=datatype,
-                    save=False,
-                    show=False,
-                    data_ax=plot_axs[plot_counter],
-                    vline_legend=True,
-                )
-                plot_counter += 1
-            # if the 11th plot was plotted, append old figure and initialize a new one
-            # this should be also triggered if less than 11 is plotted
-            if plot_counter in (11, n_results):
-                # make legend in the next axes
-                plot_axs[plot_counter].legend(
-                    handles=plot_axs[plot_counter - 1].get_lines(),
-                    mode="expand",
-                    ncol=1,
-                )
-                # hide remaining unused axes
-                while plot_counter <= 11:
-                    plot_axs[plot_counter].set_axis_off()
-                    plot_counter += 1
-                plot_fig.tight_layout(
-                    rect=(0.02, 0.05, 0.98, 0.95)
-                )  # rect leaves some margins empty
-                pages.append(plot_fig)
-                plot_fig, plot_axs = plt.subplots(
-                    4, 3, sharex=False, sharey=False, figsize=(8.3, 11.7)
-                )
-                plot_fig.suptitle(
-                    suptitle + " (continued)", fontweight="bold", fontsize="x-large"
-                )
-                plot_axs = list(plot_axs.flat)
-                plot_counter = 0
-        return pages
-
-    def PdfReport(self, outfile):
+    def PdfReport(self, outfile, n_jobs=1, cache_folder=None, plot_service=None):
         """
         Generate and write a multi-page PDF report
 
@@ -2420,14 +4625,27 @@ class MoltenProtFit:
         ----------
         outfile
             location of the output, overwrite without confirmation
+        n_jobs
+            number of processes to render the pages with sample plots
+        cache_folder
+            a folder to keep the rendered pages between runs; pages with sample plots
+            are only rendered again if anything shown on them has changed
+        plot_service
+            a running PlotService to render the pages (overrides n_jobs)
 
         Notes
         -----
         * heatmap and converter96 are ancient methods, so they are just carefully wrapped around
         * each page is a figure object
         * multi-page pdf as per mpl [docs](https://matplotlib.org/stable/gallery/misc/multipage_pdf.html)
+        * for parallel or incremental rendering each page is written to a separate PDF and
+        the pages are then merged with pypdf (otherwise the pages are rendered serially)
+        * summary pages (heatmap and tables) contain a timestamp, so they are always rendered again
+        * the page labels are added when the pages are merged, so a cached page is reused
+        under a new page number (see _pdf_page_key)
         """
         from matplotlib.backends.backend_pdf import PdfPages
+        from matplotlib.figure import Figure
         from matplotlib.table import table as mpl_table
 
         result_columns = (
@@ -2525,7 +4743,8 @@ class MoltenProtFit:
 
         ## Full result table - create if more than 15 results (but less than 48)
         if n_results > 15:
-            page2, page2_ax = plt.subplots(1, 1, figsize=(8.3, 11.7))
+            page2 = Figure(figsize=(8.3, 11.7))
+            page2_ax = page2.subplots(1, 1)
             # table on page 2
             mpl_table(
                 page2_ax,
@@ -2546,7 +4765,8 @@ class MoltenProtFit:
 
         # if more than 48 samples are present
         if n_results > 48:
-            page3, page3_ax = plt.subplots(1, 1, figsize=(8.3, 11.7))
+            page3 = Figure(figsize=(8.3, 11.7))
+            page3_ax = page3.subplots(1, 1)
             # page 3 table
             mpl_table(
                 page3_ax,
@@ -2563,29 +4783,125 @@ class MoltenProtFit:
             )
             pages.append(page3)
 
-        ## pages with plots of individual curves
-        pages += self._plotfig_pdf(self.plate_results.index)
-        ## same as above, but for failed fits
-        pages += self._plotfig_pdf(excluded, failed=True)
-
-        # write output
-        page_no = 1
-        page_count = len(pages)
-        with PdfPages(outfile) as pdf_file:
-            for i in pages:
-                # add page number and save
-                i.text(
-                    0.5,
-                    0.025,
-                    "-- Page {} of {} --".format(page_no, page_count),
-                    fontstyle="italic",
-                    ha="center",
+        ## pages with plots of individual curves, 11 per page (the last axes holds the legend)
+        ## failed fits are shown as raw data
+        curve_pages = []
+        for samples, suptitle, datatype in (
+            (self.plate_results.index, "Successful fits", "overview"),
+            (excluded, "Excluded/failed samples", "raw"),
+        ):
+            for batch_no, batch in enumerate(_batched(samples, 11)):
+                title = suptitle if batch_no == 0 else suptitle + " (continued)"
+                curve_pages.append((title, datatype, batch))
+
+        page_count = len(pages) + len(curve_pages)
+        page_labels = [
+            "-- Page {} of {} --".format(page_no, page_count)
+            for page_no in range(1, page_count + 1)
+        ]
+        plotter_kwargs = self._plotter_kwargs()
+
+        if plot_service is not None:
+            n_jobs = plot_service.n_jobs
+        if (n_jobs > 1 or cache_folder is not None) and not pdf_merging:
+            self.print_message(
+                "pypdf module not found, PDF pages are rendered serially and without cache",
+                "w",
+            )
+        if not pdf_merging or (n_jobs == 1 and cache_folder is None):
+            # render and write the pages one by one
+            with PdfPages(outfile) as pdf_file:
+                for page, page_label in zip(pages, page_labels):
+                    _add_page_label(page, page_label)
+                    pdf_file.savefig(page)
+                for (title, datatype, samples), page_label in zip(
+                    curve_pages, page_labels[len(pages) :]
+                ):
+                    well_data = [self._plot_data(i, datatype) for i in samples]
+                    pdf_file.savefig(
+                        _curve_page(title, plotter_kwargs, well_data, page_label)
+                    )
+            return
+
+        if cache_folder is None:
+            with tempfile.TemporaryDirectory() as page_folder:
+                self._write_pdf_pages(
+                    outfile,
+                    pages,
+                    curve_pages,
+                    page_labels,
+                    page_folder,
+                    n_jobs,
+                    plot_service,
                 )
-                page_no += 1
-                pdf_file.savefig(i)
+        else:
+            os.makedirs(cache_folder, exist_ok=True)
+            page_files = self._write_pdf_pages(
+                outfile,
+                pages,
+                curve_pages,
+                page_labels,
+                cache_folder,
+                n_jobs,
+                plot_service,
+            )
+            # remove pages that are not part of the current report
+            for file_name in os.listdir(cache_folder):
+                page_file = os.path.join(cache_folder, file_name)
+                if page_file not in page_files and file_name.startswith("page_"):
+                    os.remove(page_file)
+
+    def _write_pdf_pages(
+        self,
+        outfile,
+        pages,
+        curve_pages,
+        page_labels,
+        page_folder,
+        n_jobs,
+        plot_service,
+    ):
+        """
+        Writes the pages of a PDF report as separate files to page_folder and merges them
+        to outfile (used by PdfReport)
+
+        Returns
+        -------
+        a list of page files in the order of the pages
+        """
+        plotter_kwargs = self._plotter_kwargs()
+        # summary pages are written in the main process
+        page_files = []
+        for page_no, page in enumerate(pages, 1):
+            page_file = os.path.join(page_folder, "summary_{}.pdf".format(page_no))
+            page.savefig(page_file, format="pdf")
+            page_files.append(page_file)
+
+        # pages with sample plots are named after their contents, existing ones are re-used
+        tasks = []
+        for title, datatype, samples in curve_pages:
+            well_data = [self._plot_data(i, datatype) for i in samples]
+            page_file = os.path.join(
+                page_folder,
+                "page_{}.pdf".format(_pdf_page_key(title, plotter_kwargs, well_data)),
+            )
+            page_files.append(page_file)
+            if not os.path.isfile(page_file):
+                tasks.append((page_file, title, plotter_kwargs, well_data))
+        self.print_message(
+            "Rendering {} of {} pages with sample plots...".format(
+                len(tasks), len(curve_pages)
+            ),
+            "i",
+        )
+        if plot_service is None:
+            with PlotService(n_jobs=n_jobs) as plot_service:
+                plot_service.map(_render_pdf_page, tasks)
+        else:
+            plot_service.map(_render_pdf_page, tasks)
 
-        # clean up mpl objects
-        plt.close("all")
+        _merge_pdf(page_files, outfile, page_labels)
+        return page_files
 
     def _get_failed_samples(self):
         """
@@ -2597,6 +4913,7 @@ class MoltenProtFit:
         """
         return self.plate_raw.columns.difference(self.plate_results.index)
 
+    @_instrumented("WriteOutput")
     def WriteOutput(
         self,
         print10=False,
@@ -2609,6 +4926,8 @@ class MoltenProtFit:
         n_jobs=1,
         no_data=False,
         pdf=False,
+        plot_service=None,
+        pdf_cache=None,
     ):
         """
         Write the results to the disk
@@ -2635,6 +4954,12 @@ class MoltenProtFit:
             do not output any data
         pdf
             write a report in PDF format
+        plot_service
+            a running PlotService to render the figures (e.g. shared by several datasets);
+            if None, a new one with n_jobs workers is started
+        pdf_cache
+            a folder to keep the pages of the PDF report between runs, so that only
+            the changed pages are rendered again (a subfolder resources_prefix is used)
         """
         if heatmaps is None:
             heatmaps = []
@@ -2712,7 +5037,15 @@ class MoltenProtFit:
                 )
         # PDF report
         if pdf:
-            self.PdfReport(os.path.join(output_path, resources_prefix + "_report.pdf"))
+            cache_folder = None
+            if pdf_cache is not None:
+                cache_folder = os.path.join(pdf_cache, resources_prefix)
+            self.PdfReport(
+                os.path.join(output_path, resources_prefix + "_report.pdf"),
+                n_jobs=n_jobs,
+                cache_folder=cache_folder,
+                plot_service=plot_service,
+            )
 
         # generate heatmaps
         if len(heatmaps) > 0:
@@ -2757,39 +5090,29 @@ class MoltenProtFit:
                     print("Valid options are:")
                     print(", ".join(list(self.plate_results.columns)))
 
-            # clean up after plotting so that no parameters are carried over to downstream plottings
-            plt.close("all")
-
         # generate plots of individual samples
         # BUG for multi-dataset instance using --genfigs will overwrite images
         if genpics:
             self.print_message("Generating figures... This may take a while...", "i")
-            # depending on the value of parallelization either run a single or multi-processor command
-            if parallelization and n_jobs > 1:
+            # fitted samples are plotted in overview mode, failed samples (if any) as raw data
+            # TODO add the derivative curve so that the failed sample plots look nicer
+            # NOTE the data is collected lazily, so that only the wells being plotted are kept in memory
+            well_data = itertools.chain(
+                (self._plot_data(i) for i in self.plate_fit.columns.values),
+                (self._plot_data(i, datatype="raw") for i in failed_samples),
+            )
+            total = len(self.plate_fit.columns) + len(failed_samples)
 
-                # with picklable plotfig method:
-                Parallel(n_jobs=n_jobs)(
-                    delayed(self.plotfig)(output_path=output_path, wellID=i)
-                    for i in self.plate_fit.columns.values
-                )
-                # plot raw data of failed samples
-                if len(failed_samples) > 0:
-                    Parallel(n_jobs=n_jobs)(
-                        delayed(self.plotfig)(
-                            output_path=output_path, datatype="raw", wellID=i
-                        )
-                        for i in failed_samples
+            if plot_service is None:
+                with PlotService(n_jobs=n_jobs) as plot_service:
+                    done = plot_service.render(
+                        output_path, self._plotter_kwargs(), well_data, total=total
                     )
             else:
-                for i in self.plate_fit.columns.values:
-                    # save to default path
-                    self.plotfig(output_path, i)
-
-                # plot failed samples, if any
-                # TODO add the derivative curve so that the plots look nicer
-                if len(failed_samples) > 0:
-                    for i in failed_samples:
-                        self.plotfig(output_path=output_path, datatype="raw", wellID=i)
+                done = plot_service.render(
+                    output_path, self._plotter_kwargs(), well_data, total=total
+                )
+            self.print_message("Plotted {} of {} samples".format(done, total), "i")
 
 
 class MoltenProtFitMultiple:
@@ -2820,6 +5143,8 @@ class MoltenProtFitMultiple:
         self.scan_rate = scan_rate
         self.denaturant = denaturant
         self.datasets = {}
+        # messages that concern all datasets (see print_message)
+        self.events = []
 
     def __getstate__(self):
         """
@@ -2832,19 +5157,31 @@ class MoltenProtFitMultiple:
 
     def print_message(self, text, message_type):
         """
-        Print a message and add it to the protocolString of all datasets
+        Log a message and add it to the events of all datasets
         """
-        if message_type == "w":
-            prefix = "Warning: "
-        elif message_type == "i":
-            prefix = "Information: "
-        else:
+        if message_type not in ("i", "w"):
             raise ValueError("Unknown message type '{}'".format(message_type))
-        message = "{}{} (All)".format(prefix, text)
-        print(message)
-        message += "\n"
+        event = {"type": message_type, "text": text, "dataset": "All", "well": None}
+        _log_event(event)
+        self.__dict__.setdefault("events", []).append(event)
         for _, j in self.datasets.items():
-            j.protocolString += message
+            j.events.append(event)
+
+    def GetMessages(self):
+        """
+        Returns a DataFrame with the messages of all datasets (columns type, text, dataset, well);
+        the messages that concern all datasets are listed once
+        """
+        frames = [
+            pd.DataFrame(
+                self.__dict__.get("events", []),
+                columns=["type", "text", "dataset", "well"],
+            )
+        ]
+        for dataset in self.datasets.values():
+            frame = dataset.GetMessages()
+            frames.append(frame[frame["dataset"] != "All"])
+        return pd.concat(frames, ignore_index=True)
 
     def GetAnalysisSettings(self):
         """
@@ -2879,6 +5216,46 @@ class MoltenProtFitMultiple:
 
         return (analysis_settings, model_settings)
 
+    def GetStageTimes(self):
+        """
+        Returns a DataFrame with the wall time of analysis stages in all datasets
+        (see MoltenProtFit.GetStageTimes), the dataset name is in column Dataset
+        """
+        return self._combine_datasets("GetStageTimes")
+
+    def GetFitStatistics(self):
+        """
+        Returns a DataFrame with per-well fit statistics of all datasets
+        (see MoltenProtFit.GetFitStatistics), the dataset name is in column Dataset
+        """
+        return self._combine_datasets("GetFitStatistics")
+
+    def _combine_datasets(self, method):
+        "Concatenate the DataFrames returned by a MoltenProtFit method for all datasets"
+        frames = []
+        for name, dataset in self.datasets.items():
+            frame = getattr(dataset, method)()
+            frame.insert(0, "Dataset", name)
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def WriteTrace(self, filename, trace_format="chrome"):
+        """
+        Write the analysis stages and per-well fits of all datasets to a trace file
+
+        Parameters
+        ----------
+        filename
+            output file
+        trace_format
+            chrome (for chrome://tracing or Perfetto) or speedscope (for speedscope.app)
+        """
+        write_trace(
+            self.GetStageTimes(), self.GetFitStatistics(), filename, trace_format
+        )
+
     def AddDataset(self, data, readout):
         """
         Add an individual Dataset (as MP_fit instance in datasets attribute)
@@ -3058,7 +5435,7 @@ class MoltenProtFitMultiple:
                 if printout:
                     dset.printAnalysisSettings()
 
-    def PrepareAndAnalyseSingle(self, which):
+    def PrepareAndAnalyseSingle(self, which, n_jobs=1):
         """
         Run data processing pipeline on a single dataset
 
@@ -3066,16 +5443,18 @@ class MoltenProtFitMultiple:
         ----------
         which
             dataset name
+        n_jobs
+            how many parallel processes to start for model comparison (see MoltenProtFit.ProcessData)
         """
 
         self.datasets[which].PrepareData()
-        self.datasets[which].ProcessData()
+        self.datasets[which].ProcessData(n_jobs=n_jobs)
 
         # NOTE return statement is only needed for parallelized code (MoltenProtFitMultiple instance
         # gets overwritten and computed results are not stored)
         return self.datasets[which]
 
-    def PrepareAndAnalyseAll(self, n_jobs=1):
+    def PrepareAndAnalyseAll(self, n_jobs=1, profile=None, lead=None):
         """
         Run analysis on all datasets
 
@@ -3083,19 +5462,159 @@ class MoltenProtFitMultiple:
         ----------
         n_jobs : int
             how many parallel processes to start
+        profile : RunProfiler
+            collect cProfile statistics of the run (including the worker processes)
+        lead : str
+            a dataset (e.g. Ratio) that is analysed first; its fit results are the starting
+            values of the transition parameters in all other datasets (see MoltenProtFit.SetWarmStart);
+            with n_jobs > 1 the wells of the other datasets are fit as soon as the same wells
+            of the lead dataset are done (see _pipeline_lead)
         """
         analysis_tuple = self.GetDatasets()
+        if lead is not None and lead not in analysis_tuple:
+            raise ValueError("Lead dataset '{}' not found".format(lead))
+
+        with profile if profile is not None else nullcontext():
+            if (
+                lead is not None
+                and parallelization
+                and n_jobs > 1
+                and not any(self.datasets[i].compare_models for i in analysis_tuple)
+            ):
+                # the other datasets start as soon as a batch of lead wells is fit
+                self._pipeline_lead(lead, n_jobs, profile=profile)
+                return
+            # NOTE the other datasets depend on the lead one, it is analysed before them
+            warm_start = None
+            if lead is not None:
+                self.datasets[lead].SetWarmStart(None)
+                self.PrepareAndAnalyseSingle(lead, n_jobs=n_jobs)
+                analysis_tuple = tuple(i for i in analysis_tuple if i != lead)
+                warm_start = self._get_warm_start(lead)
+            for i in analysis_tuple:
+                self.datasets[i].SetWarmStart(warm_start)
+
+            # parallelization of analysis routine
+            # NOTE with model comparison the models are fit in parallel within each dataset instead
+            compare = any(self.datasets[i].compare_models for i in analysis_tuple)
+            if parallelization and n_jobs > 1 and not compare:
+                from joblib import Parallel, delayed
+
+                if profile is not None:
+                    results_tuple = profile.collect(
+                        Parallel(n_jobs=n_jobs)(
+                            delayed(_profiled_call)(self.PrepareAndAnalyseSingle, i)
+                            for i in analysis_tuple
+                        )
+                    )
+                else:
+                    results_tuple = Parallel(n_jobs=n_jobs)(
+                        delayed(self.PrepareAndAnalyseSingle)(i) for i in analysis_tuple
+                    )
+                for i, j in zip(analysis_tuple, results_tuple):
+                    self.datasets[i] = j
+            else:
+                for i in analysis_tuple:
+                    self.PrepareAndAnalyseSingle(i, n_jobs=n_jobs)
 
-        # parallelization of analysis routine
-        if parallelization and n_jobs > 1:
-            results_tuple = Parallel(n_jobs=n_jobs)(
-                delayed(self.PrepareAndAnalyseSingle)(i) for i in analysis_tuple
+    def _get_warm_start(self, lead):
+        """
+        Returns the fit parameters of a dataset in the format of MoltenProtFit.SetWarmStart
+        (or None if the dataset was not analysed)
+        """
+        dataset = self.datasets[lead]
+        if not dataset.analysisHasBeenDone():
+            self.print_message(
+                "Lead dataset {} was not analysed, no warm start is possible".format(lead),
+                "w",
             )
-            for i, j in zip(analysis_tuple, results_tuple):
-                self.datasets[i] = j
-        else:
-            for i in analysis_tuple:
-                self.PrepareAndAnalyseSingle(i)
+            return None
+        return _fit_values(dataset)
+
+    def _pipeline_lead(self, lead, n_jobs, profile=None, batch_size=8):
+        """
+        Implementation of PrepareAndAnalyseAll with a lead dataset and a pool of worker processes
+
+        The lead dataset is fit in batches of wells; when a batch is finished, the same wells
+        of the other datasets are queued with its fit results as the starting values
+        (see MoltenProtFit.SetWarmStart). The wells that the lead dataset does not have
+        are queued from the start. The results of the batches are combined in the end.
+
+        Parameters
+        ----------
+        lead
+            the name of the lead dataset
+        n_jobs
+            the number of worker processes
+        profile
+            RunProfiler to collect the statistics of the workers
+        batch_size
+            the number of wells in a task
+
+        Notes
+        -----
+        * the deadline option applies to each batch of wells rather than to the whole dataset
+        """
+        from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+        for dataset in self.datasets.values():
+            dataset.PrepareData()
+            dataset.SetWarmStart(None)
+        lead_dataset = self.datasets[lead]
+        followers = []
+        parts = {lead: []}
+        pending = {}  # future -> dataset name
+
+        def submit(name, dataset):
+            if profile is not None:
+                future = executor.submit(_profiled_call, _process_wells, dataset)
+            else:
+                future = executor.submit(_process_wells, dataset)
+            pending[future] = name
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            for wells in _batched(lead_dataset.plate.columns, batch_size):
+                submit(lead, lead_dataset._subset(wells))
+            for name, dataset in self.datasets.items():
+                if name == lead:
+                    continue
+                if dataset.model == "skip":
+                    dataset.ProcessData()
+                    continue
+                followers.append(name)
+                parts[name] = []
+                unmatched = dataset.plate.columns.difference(
+                    lead_dataset.plate.columns, sort=False
+                )
+                for wells in _batched(unmatched, batch_size):
+                    submit(name, dataset._subset(wells))
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    part = future.result()
+                    if profile is not None:
+                        (part,) = profile.collect([part])
+                    parts[name].append(part)
+                    if name != lead:
+                        continue
+                    # the starting values for these wells are known, queue the other fits
+                    warm_start = None
+                    if part.analysisHasBeenDone():
+                        warm_start = _fit_values(part)
+                    for follower in followers:
+                        dataset = self.datasets[follower]
+                        wells = dataset.plate.columns.intersection(part.plate.columns)
+                        if len(wells):
+                            subset = dataset._subset(wells)
+                            subset.SetWarmStart(warm_start)
+                            submit(follower, subset)
+
+        for name, dataset_parts in parts.items():
+            self.datasets[name]._merge_wells(dataset_parts)
+        warm_start = self._get_warm_start(lead)
+        for name in followers:
+            self.datasets[name].SetWarmStart(warm_start)
 
     def CombineResults(self, outfile, tm_stdev_filt=-1, bs_filt=-1, merge_dup=False):
         """
@@ -3117,7 +5636,15 @@ class MoltenProtFitMultiple:
         TODO: add more generic filtering options
         """
 
-        analysis_tuple = self.GetDatasets()
+        # skip non-processed datasets (model=skip or no samples were fit)
+        analysis_tuple = [
+            i
+            for i in self.GetDatasets(no_skip=True)
+            if self.datasets[i].analysisHasBeenDone()
+        ]
+        if not analysis_tuple:
+            self.print_message("No results to combine, {} not written".format(outfile), "w")
+            return None
 
         # initiate xlsx writer objects
         with pd.ExcelWriter(outfile) as writer:
@@ -3128,9 +5655,6 @@ class MoltenProtFitMultiple:
                 else:
                     tm_key = "Tm"
 
-                # skip non-processed datasets (model=skip)
-                if self.datasets[i].model == "skip":
-                    continue
                 output = self.datasets[i].CombineResults(
                     tm_stdev_filt=tm_stdev_filt,
                     bs_filt=bs_filt,
@@ -3140,7 +5664,7 @@ class MoltenProtFitMultiple:
                 # NOTE Excel sheets are now named identically to input dataset names
                 output.to_excel(writer, sheet_name=i)
 
-    def GenerateReport(self, heatmap_cmap, template_path=None):
+    def GenerateReport(self, heatmap_cmap, template_path=None, embed_curves=False):
         """
         Creates an interactive HTML report (as a string)
 
@@ -3150,6 +5674,9 @@ class MoltenProtFitMultiple:
             matplotlib colormap for heatmap
         template_path
             the HTML template
+        embed_curves
+            embed the (downsampled) curves of all samples in the report, so that they are drawn
+            by the browser; otherwise the report shows images from the <readout>_resources folders
 
         Returns
         -------
@@ -3181,14 +5708,22 @@ class MoltenProtFitMultiple:
 
         # cycle through all datasets and get glue up strings to the starting button or heatmap string
         first_heatmap = None
+        curves = {}
         for dataset_name, dataset in self.datasets.items():
             # skip non-processed datasets
-            if dataset.model != "skip":
+            if dataset.model != "skip" and dataset.analysisHasBeenDone():
                 heatmap_table += dataset.html_heatmap(heatmap_cmap, display_heatmap)
                 if display_heatmap == "table":
                     display_heatmap = "none"
                     first_heatmap = dataset_name
                 buttons += dataset.html_button()
+                if embed_curves:
+                    curves[dataset.readout_type] = dataset.html_curves()
+
+        # the curves are inserted as a JavaScript object (NaN values are valid there)
+        curve_data = "null"
+        if embed_curves:
+            curve_data = json.dumps(curves, separators=(",", ":")).replace("</", "<\\/")
 
         output = template.substitute(
             FILE=self.source,
@@ -3198,6 +5733,7 @@ class MoltenProtFitMultiple:
             BUTTONS=buttons,
             VERSION=__version__,
             TIMESTAMP=strftime("%c"),
+            CURVE_DATA=curve_data,
         )
 
         return output
@@ -3239,10 +5775,13 @@ class MoltenProtFitMultiple:
 
         Notes
         -----
-        * No output generated for datasets with model "skip"
+        * No output generated for datasets with model "skip" or without fit samples
         * Do not use this method directly, use WriteOutputAll instead
         """
-        if self.datasets[which].model == "skip":
+        if (
+            self.datasets[which].model == "skip"
+            or not self.datasets[which].analysisHasBeenDone()
+        ):
             pass
         else:
             if subfolder:
@@ -3277,6 +5816,9 @@ class MoltenProtFitMultiple:
         n_jobs=1,
         no_data=False,
         session=False,
+        pdf_cache=None,
+        embed_curves=False,
+        profile=None,
     ):
         """
         Write output to disc for all associated datasets
@@ -3302,6 +5844,47 @@ class MoltenProtFitMultiple:
             matplotlib colormap for heatmap
         session : bool
             save MP session in JSON format
+        pdf_cache : None or str
+            for PDF reports: a folder to keep the rendered pages between runs,
+            only the pages with changed samples are rendered again
+        embed_curves : bool
+            for HTML reports: embed the curves in report.html instead of creating figures for samples
+        profile : RunProfiler
+            collect cProfile statistics of the output (including the worker processes)
+        """
+        with profile if profile is not None else nullcontext():
+            self._write_output_all(
+                outfolder,
+                xlsx=xlsx,
+                genpics=genpics,
+                heatmaps=heatmaps,
+                report_format=report_format,
+                heatmap_cmap=heatmap_cmap,
+                n_jobs=n_jobs,
+                no_data=no_data,
+                session=session,
+                pdf_cache=pdf_cache,
+                embed_curves=embed_curves,
+                profile=profile,
+            )
+
+    def _write_output_all(
+        self,
+        outfolder,
+        xlsx,
+        genpics,
+        heatmaps,
+        report_format,
+        heatmap_cmap,
+        n_jobs,
+        no_data,
+        session,
+        pdf_cache,
+        embed_curves,
+        profile,
+    ):
+        """
+        Implementation of WriteOutputAll (see its docstring for the parameters)
         """
         if heatmaps is None:
             heatmaps = []
@@ -3327,26 +5910,49 @@ class MoltenProtFitMultiple:
         # NOTE since reports are pre-defined data bundles, they may override some of the previous settings
         if report_format == "html":
             # generate a reporthtml string
-            reporthtml = self.GenerateReport(heatmap_cmap=heatmap_cmap)
+            reporthtml = self.GenerateReport(
+                heatmap_cmap=heatmap_cmap, embed_curves=embed_curves
+            )
             # write all datatets to dedicated subfolders
             output_kwargs["subfolder"] = True
             # write the HTML of the report to outdir
             with open(os.path.join(outfolder, "report.html"), "w") as file:
                 file.write(reporthtml)
             output_kwargs["xlsx"] = True
-            output_kwargs["genpics"] = True
+            # figures are only needed if the curves are not embedded in the report
+            if not embed_curves:
+                output_kwargs["genpics"] = True
             output_kwargs["no_data"] = False
         elif report_format == "xlsx":
             self.CombineResults(os.path.join(outfolder, "report.xlsx"), -1, -1, False)
         elif report_format == "pdf":
             output_kwargs["pdf"] = True
+            output_kwargs["pdf_cache"] = pdf_cache
 
         # write output in parallel or serially
         if parallelization and n_jobs > 1:
-            if len(self.GetDatasets()) == 1:
-                # if there is only a single associated dataset, it makes sense to enable parallel figure plotting
-                self.WriteOutputSingle(
-                    self.GetDatasets()[0], outfolder, n_jobs=n_jobs, **output_kwargs
+            from joblib import Parallel, delayed
+
+            if (
+                len(self.GetDatasets()) == 1
+                or output_kwargs.get("genpics")
+                or output_kwargs.get("pdf")
+            ):
+                # figures are the slowest part of the output, so if they are requested
+                # all datasets share a single pool of plotting workers
+                with PlotService(n_jobs=n_jobs, profiler=profile) as plot_service:
+                    for i in self.GetDatasets():
+                        self.WriteOutputSingle(
+                            i, outfolder, plot_service=plot_service, **output_kwargs
+                        )
+            elif profile is not None:
+                profile.collect(
+                    Parallel(n_jobs=n_jobs)(
+                        delayed(_profiled_call)(
+                            self.WriteOutputSingle, i, outfolder, **output_kwargs
+                        )
+                        for i in self.GetDatasets()
+                    )
                 )
             else:
                 Parallel(n_jobs=n_jobs)(
@@ -3363,18 +5969,53 @@ class MoltenProtFitMultiple:
             mp_to_json(self, output=os.path.join(outfolder, "MP_session.json"))
 
 
+def _fit_values(dataset):
+    """
+    Returns the fit parameters of an analysed dataset in the format of MoltenProtFit.SetWarmStart
+    """
+    fit_values = dataset.plate_results.filter(regex="_fit$")
+    fit_values.columns = [i[: -len("_fit")] for i in fit_values.columns]
+    return fit_values.T
+
+
+def _process_wells(dataset):
+    """
+    Runs ProcessData of a prepared dataset (e.g. a subset of wells, see MoltenProtFit._subset)
+    in a worker process and returns the dataset with the results
+    """
+    dataset.ProcessData()
+    return dataset
+
+
 class MoltenProtFitMultipleLE(MoltenProtFitMultiple):
     """
     A special class to handle the lumry_eyring model
-    The main difference is that Scattering signal is required and
-    the datasets are processed sequentially
+    The main difference is that Scattering signal is required and the other datasets
+    depend on the results of Scattering
     """
 
-    def PrepareAndAnalyseAll(self, n_jobs=1):
+    def PrepareAndAnalyseAll(self, n_jobs=1, profile=None, lead=None):
         """
         First the scattering data is fit to get Ea and Tf for reaction U->A
         Then they are supplied as fixed parameters to fit reaction N <-kF, kR -> U
         This fit is done in all other datasets
+
+        Notes
+        -----
+        * with n_jobs > 1 the wells are fit in parallel: as soon as the Scattering fit of a batch
+        of wells is done, the fits of the same wells in the other datasets are started
+        (see _pipeline_le), otherwise the datasets are processed sequentially
+        * lead is not used: the Scattering dataset is always analysed first
+        """
+        with profile if profile is not None else nullcontext():
+            if parallelization and n_jobs > 1:
+                self._pipeline_le(n_jobs, profile=profile)
+            else:
+                self._prepare_and_analyse_le()
+
+    def _check_le(self):
+        """
+        Checks that a Scattering dataset is available and sets its model to irrev
         """
         # rename dataset if refolded data was used
         if "Scattering (Unfolding)" in self.GetDatasets():
@@ -3386,6 +6027,103 @@ class MoltenProtFitMultipleLE(MoltenProtFitMultiple):
 
         # run analysis of Scattering data with irrev model (has to be changed from whatever was supplied)
         self.datasets["Scattering"].model = "irrev"
+
+    def _pipeline_le(self, n_jobs, profile=None, batch_size=8):
+        """
+        Implementation of PrepareAndAnalyseAll with a pool of worker processes
+
+        The Scattering dataset is fit in batches of wells; when a batch is finished,
+        the same wells of the lumry_eyring datasets are queued with the fitted Tf and Ea
+        as fixed parameters. Datasets with other models do not depend on Scattering and
+        are queued from the start. The results of the batches are combined in the end.
+
+        Parameters
+        ----------
+        n_jobs
+            the number of worker processes
+        profile
+            RunProfiler to collect the statistics of the workers
+        batch_size
+            the number of wells in a task
+
+        Notes
+        -----
+        * the deadline option applies to each batch of wells rather than to the whole dataset
+        """
+        from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+        self._check_le()
+        for dataset in self.datasets.values():
+            dataset.PrepareData()
+        scattering = self.datasets["Scattering"]
+        le_datasets = []
+        parts = {}
+        pending = {}  # future -> dataset name
+
+        def submit(name, dataset):
+            if profile is not None:
+                future = executor.submit(_profiled_call, _process_wells, dataset)
+            else:
+                future = executor.submit(_process_wells, dataset)
+            pending[future] = name
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            for wells in _batched(scattering.plate.columns, batch_size):
+                submit("Scattering", scattering._subset(wells))
+            for name, dataset in self.datasets.items():
+                if name == "Scattering":
+                    continue
+                if dataset.model == "lumry_eyring":
+                    le_datasets.append(name)
+                    parts[name] = []
+                elif dataset.model == "skip":
+                    dataset.ProcessData()
+                else:
+                    submit(name, dataset._subset(dataset.plate.columns))
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    part = future.result()
+                    if profile is not None:
+                        (part,) = profile.collect([part])
+                    parts.setdefault(name, []).append(part)
+                    if name != "Scattering" or not part.analysisHasBeenDone():
+                        continue
+                    # the fixed parameters for these wells are known, queue the LE fits
+                    fixed = part.plate_results.loc[:, ["Tf_fit", "Ea_fit"]].T
+                    for le_name in le_datasets:
+                        dataset = self.datasets[le_name]
+                        wells = dataset.plate.columns.intersection(fixed.columns)
+                        if len(wells):
+                            subset = dataset._subset(wells)
+                            subset.SetFixedParameters(fixed[wells])
+                            submit(le_name, subset)
+
+        for name, dataset_parts in parts.items():
+            self.datasets[name]._merge_wells(dataset_parts)
+        if not scattering.analysisHasBeenDone():
+            return
+        fixed = scattering.plate_results.loc[:, ["Tf_fit", "Ea_fit"]].T
+        for le_name in le_datasets:
+            dataset = self.datasets[le_name]
+            dataset.SetFixedParameters(fixed)
+            # the wells without a Scattering fit cannot be fit with lumry_eyring
+            missing = list(dataset.plate.columns.difference(fixed.columns))
+            if missing:
+                dataset.print_message(
+                    "No Scattering fit for samples {}, they were not fit".format(
+                        ", ".join(missing)
+                    ),
+                    "w",
+                )
+                dataset.bad_fit.extend(missing)
+
+    def _prepare_and_analyse_le(self):
+        """
+        Implementation of PrepareAndAnalyseAll (the datasets are processed sequentially)
+        """
+        self._check_le()
         self.PrepareAndAnalyseSingle("Scattering")
         # cycle through all other datasets and add fixed parameters
         for dataset in self.GetDatasets():
@@ -3617,6 +6355,7 @@ def parse_prom_xlsx(
     TODO
     * the sheets have a standardized order in the file: Overview, Readout1_(unfolding), Readout1_(unfolding)_derivative ...,  Readout1_(refolding), Readout1_(refolding)_derivative ... ; this can be used to parse data independently of sheet labels; also, the sheets containing "deriv" can be auto-excluded
     """
+    from scipy.interpolate import interp1d
 
     # force the input file to have absolute path (to be stored in JSON session)
     filename = os.path.abspath(filename)
@@ -0,0 +1,306 @@
+"Compiled (Numba) versions of the model functions, used by MoltenProtFit.ProcessData if Numba is installed"
+# Copyright 2020,2021,2025 Vadim Kotov, Thomas C. Marlovits
+#
+#     This file is part of MoltenProt.
+#
+#     MoltenProt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     MoltenProt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with MoltenProt.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Each model function is computed in a single loop over the temperatures, without NumPy
+temporaries. The two-state models also have analytic Jacobians (passed to curve_fit),
+the kinetic models use compiled right-hand sides of their differential equations.
+
+Use get_kernels to obtain the compiled functions for a model instance. This module requires
+Numba; core only imports it if Numba is available (see core.jit_compilation).
+"""
+
+from math import exp, log
+
+import numpy as np
+import pandas as pd
+from numba import njit
+
+from . import models
+
+R = models.R
+
+# NOTE error_model="numpy" gives inf/nan for division by zero (same as the NumPy model functions)
+# instead of raising ZeroDivisionError
+_compile = njit(cache=True, error_model="numpy")
+
+
+@_compile
+def _expit(x):
+    "Logistic function 1/(1 + exp(-x)) without overflow"
+    if x >= 0:
+        return 1.0 / (1.0 + exp(-x))
+    z = exp(x)
+    return z / (1.0 + z)
+
+
+@_compile
+def _two_state(T, kN, bN, kU, bU, x_scale, x_offset, reciprocal):
+    """
+    Signal of a two-state model with fraction unfolded expit(x), where
+    x = x_scale * (x_offset - 1/T) if reciprocal, otherwise x = x_scale * (T - x_offset)
+    """
+    out = np.empty(T.shape[0])
+    for i in range(T.shape[0]):
+        t = T[i]
+        if reciprocal:
+            fU = _expit(x_scale * (x_offset - 1.0 / t))
+        else:
+            fU = _expit(x_scale * (t - x_offset))
+        out[i] = kN * t + bN + ((kU - kN) * t + bU - bN) * fU
+    return out
+
+
+@_compile
+def _two_state_jacobian(T, kN, bN, kU, bU, x_scale, x_offset, reciprocal):
+    """
+    Derivatives of _two_state by kN, bN, kU, bU and by x (the last column is multiplied
+    by the derivatives of x by the nonlinear parameters in the callers)
+    """
+    out = np.empty((T.shape[0], 5))
+    for i in range(T.shape[0]):
+        t = T[i]
+        if reciprocal:
+            fU = _expit(x_scale * (x_offset - 1.0 / t))
+        else:
+            fU = _expit(x_scale * (t - x_offset))
+        out[i, 0] = t * (1.0 - fU)
+        out[i, 1] = 1.0 - fU
+        out[i, 2] = t * fU
+        out[i, 3] = fU
+        out[i, 4] = ((kU - kN) * t + bU - bN) * fU * (1.0 - fU)
+    return out
+
+
+@_compile
+def equilibrium_two_state(T, kN, bN, kU, bU, dHm, Tm):
+    "Same as EquilibriumTwoState.fun"
+    return _two_state(T, kN, bN, kU, bU, dHm / R, 1.0 / Tm, True)
+
+
+@_compile
+def equilibrium_two_state_jacobian(T, kN, bN, kU, bU, dHm, Tm):
+    "Jacobian of EquilibriumTwoState.fun"
+    partial = _two_state_jacobian(T, kN, bN, kU, bU, dHm / R, 1.0 / Tm, True)
+    out = np.empty((T.shape[0], 6))
+    out[:, :4] = partial[:, :4]
+    for i in range(T.shape[0]):
+        # x = dHm/R * (1/Tm - 1/T)
+        out[i, 4] = partial[i, 4] * (1.0 / Tm - 1.0 / T[i]) / R
+        out[i, 5] = -partial[i, 4] * dHm / (R * Tm * Tm)
+    return out
+
+
+@_compile
+def empirical_two_state(T, kN, bN, kU, bU, T_onset, Tm, onset_threshold):
+    "Same as EmpiricalTwoState.fun"
+    log_ratio = log(onset_threshold / (1 - onset_threshold))
+    return _two_state(T, kN, bN, kU, bU, log_ratio / (T_onset - Tm), Tm, False)
+
+
+@_compile
+def empirical_two_state_jacobian(T, kN, bN, kU, bU, T_onset, Tm, onset_threshold):
+    "Jacobian of EmpiricalTwoState.fun"
+    log_ratio = log(onset_threshold / (1 - onset_threshold))
+    delta = T_onset - Tm
+    partial = _two_state_jacobian(T, kN, bN, kU, bU, log_ratio / delta, Tm, False)
+    out = np.empty((T.shape[0], 6))
+    out[:, :4] = partial[:, :4]
+    for i in range(T.shape[0]):
+        # x = (T - Tm) * log_ratio / (T_onset - Tm)
+        out[i, 4] = -partial[i, 4] * (T[i] - Tm) * log_ratio / (delta * delta)
+        out[i, 5] = partial[i, 4] * (T[i] - T_onset) * log_ratio / (delta * delta)
+    return out
+
+
+@_compile
+def _three_state(T, kN, bN, kU, bU, kI, x1, x12):
+    """
+    Signal of a three-state model for the exponents x1 and x12 of the statistical weights
+    of I and U (one value per temperature)
+    """
+    out = np.empty(T.shape[0])
+    for i in range(T.shape[0]):
+        shift = max(0.0, x1[i], x12[i])
+        weight_N = exp(-shift)
+        weight_I = exp(x1[i] - shift)
+        weight_U = exp(x12[i] - shift)
+        out[i] = (
+            (kN * T[i] + bN) * weight_N + kI * weight_I + (kU * T[i] + bU) * weight_U
+        ) / (weight_N + weight_I + weight_U)
+    return out
+
+
+@_compile
+def equilibrium_three_state(T, kN, bN, kU, bU, kI, dHm1, T1, dHm2, dT2_1):
+    "Same as EquilibriumThreeState.fun"
+    x1 = np.empty(T.shape[0])
+    x12 = np.empty(T.shape[0])
+    for i in range(T.shape[0]):
+        x1[i] = dHm1 / R * (1.0 / T1 - 1.0 / T[i])
+        x12[i] = x1[i] + dHm2 / R * (1.0 / (T1 + dT2_1) - 1.0 / T[i])
+    return _three_state(T, kN, bN, kU, bU, kI, x1, x12)
+
+
+@_compile
+def empirical_three_state(T, kN, bN, kU, bU, kI, T_onset1, T1, T_onset2, T2, onset_threshold):
+    "Same as EmpiricalThreeState.fun"
+    log_ratio = log(onset_threshold / (1 - onset_threshold))
+    x1 = np.empty(T.shape[0])
+    x12 = np.empty(T.shape[0])
+    for i in range(T.shape[0]):
+        x1[i] = (T[i] - T1) * log_ratio / (T_onset1 - T1)
+        x12[i] = x1[i] + (T[i] - T2) * log_ratio / (T_onset2 - T2)
+    return _three_state(T, kN, bN, kU, bU, kI, x1, x12)
+
+
+@_compile
+def _arrhenius(t, Tf, Ea):
+    "Same as IrreversibleTwoState.arrhenius"
+    return exp(-Ea / R * (1.0 / t - 1.0 / Tf))
+
+
+@_compile
+def irreversible_ode(t, xn, scan_rate, Tf, Ea):
+    "Same as IrreversibleTwoState.ode"
+    out = np.empty(1)
+    out[0] = -1.0 / scan_rate * _arrhenius(t, Tf, Ea) * xn[0]
+    return out
+
+
+@_compile
+def lumry_eyring_ode(t, z, scan_rate, TfF, EaF, TfR, EaR, Tf2, Ea2):
+    "Same as LumryEyring.ode"
+    k2 = _arrhenius(t, Tf2, Ea2)
+    out = np.empty(2)
+    out[0] = (
+        _arrhenius(t, TfF, EaF) * (1.0 - z[0] - z[1])
+        - (_arrhenius(t, TfR, EaR) + k2) * z[0]
+    ) / scan_rate
+    out[1] = k2 * z[0] / scan_rate
+    return out
+
+
+def _kinetic_kernel(model):
+    """
+    Model functions of the kinetic models that use the compiled differential equations
+    """
+    from scipy.integrate import solve_ivp
+
+    if isinstance(model, models.LumryEyring):
+
+        def kernel(T, kN, bN, kU, bU, kI, TfF, EaF, TfR, EaR):
+            # NOTE tfea is read at each call, it is set per well with set_fixed
+            ivp_result = solve_ivp(
+                lumry_eyring_ode,
+                t_span=[min(T), max(T)],
+                y0=np.array(model.z0, dtype=float),
+                args=(
+                    float(model.scan_rate),
+                    TfF,
+                    EaF,
+                    TfR,
+                    EaR,
+                    float(model.tfea[0]),
+                    float(model.tfea[1]),
+                ),
+                t_eval=T,
+                method="BDF",
+            )
+            fU = ivp_result.y[0, :]
+            fA = ivp_result.y[1, :]
+            return (kN * T + bN) * (1 - fU - fA) + kI * fU + (kU * T + bU) * fA
+
+    else:
+
+        def kernel(t, kN, bN, kU, bU, Tf, Ea):
+            ivp_result = solve_ivp(
+                irreversible_ode,
+                t_span=[min(t), max(t)],
+                t_eval=t,
+                y0=np.array([model.xn], dtype=float),
+                args=(float(model.scan_rate), Tf, Ea),
+                method="BDF",
+            )
+            return kU * t + bU + (kN * t + bN - kU * t - bU) * ivp_result.y[0, :]
+
+    return kernel
+
+
+def get_kernels(model):
+    """
+    Returns the compiled model function and its Jacobian for a model instance
+
+    Parameters
+    ----------
+    model
+        an instance of one of the models in models.py
+
+    Returns
+    -------
+    a tuple (kernel, jacobian) with the same arguments as model.fun (jacobian can be None),
+    or None if there is no compiled version of the model (e.g. a subclass with a custom fun)
+    or the compilation failed
+    """
+    model_type = type(model)
+    jacobian = None
+    if model_type is models.EquilibriumTwoState:
+        kernel = equilibrium_two_state
+        jacobian = equilibrium_two_state_jacobian
+    elif model_type is models.EmpiricalTwoState:
+        threshold = float(model.onset_threshold)
+
+        def kernel(T, kN, bN, kU, bU, T_onset, Tm):
+            return empirical_two_state(T, kN, bN, kU, bU, T_onset, Tm, threshold)
+
+        def jacobian(T, kN, bN, kU, bU, T_onset, Tm):
+            return empirical_two_state_jacobian(T, kN, bN, kU, bU, T_onset, Tm, threshold)
+
+    elif model_type is models.EquilibriumThreeState:
+        kernel = equilibrium_three_state
+    elif model_type is models.EmpiricalThreeState:
+        threshold = float(model.onset_threshold)
+
+        def kernel(T, kN, bN, kU, bU, kI, T_onset1, T1, T_onset2, T2):
+            return empirical_three_state(
+                T, kN, bN, kU, bU, kI, T_onset1, T1, T_onset2, T2, threshold
+            )
+
+    elif model_type in (models.IrreversibleTwoState, models.LumryEyring):
+        kernel = _kinetic_kernel(model)
+    else:
+        return None
+
+    # compile the functions now (or load them from cache), so that errors do not happen during fitting
+    T = np.linspace(300.0, 350.0, 11)
+    params = [float(i) for i in model.param_init(pd.Series(np.zeros(len(T)), index=T))]
+    try:
+        # for the kinetic models only the differential equations are compiled
+        if model_type is models.IrreversibleTwoState:
+            irreversible_ode(T[0], np.ones(1), 1.0, 325.0, 50000.0)
+        elif model_type is models.LumryEyring:
+            lumry_eyring_ode(
+                T[0], np.zeros(2), 1.0, 325.0, 50000.0, 325.0, 50000.0, 325.0, 50000.0
+            )
+        else:
+            kernel(T, *params)
+            if jacobian is not None:
+                jacobian(T, *params)
+    except Exception:
+        return None
+    return kernel, jacobian
@@ -22,12 +22,113 @@ from inspect import signature
 import pandas as pd
 import numpy as np
 
-# numeric integration
-from scipy.integrate import solve_ivp
+# NOTE scipy.integrate (numeric integration) is imported only in the kinetic models that use it
+# (see solve_ivp below)
+_solve_ivp = None
 
 ### Constants
 R = 8.314  # universtal gas constant
 T_std = 298.15  # standard temperature, in Kelvins
+# full width at half maximum of the derivative of a logistic function expit(x), in units of x
+logistic_fwhm = 4 * np.arcsinh(1)
+# full width at half maximum of the peak of a first-order irreversible reaction, in units of R*T^2/Ea
+first_order_fwhm = 2.43
+
+
+def _enthalpy_from_width(T, width):
+    "van 't Hoff enthalpy of a two-state transition with the derivative peak at T and the given width"
+    return logistic_fwhm * R * T**2 / width
+
+
+def _onset_from_width(T, width, onset_threshold):
+    "T_onset of a two-state transition (see EmpiricalTwoState) with the derivative peak at T"
+    return T + np.log(onset_threshold / (1 - onset_threshold)) * width / logistic_fwhm
+
+
+def solve_ivp(*args, **kwargs):
+    """
+    Same as scipy.integrate.solve_ivp; scipy.integrate is imported on the first call
+    """
+    global _solve_ivp
+    if _solve_ivp is None:
+        import scipy.integrate
+
+        _solve_ivp = scipy.integrate.solve_ivp
+    return _solve_ivp(*args, **kwargs)
+
+
+def state_fractions(*exponents):
+    """
+    Fractions of protein states with statistical weights exp(exponent); the first state
+    (usually N) has the weight 1, i.e. exponent 0. Computed without overflow of exp
+
+    Returns
+    -------
+    an array with one row per state (the rows sum up to 1)
+    """
+    exponents = np.stack(np.broadcast_arrays(0.0, *exponents)).astype(float)
+    weights = np.exp(exponents - exponents.max(axis=0))
+    return weights / weights.sum(axis=0)
+
+
+def _two_state_signal(T, kN, bN, kU, bU, x):
+    """
+    Signal (kN*T + bN)*fN + (kU*T + bU)*fU of a two-state model with fU = expit(x), fN = 1 - fU;
+    the array x is overwritten and returned
+    """
+    from scipy.special import expit
+
+    signal = expit(x, out=x)
+    # kN*T + bN + ((kU - kN)*T + bU - bN)*fU
+    buffer = np.multiply(T, kU - kN)
+    buffer += bU - bN
+    signal *= buffer
+    np.multiply(T, kN, out=buffer)
+    buffer += bN
+    signal += buffer
+    return signal
+
+
+def _three_state_signal(T, kN, bN, kU, bU, kI, x1, x12):
+    """
+    Signal (kN*T + bN)*fN + kI*fI + (kU*T + bU)*fU of a three-state model with the
+    statistical weights 1, exp(x1), exp(x12) of N, I and U; the weights are shifted by their
+    maximum (log-sum-exp), so that exp does not overflow. The arrays x1 and x12 are overwritten
+    """
+    shift = np.maximum(x1, x12)
+    np.maximum(shift, 0, out=shift)
+    x1 -= shift
+    weight_I = np.exp(x1, out=x1)
+    x12 -= shift
+    weight_U = np.exp(x12, out=x12)
+    np.negative(shift, out=shift)
+    weight_N = np.exp(shift, out=shift)
+    signal = np.multiply(T, kN)
+    signal += bN
+    signal *= weight_N
+    # the sum of weights
+    weight_N += weight_I
+    weight_I *= kI
+    signal += weight_I
+    np.multiply(T, kU, out=weight_I)
+    weight_I += bU
+    weight_I *= weight_U
+    signal += weight_I
+    weight_N += weight_U
+    signal /= weight_N
+    return signal
+
+
+def baseline_basis(T, fN, fU, fI=None):
+    """
+    Matrix for the linear parameters kN, bN, kU, bU (and kI) of a model with the signal
+    (kN*T + bN)*fN + (kU*T + bU)*fU (+ kI*fI)
+    """
+    columns = [T * fN, fN, T * fU, fU]
+    if fI is not None:
+        columns.append(fI)
+    return np.column_stack(columns)
+
 
 class MoltenProtModel:
     "Prototype class for MoltenProt's fitting models"
@@ -44,6 +145,9 @@ class MoltenProtModel:
     # if None, then final sorting is skipped
     sortby = None
 
+    # parameters that enter fun linearly (they must be the first ones in fun), see linear_basis
+    linear_params = ()
+
     def __init__(self, scan_rate=None):
         """
         In a general case scan rate is not relevant, so it is set to None
@@ -71,6 +175,20 @@ class MoltenProtModel:
         '''
         raise NotImplementedError('Subclass this class and create this method')
 
+    def kernel(self, *args):
+        """
+        Same as fun (same arguments and result), but optimised for fitting; by default fun is used
+        """
+        return self.fun(*args)
+
+    def linear_basis(self, T, *args):
+        """
+        Return a matrix with one column per linear parameter, such that
+        fun(T, *linear, *args) == linear_basis(T, *args) @ linear,
+        where args are the remaining (nonlinear) parameters; used for variable projection fitting
+        """
+        raise NotImplementedError('Models with linear_params must implement this method')
+
     def param_names(self):
         """
         Return parameter names encoded in the function declaration as a list
@@ -90,6 +208,25 @@ class MoltenProtModel:
         return None
         # TODO proper placement of NotImplementedError
 
+    def param_init_peaks(self, p0, peaks):
+        """
+        Refine starting parameters using the peaks of the derivative of the signal
+
+        Parameters
+        ----------
+        p0
+            starting parameters (e.g. from param_init)
+        peaks
+            a list of (temperature, width, prominence) tuples sorted by temperature, where width
+            is the full width at half maximum of the peak (transitions are always maxima, see
+            derivative_peaks in core)
+
+        Returns
+        -------
+        a list of starting parameters; by default p0 is returned unchanged
+        """
+        return list(p0)
+
     def param_bounds(self, input_data=None):
         """
         Return the bounds based on the input data.
@@ -106,6 +243,7 @@ class EquilibriumTwoState(MoltenProtModel):
     short_name = "santoro1988"
     _description = "N <-> U"
     sortby = "dG_std"
+    linear_params = ("kN", "bN", "kU", "bU")
 
     # original function
     # fun = lambda T, kN, bN, kU, bU, d, Tm: ((kN*T + bN + (kU*T + bU)*np.exp(d/R*(1/Tm - 1/T))))/(1+np.exp(d/R*(1/Tm - 1/T)))
@@ -118,6 +256,18 @@ class EquilibriumTwoState(MoltenProtModel):
             1 + np.exp(dHm / R * (1 / Tm - 1 / T))
         )
 
+    def kernel(self, T, kN, bN, kU, bU, dHm, Tm):
+        # dHm/R * (1/Tm - 1/T)
+        T = np.asarray(T, dtype=float)
+        x = np.divide(-1.0, T)
+        x += 1 / Tm
+        x *= dHm / R
+        return _two_state_signal(T, kN, bN, kU, bU, x)
+
+    def linear_basis(self, T, dHm, Tm):
+        fN, fU = state_fractions(dHm / R * (1 / Tm - 1 / T))
+        return baseline_basis(T, fN, fU)
+
     def param_bounds(self, input_data=None):
         # if no data supplied, run the default action from the master class
         # otherwise compute bounds from plate index or hard-coded
@@ -145,12 +295,21 @@ class EquilibriumTwoState(MoltenProtModel):
             + (min(input_data.index) + max(input_data.index)) / 2.0,
         )
 
+    def param_init_peaks(self, p0, peaks):
+        p0 = list(p0)
+        if peaks:
+            # the transition is the most prominent peak
+            Tm, width, _ = max(peaks, key=lambda peak: peak[2])
+            p0[4:6] = _enthalpy_from_width(Tm, width), Tm
+        return p0
+
 
 class EquilibriumThreeState(MoltenProtModel):
     short_name = "santoro1988i"
     _description = "N <-> I <-> U"
     # in theory total stability of the protein is the sum of stabilities of N and I
     sortby = "dG_comb_std"
+    linear_params = ("kN", "bN", "kU", "bU", "kI")
 
     def fun(self, T, kN, bN, kU, bU, kI, dHm1, T1, dHm2, dT2_1):
         'primary fitting equation of the model'
@@ -169,6 +328,24 @@ class EquilibriumThreeState(MoltenProtModel):
             * np.exp(dHm2 / R * (1 / (T1 + dT2_1) - 1 / T))
         )
 
+    def kernel(self, T, kN, bN, kU, bU, kI, dHm1, T1, dHm2, dT2_1):
+        T = np.asarray(T, dtype=float)
+        # x1 = dHm1/R * (1/T1 - 1/T), x12 = x1 + dHm2/R * (1/T2 - 1/T)
+        x12 = np.divide(-1.0, T)
+        x1 = np.add(x12, 1 / T1)
+        x1 *= dHm1 / R
+        x12 += 1 / (T1 + dT2_1)
+        x12 *= dHm2 / R
+        x12 += x1
+        return _three_state_signal(T, kN, bN, kU, bU, kI, x1, x12)
+
+    def linear_basis(self, T, dHm1, T1, dHm2, dT2_1):
+        exp1 = dHm1 / R * (1 / T1 - 1 / T)
+        fN, fI, fU = state_fractions(
+            exp1, exp1 + dHm2 / R * (1 / (T1 + dT2_1) - 1 / T)
+        )
+        return baseline_basis(T, fN, fU, fI)
+
     def param_bounds(self, input_data=None):
         # TESTING preliminary results show that no limits for dHm are better in intermediate mode
         if input_data is None:
@@ -221,12 +398,29 @@ class EquilibriumThreeState(MoltenProtModel):
             0,
         )
 
+    def param_init_peaks(self, p0, peaks):
+        p0 = list(p0)
+        if len(peaks) > 1:
+            (T1, width1, _), (T2, width2, _) = peaks[:2]
+            p0[5:9] = (
+                _enthalpy_from_width(T1, width1),
+                T1,
+                _enthalpy_from_width(T2, width2),
+                T2 - T1,
+            )
+        elif peaks:
+            # a single peak: start from two overlapping transitions (dT2_1 = 0)
+            T1, width1, _ = peaks[0]
+            p0[5:7] = _enthalpy_from_width(T1, width1), T1
+        return p0
+
 
 class EmpiricalTwoState(MoltenProtModel):
     'Implements two-state unfolding model that captures Tm and T_onset'
     short_name = "santoro1988d"
     _description = "Same as santoro1988, but fits Tm and T_onset"
     sortby = "T_eucl"
+    linear_params = ("kN", "bN", "kU", "bU")
     # NOTE onset threshold is hard-coded to 0.01, i.e. onset point is 1% unfolded
     onset_threshold = 0.01
 
@@ -250,6 +444,24 @@ class EmpiricalTwoState(MoltenProtModel):
             )
         )
 
+    def kernel(self, T, kN, bN, kU, bU, T_onset, Tm):
+        T = np.asarray(T, dtype=float)
+        # (T - Tm) * log(threshold / (1 - threshold)) / (T_onset - Tm)
+        x = np.subtract(T, Tm)
+        x *= np.divide(
+            np.log(self.onset_threshold / (1 - self.onset_threshold)),
+            np.subtract(T_onset, Tm),
+        )
+        return _two_state_signal(T, kN, bN, kU, bU, x)
+
+    def linear_basis(self, T, T_onset, Tm):
+        fN, fU = state_fractions(
+            (T - Tm)
+            * np.log(self.onset_threshold / (1 - self.onset_threshold))
+            / (T_onset - Tm)
+        )
+        return baseline_basis(T, fN, fU)
+
     def param_bounds(self, input_data=None):
         if input_data is None:
             return super().param_bounds(None)
@@ -285,6 +497,13 @@ class EmpiricalTwoState(MoltenProtModel):
             (min(input_data.index) + max(input_data.index)) / 2.0,
         )
 
+    def param_init_peaks(self, p0, peaks):
+        p0 = list(p0)
+        if peaks:
+            Tm, width, _ = max(peaks, key=lambda peak: peak[2])
+            p0[4:6] = _onset_from_width(Tm, width, self.onset_threshold), Tm
+        return p0
+
 
 class EmpiricalThreeState(MoltenProtModel):
     'Fits Tm and T_onset in a three-state scenario'
@@ -293,6 +512,7 @@ class EmpiricalThreeState(MoltenProtModel):
     # similar to thermodynamic 3-state model: sum up Euclidean temperature distance
     # for both reaction steps
     sortby = "T_eucl_comb"
+    linear_params = ("kN", "bN", "kU", "bU", "kI")
     # NOTE onset threshold is hard-coded to 0.01, i.e. onset point is 1% unfolded TODO how is this related to MoltenProtFit.onset_threshold?
     onset_threshold = 0.01
 
@@ -337,6 +557,22 @@ class EmpiricalThreeState(MoltenProtModel):
             )
         )
 
+    def kernel(self, T, kN, bN, kU, bU, kI, T_onset1, T1, T_onset2, T2):
+        T = np.asarray(T, dtype=float)
+        log_ratio = np.log(self.onset_threshold / (1 - self.onset_threshold))
+        x1 = np.subtract(T, T1)
+        x1 *= np.divide(log_ratio, np.subtract(T_onset1, T1))
+        x12 = np.subtract(T, T2)
+        x12 *= np.divide(log_ratio, np.subtract(T_onset2, T2))
+        x12 += x1
+        return _three_state_signal(T, kN, bN, kU, bU, kI, x1, x12)
+
+    def linear_basis(self, T, T_onset1, T1, T_onset2, T2):
+        log_ratio = np.log(self.onset_threshold / (1 - self.onset_threshold))
+        exp1 = (T - T1) * log_ratio / (T_onset1 - T1)
+        fN, fI, fU = state_fractions(exp1, exp1 + (T - T2) * log_ratio / (T_onset2 - T2))
+        return baseline_basis(T, fN, fU, fI)
+
     def param_bounds(self, input_data=None):
         if input_data is None:
             return super().param_bounds(None)
@@ -384,12 +620,31 @@ class EmpiricalThreeState(MoltenProtModel):
             max(input_data.index) - 0.2 * temp_range,
         )
 
+    def param_init_peaks(self, p0, peaks):
+        p0 = list(p0)
+        if len(peaks) > 1:
+            (T1, width1, _), (T2, width2, _) = peaks[:2]
+        elif peaks:
+            # a single peak: place the two transitions on its flanks
+            T, width, _ = peaks[0]
+            T1, width1, T2, width2 = T - width / 4, width / 2, T + width / 4, width / 2
+        else:
+            return p0
+        p0[5:9] = (
+            _onset_from_width(T1, width1, self.onset_threshold),
+            T1,
+            _onset_from_width(T2, width2, self.onset_threshold),
+            T2,
+        )
+        return p0
+
 
 class IrreversibleTwoState(MoltenProtModel):
     'Assumes irreversible unfolding of protein that is present in two states'
     short_name = "irrev"
     _description = "N -> U"
     sortby = "pk_std"
+    linear_params = ("kN", "bN", "kU", "bU")
     xn = 1  # y0 (starting condition) for differential equation
 
     def __init__(self, scan_rate):
@@ -447,6 +702,18 @@ class IrreversibleTwoState(MoltenProtModel):
         # return kU*t + bU + (kN*t + bN - kU*t - bU)*ivp_result.sol(t)[0]
         return kU * t + bU + (kN * t + bN - kU * t - bU) * ivp_result.y[0, :]
 
+    def linear_basis(self, t, Tf, Ea):
+        ivp_result = solve_ivp(
+            self.ode,
+            t_span=[min(t), max(t)],
+            t_eval=t,
+            y0=[self.xn],
+            args=(Tf, Ea),
+            method="BDF",
+        )
+        xn = ivp_result.y[0, :]
+        return baseline_basis(t, xn, 1 - xn)
+
     def param_init(self, input_data=None):
         if input_data is None:
             # without input data it's hard to guess starting values
@@ -466,6 +733,16 @@ class IrreversibleTwoState(MoltenProtModel):
             50000,
         )
 
+    def param_init_peaks(self, p0, peaks):
+        p0 = list(p0)
+        if peaks:
+            # the peak of the reaction rate is at the temperature where k(T) = v*Ea/(R*T^2)
+            T, width, _ = max(peaks, key=lambda peak: peak[2])
+            Ea = first_order_fwhm * R * T**2 / width
+            Tf = 1 / (1 / T + R / Ea * np.log(self.scan_rate * Ea / (R * T**2)))
+            p0[4:6] = Tf, Ea
+        return p0
+
     def param_bounds(self, input_data=None):
         # NOTE it may happen that Tf is ouside the temperature range, but the curve is still OK
         # also, MoltenProt calculations are always done in Kelvins
@@ -501,6 +778,7 @@ class LumryEyring(IrreversibleTwoState):
 
     # the kF/kR at std temperature; take as -log10 to have higher values for higher stability
     sortby = "pk_ratio_std"
+    linear_params = ("kN", "bN", "kU", "bU", "kI")
 
     # fmt: off
     #        ~_~
@@ -608,7 +886,6 @@ class LumryEyring(IrreversibleTwoState):
         and the law of signal will be:
         (kN * T + bN) * fN + (kU*T + bU) * (fA + fU)
         """
-
         ivp_result = solve_ivp(
             self.ode,
             t_span=[min(T), max(T)],
@@ -627,6 +904,20 @@ class LumryEyring(IrreversibleTwoState):
         # print(kN, bN, kU, bU, kI, TfF, EaF, TfR, EaR)
         return (kN * T + bN) * fN + kI * fU + (kU * T + bU) * fA
 
+    def linear_basis(self, T, TfF, EaF, TfR, EaR):
+        ivp_result = solve_ivp(
+            self.ode,
+            t_span=[min(T), max(T)],
+            y0=self.z0,
+            args=(TfF, EaF, TfR, EaR, self.tfea[0], self.tfea[1]),
+            t_eval=T,
+            method="BDF",
+        )
+        fU = ivp_result.y[0, :]
+        fA = ivp_result.y[1, :]
+        # the post-transition baseline (kU, bU) belongs to state A, kI is the signal of U
+        return baseline_basis(T, 1 - fU - fA, fA, fU)
+
     def param_init(self, input_data=None):
         if input_data is None:
             # without input data it's hard to guess starting values
@@ -647,6 +938,15 @@ class LumryEyring(IrreversibleTwoState):
             50000,
         )
 
+    def param_init_peaks(self, p0, peaks):
+        p0 = list(p0)
+        if peaks:
+            # the equilibrium N <-> U is half-way at TfF = TfR, the difference of the activation
+            # energies is the van 't Hoff enthalpy of unfolding
+            T, width, _ = max(peaks, key=lambda peak: peak[2])
+            p0[5:9] = T, p0[8] + _enthalpy_from_width(T, width), T, p0[8]
+        return p0
+
     def param_bounds(self, input_data=None):
         '''
         Notes
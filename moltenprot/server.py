@@ -0,0 +1,698 @@
+"Local HTTP service for MoltenProt analysis (python -m moltenprot serve)"
+# Copyright 2018-2021,2025 Vadim Kotov, Thomas C. Marlovits
+#
+#     This file is part of MoltenProt.
+#
+#     MoltenProt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     MoltenProt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with MoltenProt.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Endpoints
+---------
+GET /health
+    server status, MoltenProt version and available models
+POST /analyse
+    the request body is a CSV file, a Prometheus XLSX file or a JSON curve payload:
+    {"temperature": [...], "curves": {"A1": [...], ...}, "options": {...}}
+    the format is taken from the format query parameter, Content-Type or the filename parameter;
+    analysis options (model, shrink, exclude=A1,A2 ...) and reading options (readout, scan_rate, ...)
+    are supplied as query parameters
+    the response is JSON with plate_results of every dataset, or an Arrow IPC stream
+    (Accept: application/vnd.apache.arrow.stream, requires pyarrow)
+
+All responses have a Server-Timing header with the time spent in the queue, reading,
+analysis and serialization.
+"""
+
+import os
+import io
+import json
+import time
+import queue
+import signal
+import argparse
+import importlib
+import tempfile
+import threading
+from functools import partial
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pandas as pd
+
+from moltenprot import core
+from moltenprot.__main__ import UseHeadlessBackend
+
+# Arrow output (optional)
+try:
+    import pyarrow
+
+    arrow_output = True
+except ImportError:
+    arrow_output = False
+
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+
+# options for reading the input data, the analysis options are taken from core defaults
+READ_OPTIONS = {
+    "scan_rate": float,
+    "sep": str,
+    "dec": str,
+    "readout": str,
+    "denaturant": str,
+    "spectrum": bool,
+    "raw": bool,
+    "refold": bool,
+    "panta_rhei": bool,
+}
+
+# supported input formats and their content types
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+    "application/json": "json",
+}
+
+
+def _to_bool(value):
+    "Converts a query string value to bool"
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def parse_options(options):
+    """
+    Converts request options (query string values or JSON values) to the types used by MoltenProt
+
+    Parameters
+    ----------
+    options : dict
+        option name and value
+
+    Returns
+    -------
+    A tuple of dicts with reading and analysis options
+
+    Raises
+    ------
+    ValueError
+        for unknown options or invalid values
+    TypeError
+        for values of the wrong JSON type (e.g. a list instead of a number)
+    """
+    all_defaults = dict(core.prep_defaults, **core.analysis_defaults)
+    read_options = {}
+    analysis_options = {}
+    for key, value in options.items():
+        if key in READ_OPTIONS:
+            convert = _to_bool if READ_OPTIONS[key] is bool else READ_OPTIONS[key]
+            read_options[key] = convert(value)
+        elif key in ("blanks", "exclude", "compare_models"):
+            if isinstance(value, str):
+                value = [i.strip() for i in value.split(",") if i.strip()]
+            analysis_options[key] = list(value)
+            if key == "compare_models":
+                for model in value:
+                    if model not in core.avail_models or model == "skip":
+                        raise ValueError(
+                            "Unknown model '{}' in compare_models".format(model)
+                        )
+        elif key == "model":
+            if value not in core.avail_models:
+                raise ValueError(
+                    "Unknown model '{}', available models are: {}".format(
+                        value, ", ".join(core.avail_models)
+                    )
+                )
+            analysis_options[key] = value
+        elif key in all_defaults and not key.endswith("_h"):
+            if isinstance(all_defaults[key], bool):
+                analysis_options[key] = _to_bool(value)
+            else:
+                # same as in the command line, all numeric options are floats
+                analysis_options[key] = float(value)
+        else:
+            raise ValueError("Unknown option '{}'".format(key))
+    return read_options, analysis_options
+
+
+def _warm_up():
+    """
+    Worker initializer: import the analysis modules (lazy in core) and create all models once,
+    so that this is not done during the first request
+    """
+    # Ctrl+C is handled by the main process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for module in ("scipy.optimize", "scipy.signal", "scipy.interpolate", "scipy.integrate"):
+        importlib.import_module(module)
+
+    for model in core.avail_models.values():
+        if model != "skip":
+            model(scan_rate=1.0).param_names()
+
+
+def _read_input(job, folder):
+    """
+    Create a MoltenProtFitMultiple instance from the request data (written to a temporary file in folder)
+    """
+    read_options = job["read_options"]
+    input_format = job["format"]
+    if input_format == "json":
+        # curves are converted to a plain CSV
+        payload = job["payload"]
+        data = pd.DataFrame(
+            payload["curves"], index=pd.Index(payload["temperature"], name="Temperature")
+        )
+        input_file = os.path.join(folder, "curves.csv")
+        data.to_csv(input_file)
+        return core.parse_plain_csv(
+            input_file,
+            scan_rate=read_options.get("scan_rate"),
+            denaturant=read_options.get("denaturant", core.defaults["denaturant"]),
+            readout=read_options.get("readout", core.defaults["readout"]),
+        )
+
+    # keep the original name in the file (it is shown in the results)
+    input_file = os.path.join(
+        folder, os.path.basename(job["filename"] or "input." + input_format)
+    )
+    with open(input_file, "wb") as data_file:
+        data_file.write(job["data"])
+    if input_format == "xlsx":
+        return core.parse_prom_xlsx(
+            input_file,
+            raw=read_options.get("raw", False),
+            refold=read_options.get("refold", False),
+            LE=job["analysis_options"].get("model") == "lumry_eyring",
+            panta_rhei=read_options.get("panta_rhei", False),
+        )
+    csv_options = dict(
+        scan_rate=read_options.get("scan_rate"),
+        sep=read_options.get("sep", core.defaults["sep"]),
+        dec=read_options.get("dec", core.defaults["dec"]),
+        denaturant=read_options.get("denaturant", core.defaults["denaturant"]),
+        readout=read_options.get("readout", core.defaults["readout"]),
+    )
+    if read_options.get("spectrum"):
+        return core.parse_spectrum_csv(input_file, **csv_options)
+    return core.parse_plain_csv(input_file, **csv_options)
+
+
+def analyse_job(job):
+    """
+    Read and analyse the data of a single request
+
+    Parameters
+    ----------
+    job : dict
+        format, data (or payload for JSON), filename, read_options and analysis_options
+
+    Returns
+    -------
+    A dict with plate_results and failed samples for each dataset and a dict of stage timings (in s)
+    """
+    timing = {}
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as folder:
+        data = _read_input(job, folder)
+    timing["read"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data.SetAnalysisOptions("all", **job["analysis_options"])
+    data.PrepareAndAnalyseAll(n_jobs=1)
+    timing["analysis"] = time.perf_counter() - start
+
+    datasets = {}
+    for name, dataset in data.datasets.items():
+        if dataset.model == "skip":
+            continue
+        if not dataset.analysisHasBeenDone():
+            # no sample was fit (e.g. all were skipped by the pre-screen)
+            datasets[name] = {
+                "model": dataset.model,
+                "results": pd.DataFrame(),
+                "failed": list(dataset.plate_raw.columns),
+            }
+            continue
+        datasets[name] = {
+            "model": dataset.model,
+            "results": dataset.plate_results,
+            "failed": list(dataset._get_failed_samples()),
+        }
+    return {"datasets": datasets, "timing": timing}
+
+
+def analyse_batch(jobs):
+    """
+    Analyse several requests in one worker task; errors are returned per request
+
+    Returns
+    -------
+    A list of tuples (True, result) or (False, error message) in the order of jobs
+    """
+    results = []
+    for job in jobs:
+        queued = time.time() - job["submitted"]
+        try:
+            result = analyse_job(job)
+            result["timing"]["queue"] = queued
+            results.append((True, result))
+        except SystemExit:
+            # fatal errors in core stop the program
+            results.append((False, "Fatal error during the analysis"))
+        except Exception as error:
+            results.append((False, "{}: {}".format(type(error).__name__, error)))
+    return results
+
+
+class BatchDispatcher:
+    """
+    Sends requests to the worker pool, in batches when all workers are busy
+
+    A request is sent as soon as a worker is free. Requests that arrive while all workers are
+    busy are collected and sent together (up to batch_size), so that under load small requests
+    share one worker round-trip. Requests that were cancelled while waiting are not sent.
+    """
+
+    def __init__(self, executor, n_workers, batch_size=4):
+        """
+        Parameters
+        ----------
+        executor
+            a running ProcessPoolExecutor
+        n_workers
+            number of workers in the executor
+        batch_size
+            maximum amount of requests in a batch
+        """
+        self.executor = executor
+        self.n_workers = n_workers
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.in_flight = 0
+        self.worker_free = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, job):
+        """
+        Add a request to the queue
+
+        Returns
+        -------
+        concurrent.futures.Future with the result of analyse_job
+        """
+        job["submitted"] = time.time()
+        future = Future()
+        self.queue.put((job, future))
+        return future
+
+    def close(self):
+        "Stop the dispatcher thread"
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self.queue.get()
+            if item is None:
+                break
+            # wait for a free worker, meanwhile more requests can arrive
+            with self.worker_free:
+                while self.in_flight >= self.n_workers:
+                    self.worker_free.wait()
+                self.in_flight += 1
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            # NOTE after this the futures cannot be cancelled anymore
+            batch = [
+                (job, future)
+                for job, future in batch
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                self._release_worker()
+                continue
+            worker_future = self.executor.submit(
+                analyse_batch, [job for job, _ in batch]
+            )
+            worker_future.add_done_callback(
+                partial(self._resolve, [future for _, future in batch])
+            )
+
+    def _release_worker(self):
+        with self.worker_free:
+            self.in_flight -= 1
+            self.worker_free.notify()
+
+    def _resolve(self, futures, worker_future):
+        self._release_worker()
+        self._set_results(futures, worker_future)
+
+    @staticmethod
+    def _set_results(futures, worker_future):
+        try:
+            results = worker_future.result()
+        except Exception as error:
+            # e.g. a worker process was killed
+            for future in futures:
+                future.set_exception(error)
+            return
+        for future, (success, value) in zip(futures, results):
+            if success:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+
+def results_to_json(result, filename):
+    "Serialize the analysis results to JSON"
+    output = {"file": filename, "version": core.__version__, "datasets": {}}
+    for name, dataset in result["datasets"].items():
+        output["datasets"][name] = {
+            "model": dataset["model"],
+            # NaN values are converted to null
+            "results": json.loads(dataset["results"].to_json(orient="index")),
+            "failed": dataset["failed"],
+        }
+    return json.dumps(output).encode()
+
+
+def results_to_arrow(result):
+    "Serialize the analysis results to an Arrow IPC stream (one table, dataset in a column)"
+    tables = []
+    for name, dataset in result["datasets"].items():
+        results = dataset["results"].copy()
+        results.insert(0, "Dataset", name)
+        tables.append(results.rename_axis("ID").reset_index())
+    table = pyarrow.Table.from_pandas(
+        pd.concat(tables, ignore_index=True), preserve_index=False
+    )
+    sink = io.BytesIO()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+class AnalysisHandler(BaseHTTPRequestHandler):
+    """
+    Handles requests to the analysis server (the server object holds the dispatcher and settings)
+    """
+
+    server_version = "MoltenProt/" + core.__version__
+    # HTTP/1.1 answers "Expect: 100-continue" (sent by many clients for uploads) and keeps connections open
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, code, body, content_type="application/json", timing=None):
+        self.send_response(code)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if timing:
+            self.send_header(
+                "Server-Timing",
+                ", ".join(
+                    "{};dur={:.1f}".format(name, value * 1000)
+                    for name, value in timing.items()
+                ),
+            )
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, code, message, timing=None):
+        self._send(code, json.dumps({"error": message}).encode(), timing=timing)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            self._send_error(404, "Unknown endpoint")
+            return
+        status = {
+            "status": "ok",
+            "version": core.__version__,
+            "models": [i for i in core.avail_models if i != "skip"],
+            "jobs": self.server.n_jobs,
+        }
+        self._send(200, json.dumps(status).encode())
+
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        # the request body is not read in case of errors, so the connection cannot be reused
+        if url.path != "/analyse":
+            self.close_connection = True
+            self._send_error(404, "Unknown endpoint")
+            return
+        # concurrency limit: refuse the request instead of queueing it forever
+        if not self.server.slots.acquire(blocking=False):
+            self.close_connection = True
+            self.send_response(503)
+            self.send_header("Connection", "close")
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        slot_in_use = False
+        try:
+            slot_in_use = self._analyse(url, start)
+        finally:
+            if not slot_in_use:
+                self.server.slots.release()
+
+    def _analyse(self, url, start):
+        """
+        Processes an analysis request
+
+        Returns
+        -------
+        True if the request timed out while being analysed: its concurrency slot
+        is then released when the analysis is finished
+        """
+        length = int(self.headers.get("Content-Length", 0))
+        if length > self.server.max_upload:
+            self.close_connection = True
+            self._send_error(413, "Request is too large")
+            return
+        data = self.rfile.read(length)
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        filename = query.pop("filename", None)
+        input_format = query.pop("format", None)
+        if input_format is None:
+            content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+            input_format = CONTENT_TYPES.get(content_type)
+        if input_format is None and filename:
+            input_format = os.path.splitext(filename)[1].lstrip(".").lower()
+        if input_format not in ("csv", "xlsx", "json"):
+            self._send_error(415, "Supported input formats are csv, xlsx and json")
+            return
+        want_arrow = ARROW_MIME in self.headers.get("Accept", "")
+        if want_arrow and not arrow_output:
+            self._send_error(406, "Arrow output requires pyarrow")
+            return
+
+        job = {"format": input_format, "filename": filename, "data": None}
+        try:
+            if input_format == "json":
+                payload = json.loads(data)
+                query.update(payload.get("options", {}))
+                job["payload"] = payload
+            else:
+                job["data"] = data
+            job["read_options"], job["analysis_options"] = parse_options(query)
+        except (TypeError, ValueError) as error:
+            self._send_error(400, str(error))
+            return
+
+        future = self.server.dispatcher.submit(job)
+        try:
+            result = future.result(timeout=self.server.timeout_s)
+        except FutureTimeoutError:
+            self._send_error(504, "Analysis timed out")
+            if future.cancel():
+                # the request was still queued and will not be analysed
+                return False
+            # the worker keeps running, the slot is kept until it is finished
+            future.add_done_callback(lambda _: self.server.slots.release())
+            return True
+        except Exception as error:
+            self._send_error(
+                422, str(error), timing={"total": time.perf_counter() - start}
+            )
+            return
+
+        serialize_start = time.perf_counter()
+        if want_arrow:
+            body = results_to_arrow(result)
+            content_type = ARROW_MIME
+        else:
+            body = results_to_json(result, filename)
+            content_type = "application/json"
+        timing = result["timing"]
+        timing["serialize"] = time.perf_counter() - serialize_start
+        timing["total"] = time.perf_counter() - start
+        self._send(200, body, content_type=content_type, timing=timing)
+
+
+class AnalysisServer(ThreadingHTTPServer):
+    """
+    HTTP server with a pool of analysis workers
+
+    Example
+    -------
+    with AnalysisServer(("127.0.0.1", 8765), n_jobs=2) as server:
+        server.serve_forever()
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        n_jobs=1,
+        max_pending=None,
+        batch_size=4,
+        timeout=600,
+        max_upload=100 * 1024 * 1024,
+        quiet=False,
+    ):
+        """
+        Parameters
+        ----------
+        address
+            tuple of host and port (port 0 selects a free port)
+        n_jobs
+            number of worker processes
+        max_pending
+            maximum number of requests being processed or queued, others get 503 (default: four per job)
+        batch_size
+            maximum amount of requests sent to a worker at once (when all workers are busy)
+        timeout
+            maximum time for a request, in seconds
+        max_upload
+            maximum request size, in bytes
+        quiet
+            do not log requests
+        """
+        super().__init__(address, AnalysisHandler)
+        self.n_jobs = max(1, n_jobs)
+        self.slots = threading.BoundedSemaphore(
+            max_pending if max_pending is not None else 4 * self.n_jobs
+        )
+        self.timeout_s = timeout
+        self.max_upload = max_upload
+        self.quiet = quiet
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.n_jobs, initializer=_warm_up
+        )
+        # start all workers now, so that the first requests do not wait for them
+        for future in [self.executor.submit(time.sleep, 0) for _ in range(self.n_jobs)]:
+            future.result()
+        self.dispatcher = BatchDispatcher(self.executor, self.n_jobs, batch_size)
+
+    def server_close(self):
+        super().server_close()
+        self.dispatcher.close()
+        self.executor.shutdown()
+
+
+def ServeParser():
+    """
+    Creates the argument parser for the server
+
+    Returns
+    -------
+    parser
+        arparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(
+        prog="moltenprot serve",
+        description="Local HTTP service for MoltenProt analysis",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address to listen on; the server has no authentication, so only expose it to trusted networks",
+    )
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument(
+        "-j", "--n_jobs", type=int, default=core.defaults["j"], help="Number of worker processes"
+    )
+    parser.add_argument(
+        "--max_pending",
+        type=int,
+        default=None,
+        help="Maximum number of requests in processing, others are refused with 503 (default: four per job)",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=4,
+        help="Maximum requests sent to a worker at once (when all workers are busy)",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=600, help="Maximum time for a request, in seconds"
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Do not log requests and print only fatal analysis errors",
+    )
+    return parser
+
+
+def main(argv=None):
+    """Entry point for moltenprot serve"""
+    args = ServeParser().parse_args(argv)
+    UseHeadlessBackend()
+    if args.quiet:
+        core.set_quiet()
+    with AnalysisServer(
+        (args.host, args.port),
+        n_jobs=args.n_jobs,
+        max_pending=args.max_pending,
+        batch_size=args.batch_size,
+        timeout=args.timeout,
+        quiet=args.quiet,
+    ) as server:
+        print(
+            "Information: MoltenProt server on http://{}:{} with {} workers".format(
+                *server.server_address[:2], server.n_jobs
+            )
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Information: stopping the server")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+"Synthetic thermal unfolding data with known parameters (for benchmarks and accuracy tests)"
+# Copyright 2018-2021,2025 Vadim Kotov, Thomas C. Marlovits
+#
+#     This file is part of MoltenProt.
+#
+#     MoltenProt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     MoltenProt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with MoltenProt.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+The curves are computed with the fun method of the respective MoltenProtModel on a Kelvin
+temperature scale, so the ground-truth parameters can be compared directly with the *_fit
+columns of plate_results. The written files use degrees Celsius, like the instrument exports.
+
+Example
+-------
+data, truth = synthetic_plate("santoro1988", n_wells=384, noise=0.01, seed=1)
+write_plain_csv(data, "plate.csv")
+write_layout(data, "layout.csv")
+mp = core.parse_plain_csv("plate.csv", layout="layout.csv")
+"""
+
+import numpy as np
+import pandas as pd
+
+from moltenprot import core
+
+# plate dimensions (rows, columns) for the common plate sizes
+PLATE_SIZES = {48: (4, 12), 96: (8, 12), 384: (16, 24), 1536: (32, 48)}
+
+NOISE_MODELS = ("gaussian", "proportional")
+
+# Prometheus exports: readouts and their sheets
+PROM_READOUTS = ("Ratio", "330nm", "350nm", "Scattering")
+
+
+def well_ids(n_wells):
+    """
+    Returns the well IDs for a plate with n_wells (row-major order)
+
+    Notes
+    -----
+    * plate sizes not in PLATE_SIZES are filled row by row with 12 columns
+    """
+    if n_wells in PLATE_SIZES:
+        return core.plate_index(*PLATE_SIZES[n_wells]).values
+    return core.plate_index(-(-n_wells // 12), 12).values[:n_wells]
+
+
+def _baselines(T, rng, n_wells):
+    """
+    Random pre- and post-transition baselines (kN, bN, kU, bU) for temperatures T (in K)
+
+    The native state has a signal of about 1 at the start of the scan, the unfolded state is 20-40% higher
+    """
+    level_N = rng.uniform(0.8, 1.0, n_wells)
+    level_U = level_N + rng.uniform(0.2, 0.4, n_wells)
+    kN = rng.normal(-2e-3, 5e-4, n_wells)
+    kU = rng.normal(-1e-3, 5e-4, n_wells)
+    T0 = T.min()
+    return {
+        "kN": kN,
+        "bN": level_N - kN * T0,
+        "kU": kU,
+        "bU": level_U - kU * T0,
+    }, (level_N + level_U) / 2
+
+
+def random_parameters(model, temperature, n_wells, rng):
+    """
+    Draws realistic model parameters for each well
+
+    Parameters
+    ----------
+    model
+        model name from core.avail_models
+    temperature
+        temperature scale in K
+    n_wells
+        number of wells
+    rng
+        np.random.Generator
+
+    Returns
+    -------
+    pd.DataFrame with one column per model parameter (in the order of fun arguments);
+    lumry_eyring also has the columns Tf2 and Ea2 for the aggregation step (fixed during fitting)
+    """
+    T = np.asarray(temperature, dtype=float)
+    t_min, t_max = T.min(), T.max()
+    params, intermediate = _baselines(T, rng, n_wells)
+    # transitions are kept away from the ends of the scan so that both baselines are visible
+    if model == "santoro1988":
+        params["dHm"] = rng.uniform(2e5, 6e5, n_wells)
+        params["Tm"] = rng.uniform(t_min + 15, t_max - 15, n_wells)
+    elif model == "santoro1988d":
+        Tm = rng.uniform(t_min + 15, t_max - 15, n_wells)
+        params["T_onset"] = Tm - rng.uniform(4, 12, n_wells)
+        params["Tm"] = Tm
+    elif model == "santoro1988i":
+        params["kI"] = intermediate
+        params["dHm1"] = rng.uniform(2e5, 5e5, n_wells)
+        params["T1"] = rng.uniform(t_min + 12, t_max - 30, n_wells)
+        params["dHm2"] = rng.uniform(2e5, 5e5, n_wells)
+        params["dT2_1"] = rng.uniform(8, 18, n_wells)
+    elif model == "santoro1988di":
+        params["kI"] = intermediate
+        T1 = rng.uniform(t_min + 12, t_max - 30, n_wells)
+        T2 = T1 + rng.uniform(8, 18, n_wells)
+        params["T_onset1"] = T1 - rng.uniform(3, 8, n_wells)
+        params["T1"] = T1
+        params["T_onset2"] = T2 - rng.uniform(3, 8, n_wells)
+        params["T2"] = T2
+    elif model == "irrev":
+        params["Tf"] = rng.uniform(t_min + 15, t_max - 15, n_wells)
+        params["Ea"] = rng.uniform(2e5, 5e5, n_wells)
+    elif model == "lumry_eyring":
+        params["kI"] = intermediate
+        params["TfF"] = rng.uniform(t_min + 15, t_max - 20, n_wells)
+        params["EaF"] = rng.uniform(2e5, 4e5, n_wells)
+        params["TfR"] = params["TfF"] + rng.uniform(-3, 3, n_wells)
+        params["EaR"] = rng.uniform(0.5e5, 1.5e5, n_wells)
+        params["Tf2"] = params["TfF"] + rng.uniform(0, 5, n_wells)
+        params["Ea2"] = rng.uniform(1e5, 3e5, n_wells)
+    else:
+        raise ValueError("No parameter ranges are defined for model '{}'".format(model))
+    return pd.DataFrame(params)
+
+
+def model_curves(model, temperature, parameters, scan_rate=1.0):
+    """
+    Computes noise-free curves with the fun method of a model
+
+    Parameters
+    ----------
+    model
+        model name from core.avail_models
+    temperature
+        temperature scale in K
+    parameters
+        pd.DataFrame as returned by random_parameters (one row per well)
+    scan_rate
+        scan rate in degrees/min (kinetic models only)
+
+    Returns
+    -------
+    np.array of shape (temperatures, wells)
+    """
+    T = np.asarray(temperature, dtype=float)
+    model_obj = core.avail_models[model](scan_rate=scan_rate)
+    names = model_obj.param_names()
+    if model not in ("irrev", "lumry_eyring"):
+        # closed-form models are evaluated for all wells at once
+        return model_obj.fun(
+            T[:, None], *(parameters[name].values[None, :] for name in names)
+        )
+    # kinetic models integrate an ODE for each well
+    output = np.empty((len(T), len(parameters)))
+    for i, (_, row) in enumerate(parameters.iterrows()):
+        if model == "lumry_eyring":
+            model_obj.set_fixed([row["Tf2"], row["Ea2"]])
+        output[:, i] = model_obj.fun(T, *(row[name] for name in names))
+    return output
+
+
+def add_artifacts(
+    signal,
+    rng,
+    noise=0.005,
+    noise_model="gaussian",
+    spike_rate=0.0,
+    spike_size=0.2,
+    drift=0.0,
+):
+    """
+    Adds noise, spikes and baseline drift to the curves
+
+    Parameters
+    ----------
+    signal
+        np.array of shape (temperatures, wells)
+    rng
+        np.random.Generator
+    noise
+        standard deviation of the noise, relative to the amplitude of each curve (gaussian)
+        or to the signal value (proportional)
+    noise_model
+        gaussian or proportional (see noise)
+    spike_rate
+        fraction of data points with a spike
+    spike_size
+        height of the spikes relative to the curve amplitude
+    drift
+        amplitude of a random slow drift (cubic polynomial over the scan), relative to the curve amplitude
+
+    Returns
+    -------
+    a new np.array with the artifacts
+    """
+    if noise_model not in NOISE_MODELS:
+        raise ValueError(
+            "Unknown noise model '{}', use one of: {}".format(
+                noise_model, ", ".join(NOISE_MODELS)
+            )
+        )
+    signal = np.array(signal, dtype=float)
+    amplitude = signal.max(axis=0) - signal.min(axis=0)
+    if noise > 0:
+        if noise_model == "gaussian":
+            scale = noise * amplitude
+        else:
+            scale = noise * np.abs(signal)
+        signal += rng.normal(0, 1, signal.shape) * scale
+    if drift > 0:
+        x = np.linspace(-1, 1, signal.shape[0])[:, None]
+        coefficients = rng.uniform(-1, 1, (3, signal.shape[1]))
+        signal += (
+            drift
+            * amplitude
+            * (coefficients[0] * x + coefficients[1] * x**2 + coefficients[2] * x**3)
+            / 3
+        )
+    if spike_rate > 0:
+        spikes = rng.random(signal.shape) < spike_rate
+        signs = rng.choice((-1, 1), signal.shape)
+        signal[spikes] += (spike_size * signs * amplitude)[spikes]
+    return signal
+
+
+def synthetic_plate(
+    model="santoro1988",
+    n_wells=96,
+    t_start=25.0,
+    t_end=95.0,
+    t_step=0.5,
+    scan_rate=1.0,
+    noise=0.005,
+    noise_model="gaussian",
+    spike_rate=0.0,
+    spike_size=0.2,
+    drift=0.0,
+    parameters=None,
+    seed=None,
+):
+    """
+    Creates a plate of unfolding curves with known parameters
+
+    Parameters
+    ----------
+    model
+        model name from core.avail_models used to compute the curves
+    n_wells
+        number of wells (see well_ids)
+    t_start, t_end, t_step
+        temperature scale in degrees Celsius
+    scan_rate
+        scan rate in degrees/min (kinetic models only)
+    noise, noise_model, spike_rate, spike_size, drift
+        artifacts, see add_artifacts
+    parameters
+        pd.DataFrame with the ground truth (e.g. from random_parameters); if None, random parameters are used
+    seed
+        seed for the random number generator (the same seed gives the same plate)
+
+    Returns
+    -------
+    a tuple of two DataFrames:
+        > data with Temperature (in C) index and well IDs as columns
+        > ground-truth parameters (temperatures in K) with well IDs as index
+    """
+    rng = np.random.default_rng(seed)
+    temperature = np.arange(t_start, t_end + t_step / 2, t_step)
+    T = temperature + 273.15
+    if parameters is None:
+        parameters = random_parameters(model, T, n_wells, rng)
+    parameters = parameters.copy()
+    parameters.index = pd.Index(well_ids(len(parameters)), name="ID")
+
+    signal = add_artifacts(
+        model_curves(model, T, parameters, scan_rate=scan_rate),
+        rng,
+        noise=noise,
+        noise_model=noise_model,
+        spike_rate=spike_rate,
+        spike_size=spike_size,
+        drift=drift,
+    )
+    data = pd.DataFrame(
+        signal,
+        index=pd.Index(temperature, name="Temperature"),
+        columns=parameters.index,
+    )
+    data.columns.name = None
+    return data, parameters
+
+
+def synthetic_spectrum(
+    wavelengths=range(300, 400, 2),
+    model="santoro1988",
+    peak_native=330.0,
+    peak_unfolded=350.0,
+    width=25.0,
+    seed=None,
+    **kwargs
+):
+    """
+    Creates fluorescence spectra over a temperature scan: the emission peak of one protein
+    moves from peak_native to peak_unfolded during unfolding
+
+    Parameters
+    ----------
+    wavelengths
+        wavelengths in nm (at most 96, see parse_spectrum_csv)
+    model
+        model name (only models with baselines and without intermediate signal: santoro1988, santoro1988d, irrev)
+    peak_native, peak_unfolded, width
+        position and width (standard deviation) of the gaussian emission peaks, in nm
+    seed
+        seed for the random number generator
+    kwargs
+        other options of synthetic_plate (temperature scale, artifacts)
+
+    Returns
+    -------
+    a tuple of two DataFrames:
+        > data with Temperature (in C) index and wavelengths as columns
+        > ground-truth parameters (temperatures in K) with wavelengths as index
+    """
+    if model not in ("santoro1988", "santoro1988d", "irrev"):
+        raise ValueError("Spectra cannot be generated for model '{}'".format(model))
+    rng = np.random.default_rng(seed)
+    wavelengths = np.asarray(wavelengths)
+    temperature = np.arange(
+        kwargs.get("t_start", 25.0),
+        kwargs.get("t_end", 95.0) + kwargs.get("t_step", 0.5) / 2,
+        kwargs.get("t_step", 0.5),
+    )
+    T = temperature + 273.15
+    # one transition for the whole spectrum
+    transition = random_parameters(model, T, 1, rng)
+    parameters = pd.DataFrame(
+        np.repeat(transition.values, len(wavelengths), axis=0), columns=transition.columns
+    )
+    # the baselines follow the emission peaks (the unfolded state is brighter)
+    native = np.exp(-0.5 * ((wavelengths - peak_native) / width) ** 2)
+    unfolded = 1.3 * np.exp(-0.5 * ((wavelengths - peak_unfolded) / width) ** 2)
+    T0 = T.min()
+    parameters["kN"] = -2e-3 * native
+    parameters["bN"] = native - parameters["kN"] * T0
+    parameters["kU"] = -1e-3 * unfolded
+    parameters["bU"] = unfolded - parameters["kU"] * T0
+
+    data, parameters = synthetic_plate(
+        model, parameters=parameters, seed=rng.integers(2**32), **kwargs
+    )
+    data.columns = wavelengths
+    parameters.index = pd.Index(wavelengths, name="Wavelength")
+    return data, parameters
+
+
+def write_plain_csv(data, filename, sep=core.defaults["sep"], dec=core.defaults["dec"]):
+    """
+    Writes a plate in the plain CSV format (Temperature, A1, A2, ...) read by parse_plain_csv
+    """
+    data.to_csv(filename, sep=sep, decimal=dec, index_label="Temperature")
+
+
+def write_layout(data, filename):
+    """
+    Writes an empty layout that covers all wells of a plate (at least A1-H12), as needed
+    by parse_plain_csv for plates with more than 96 wells
+    """
+    n_rows, n_cols = core.plate_shape(data.columns)
+    layout = pd.DataFrame(index=core.plate_index(n_rows, n_cols), columns=["Condition"])
+    layout.to_csv(filename)
+
+
+def write_spectrum_csv(data, filename, sep=core.defaults["sep"], dec=core.defaults["dec"]):
+    """
+    Writes spectra in the CSV format (Temperature, wavelength1, wavelength2, ...) read by parse_spectrum_csv
+    """
+    if len(data.columns) > 96:
+        raise ValueError("parse_spectrum_csv supports at most 96 wavelengths")
+    data.to_csv(filename, sep=sep, decimal=dec, index_label="Temperature")
+
+
+def write_prom_xlsx(readouts, filename, scan_rate=1.0, conditions=None):
+    """
+    Writes a Prometheus-like processed XLSX export read by parse_prom_xlsx
+
+    Parameters
+    ----------
+    readouts
+        dict readout name (Ratio, 330nm, 350nm or Scattering) -> DataFrame with Temperature (in C)
+        index and one column per capillary; all readouts must have the same temperature scale
+    filename
+        output file
+    scan_rate
+        scan rate in degrees/min (written to the Overview sheet and used for the time column)
+    conditions
+        sample descriptions (one per capillary), default is the column names
+
+    Notes
+    -----
+    * parse_prom_xlsx assigns the wells A1, A2, ... to the capillaries, so at most 96 are supported
+    """
+    unknown = set(readouts) - set(PROM_READOUTS)
+    if unknown:
+        raise ValueError(
+            "Unsupported readouts: {}; use: {}".format(
+                ", ".join(unknown), ", ".join(PROM_READOUTS)
+            )
+        )
+    first = next(iter(readouts.values()))
+    n_capillaries = len(first.columns)
+    if n_capillaries > len(core.alphanumeric_index):
+        raise ValueError("At most 96 capillaries can be written to a Prometheus file")
+    if conditions is None:
+        conditions = [str(i) for i in first.columns]
+    capillaries = list(range(1, n_capillaries + 1))
+
+    overview = pd.DataFrame(
+        {
+            "Capillary": capillaries,
+            "Sample ID": conditions,
+            "dCp": 0,
+            "Temperature Slope": scan_rate,
+        }
+    )
+    temperature = first.index.values.astype(float)
+    time = (temperature - temperature[0]) / scan_rate * 60
+    with pd.ExcelWriter(filename) as writer:
+        overview.to_excel(writer, sheet_name="Overview", index=False)
+        for name, data in readouts.items():
+            # annotation rows have an empty first cell, then the row with column titles
+            header = [
+                [None, "Sample ID"] + list(conditions),
+                ["Time [s]", "Temperature [°C]"] + [name] * n_capillaries,
+            ]
+            body = np.column_stack([time, temperature, data.values]).tolist()
+            sheet = pd.DataFrame(
+                header + body,
+                columns=["", ""] + ["Capillary {}".format(i) for i in capillaries],
+            )
+            sheet.to_excel(writer, sheet_name=name, index=False)
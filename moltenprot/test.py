@@ -1,6 +1,8 @@
 "MoltenProt unit tests"
 
+import json
 import subprocess
+import sys
 from unittest import TestCase, main
 from tempfile import TemporaryDirectory
 from pathlib import Path
@@ -154,6 +156,72 @@ class TestDataAnalysis(TestPrototype):
             model="lumry_eyring", exclude=list(core.alphanumeric_index[1:])
         )
 
+    def test_lumry_eyring_parallel(self):
+        "Well-level pipelining of the Lumry-Eyring analysis gives the same results as the sequential one"
+        if not core.parallelization:
+            self.skipTest("joblib is not installed")
+        results = {}
+        for n_jobs in (1, 2):
+            mp = self._read_target(le=True)
+            mp.SetAnalysisOptions(
+                model="lumry_eyring", exclude=list(core.alphanumeric_index[2:])
+            )
+            if n_jobs == 1:
+                mp.PrepareAndAnalyseAll()
+            else:
+                # one well per task, so that the LE fits start before all Scattering fits are done
+                mp._pipeline_le(n_jobs, batch_size=1)
+            results[n_jobs] = mp
+        for name, dataset in results[1].datasets.items():
+            if not dataset.analysisHasBeenDone():
+                continue
+            expected = dataset.plate_results.filter(regex="_fit$")
+            actual = results[2].datasets[name].plate_results.filter(regex="_fit$")
+            self.assertEqual(list(actual.index), list(expected.index))
+            np.testing.assert_allclose(actual.values, expected.values, rtol=1e-6)
+        self.assertEqual(
+            len(results[2].GetFitStatistics()), len(results[1].GetFitStatistics())
+        )
+
+    def test_instrumentation(self):
+        "Stage timings, per-well fit statistics and trace files"
+        mp = self._read_target(ratio_only=True)
+        mp.PrepareAndAnalyseAll()
+        stages = mp.GetStageTimes()
+        for stage in ("PrepareData", "ProcessData", "fit"):
+            self.assertIn(stage, set(stages["stage"]))
+        stats = mp.GetFitStatistics()
+        self.assertEqual(len(stats), 48)
+        fitted = stats[stats["status"] == "converged"]
+        self.assertTrue((fitted["nfev"] > 0).all())
+        with TemporaryDirectory() as outfolder:
+            for trace_format in ("chrome", "speedscope"):
+                trace_file = Path(outfolder) / (trace_format + ".json")
+                mp.WriteTrace(trace_file, trace_format=trace_format)
+                with open(trace_file) as file:
+                    self.assertTrue(json.load(file))
+
+    def test_messages(self):
+        "Messages are recorded as events in quiet mode and survive JSON sessions"
+        mp = core.parse_plain_csv(str(DEMO_DATA_PATH / "Ratio96.csv"))
+        mp.SetAnalysisOptions(model="santoro1988")
+        core.set_quiet()
+        try:
+            mp.DelDataset("missing")
+            mp.PrepareAndAnalyseAll()
+        finally:
+            core.set_quiet(False)
+        messages = mp.GetMessages()
+        self.assertIn("Fitting curves...", set(messages["text"]))
+        self.assertEqual((messages["dataset"] == "All").sum(), 1)
+        protocol = mp.datasets["Signal"].protocolString
+        self.assertIn("Information: Fitting curves... (Signal)", protocol)
+        with TemporaryDirectory() as outfolder:
+            session = Path(outfolder) / "session.json"
+            core.mp_to_json(mp, session)
+            restored = core.mp_from_json(session)
+        self.assertEqual(restored.datasets["Signal"].protocolString, protocol)
+
 
 class TestReport(TestPrototype):
     "Report tests - using precomputed result"
@@ -171,12 +239,80 @@ class TestReport(TestPrototype):
         if core.parallelization:
             self.test_html_report(n_jobs=4)
 
+    def test_html_report_embedded(self):
+        "test output in HTML format with the curves embedded in the report"
+        mp = core.parse_plain_csv(DEMO_DATA_PATH / "Ratio96.csv")
+        mp.SetAnalysisOptions(shrink=1.0, exclude=["A2"])
+        mp.PrepareAndAnalyseAll()
+        with TemporaryDirectory() as outfolder:
+            mp.WriteOutputAll(
+                outfolder=outfolder,
+                report_format="html",
+                session=False,
+                embed_curves=True,
+            )
+            self.assertEqual(len(list(Path(outfolder).rglob("*.png"))), 0)
+            report = (Path(outfolder) / "report.html").read_text()
+            self.assertIn('"A1":{"t":[', report)
+            self.assertIn('"A2":{"t":[', report)
+
     def test_pdf_report(self):
         "test output in PDF format"
         mp = self._read_reference()
         with TemporaryDirectory() as outfolder:
             mp.WriteOutputAll(outfolder=outfolder, report_format="pdf", session=False)
 
+    def test_pdf_report_incremental(self):
+        "test PDF report with cached pages"
+        if not core.pdf_merging:
+            self.skipTest("pypdf is not available")
+        mp = core.parse_plain_csv(DEMO_DATA_PATH / "Ratio96.csv")
+        mp.SetAnalysisOptions(shrink=1.0, exclude=["A2"])
+        mp.PrepareAndAnalyseAll()
+        with TemporaryDirectory() as outfolder, TemporaryDirectory() as cache:
+            mp.WriteOutputAll(
+                outfolder=outfolder, report_format="pdf", session=False, pdf_cache=cache
+            )
+            pages = {i: i.stat().st_mtime_ns for i in Path(cache).glob("*/page_*.pdf")}
+            # 95 fitted samples on 9 pages and one failed sample
+            self.assertEqual(len(pages), 10)
+            mp.WriteOutputAll(
+                outfolder=outfolder, report_format="pdf", session=False, pdf_cache=cache
+            )
+            for page, mtime in pages.items():
+                self.assertEqual(page.stat().st_mtime_ns, mtime)
+            self.assertTrue((Path(outfolder) / "Signal_report.pdf").exists())
+            # with 7 more failed samples the report has one page less, the pages
+            # of the remaining 88 fitted samples are re-used with new page labels
+            last = list(mp.datasets["Signal"].plate_results.index[-7:])
+            mp.SetAnalysisOptions(shrink=1.0, exclude=["A2"] + last)
+            mp.PrepareAndAnalyseAll()
+            mp.WriteOutputAll(
+                outfolder=outfolder, report_format="pdf", session=False, pdf_cache=cache
+            )
+            reused = [page for page, mtime in pages.items() if page.exists()]
+            self.assertEqual(len(reused), 8)
+            for page in reused:
+                self.assertEqual(page.stat().st_mtime_ns, pages[page])
+            from pypdf import PdfReader
+
+            report = PdfReader(Path(outfolder) / "Signal_report.pdf")
+            n_pages = len(report.pages)
+            self.assertIn(
+                "Page {} of {}".format(n_pages, n_pages),
+                report.pages[-1].extract_text(),
+            )
+
+    def test_genpics(self):
+        "test per-sample figures (fitted and failed samples)"
+        mp = core.parse_plain_csv(DEMO_DATA_PATH / "Ratio96.csv")
+        mp.SetAnalysisOptions(shrink=1.0, exclude=["A2"])
+        mp.PrepareAndAnalyseAll()
+        with TemporaryDirectory() as outfolder:
+            mp.WriteOutputAll(outfolder=outfolder, genpics=True, session=False)
+            for sample in ("A1", "A2", "H12"):
+                self.assertTrue((Path(outfolder) / f"{sample}.png").exists())
+
     def test_xlsx_report(self):
         "test output in XLSX format"
         mp = self._read_reference()
@@ -201,6 +337,824 @@ class TestCli(TestPrototype):
                 check=True,
             )
 
+    def test_cli_profile(self):
+        "Profiling of a parallel run, the worker statistics are merged"
+        import pstats
+
+        with TemporaryDirectory() as outfolder:
+            subprocess.run(
+                [
+                    "moltenprot",
+                    "-i",
+                    str(DEMO_DATA_PATH / "Ratio_F330_F350_Scattering48.xlsx"),
+                    "-o",
+                    outfolder,
+                    "-j",
+                    "2",
+                    "--profile",
+                    "10",
+                ],
+                check=True,
+            )
+            resultfolder = Path(outfolder) / "Ratio_F330_F350_Scattering48"
+            stats = pstats.Stats(str(resultfolder / "profile.prof"))
+            self.assertTrue(any(name == "ProcessData" for _, _, name in stats.stats))
+            self.assertTrue((resultfolder / "profile_hotspots.txt").exists())
+
+    def test_cli_batch(self):
+        "Batch mode: a failing file does not stop the others"
+        with TemporaryDirectory() as outfolder:
+            result = subprocess.run(
+                [
+                    "moltenprot",
+                    "-i",
+                    str(DEMO_DATA_PATH / "Ratio96.csv"),
+                    str(Path(outfolder) / "missing.csv"),
+                    "-o",
+                    outfolder,
+                    "--batch",
+                    "-j",
+                    "2",
+                ],
+                check=False,
+            )
+            self.assertEqual(result.returncode, 1)
+            self.assertTrue(
+                (Path(outfolder) / "Ratio96" / "Signal_results.csv").exists()
+            )
+            summary = pd.read_csv(Path(outfolder) / "batch_summary.csv")
+            self.assertEqual(list(summary["Status"]), ["done", "failed"])
+
+    def test_watch_once(self):
+        "Watch mode: finished files are recorded and not processed again"
+        from moltenprot import watch
+
+        with TemporaryDirectory() as infolder, TemporaryDirectory() as outfolder:
+            input_file = Path(infolder) / "Ratio96.csv"
+            input_file.write_bytes((DEMO_DATA_PATH / "Ratio96.csv").read_bytes())
+            for _ in range(2):
+                watch.main([infolder, "-o", outfolder, "--once"])
+            ledger = (Path(outfolder) / ".moltenprot_ledger.jsonl").read_text()
+            self.assertEqual(len(ledger.splitlines()), 1)
+            self.assertIn('"status": "done"', ledger)
+            self.assertTrue(
+                (Path(outfolder) / "Ratio96" / "Signal_results.csv").exists()
+            )
+
+    def test_watch_failed(self):
+        "Watch mode: failed files are retried after a restart, result folder clashes"
+        from moltenprot import watch
+
+        with TemporaryDirectory() as infolder, TemporaryDirectory() as outfolder:
+            data = (DEMO_DATA_PATH / "Ratio96.csv").read_bytes()
+            # both files would be written to the folder Ratio96
+            (Path(infolder) / "Ratio96.csv").write_bytes(data)
+            (Path(infolder) / "Ratio96.xlsx").write_text("not a plate")
+            (Path(infolder) / "broken.csv").write_text("not a plate")
+            for _ in range(2):
+                watch.main([infolder, "-o", outfolder, "--once"])
+            ledger = [
+                json.loads(line)
+                for line in (Path(outfolder) / ".moltenprot_ledger.jsonl")
+                .read_text()
+                .splitlines()
+            ]
+            statuses = [(Path(entry["file"]).name, entry["status"]) for entry in ledger]
+            self.assertEqual(statuses.count(("broken.csv", "failed")), 2)
+            self.assertEqual(sum(name.startswith("Ratio96") for name, _ in statuses), 1)
+
+    def test_server(self):
+        "Analysis server on localhost: CSV upload and JSON payload"
+        import json
+        import threading
+        from urllib.request import Request, urlopen
+        from moltenprot.server import AnalysisServer
+
+        with AnalysisServer(("127.0.0.1", 0), n_jobs=1, quiet=True) as server:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            url = "http://127.0.0.1:{}/analyse".format(server.server_address[1])
+            try:
+                request = Request(
+                    url + "?filename=Ratio96.csv&exclude=A2",
+                    data=(DEMO_DATA_PATH / "Ratio96.csv").read_bytes(),
+                    method="POST",
+                )
+                with urlopen(request) as response:
+                    self.assertIn("analysis;dur=", response.headers["Server-Timing"])
+                    output = json.loads(response.read())
+                signal = output["datasets"]["Signal"]
+                self.assertEqual(signal["failed"], ["A2"])
+                self.assertIn("Tm_fit", signal["results"]["A1"])
+
+                data = pd.read_csv(DEMO_DATA_PATH / "Ratio96.csv", index_col=0)
+                payload = {
+                    "temperature": list(data.index),
+                    "curves": {"A1": list(data["A1"])},
+                    "options": {"model": "santoro1988"},
+                }
+                request = Request(
+                    url,
+                    data=json.dumps(payload).encode(),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                with urlopen(request) as response:
+                    output = json.loads(response.read())
+                self.assertIn("A1", output["datasets"]["Signal"]["results"])
+            finally:
+                server.shutdown()
+
+    def test_server_no_fit(self):
+        "Analysis server: a plate where no sample is fit returns an empty result"
+        import json
+        import threading
+        from urllib.request import Request, urlopen
+        from moltenprot.server import AnalysisServer
+
+        with AnalysisServer(("127.0.0.1", 0), n_jobs=1, quiet=True) as server:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            url = "http://127.0.0.1:{}/analyse".format(server.server_address[1])
+            try:
+                rng = np.random.default_rng(8)
+                temperature = list(np.arange(25.0, 95.0, 0.5))
+                payload = {
+                    "temperature": temperature,
+                    "curves": {
+                        well: list(1 + rng.normal(scale=0.002, size=len(temperature)))
+                        for well in ("A1", "A2")
+                    },
+                    "options": {"model": "santoro1988", "prescreen": 10},
+                }
+                request = Request(
+                    url,
+                    data=json.dumps(payload).encode(),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                with urlopen(request) as response:
+                    output = json.loads(response.read())
+                signal = output["datasets"]["Signal"]
+                self.assertEqual(signal["results"], {})
+                self.assertEqual(signal["failed"], ["A1", "A2"])
+            finally:
+                server.shutdown()
+
+    def test_server_options(self):
+        "Analysis server: list options are parsed, invalid values give a client error"
+        import json
+        import threading
+        from urllib.error import HTTPError
+        from urllib.request import Request, urlopen
+        from moltenprot.server import AnalysisServer, parse_options
+
+        _, options = parse_options({"compare_models": "santoro1988d, irrev"})
+        self.assertEqual(options["compare_models"], ["santoro1988d", "irrev"])
+        _, options = parse_options({"compare_models": ["irrev"]})
+        self.assertEqual(options["compare_models"], ["irrev"])
+
+        with AnalysisServer(("127.0.0.1", 0), n_jobs=1, quiet=True) as server:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            url = "http://127.0.0.1:{}/analyse".format(server.server_address[1])
+            try:
+                for options in (
+                    {"compare_models": ["irrev", "nonsense"]},
+                    {"compare_models": 1},
+                    {"prescreen": [10]},
+                    {"model": ["irrev"]},
+                ):
+                    payload = {
+                        "temperature": [25.0, 26.0],
+                        "curves": {"A1": [1.0, 1.0]},
+                        "options": options,
+                    }
+                    request = Request(
+                        url,
+                        data=json.dumps(payload).encode(),
+                        headers={"Content-Type": "application/json"},
+                        method="POST",
+                    )
+                    with self.assertRaises(HTTPError) as error:
+                        urlopen(request)
+                    self.assertEqual(error.exception.code, 400)
+            finally:
+                server.shutdown()
+
+    def test_server_timeout(self):
+        "Analysis server: a timed out request keeps its slot until the worker is done"
+        import threading
+        from urllib.error import HTTPError
+        from urllib.request import Request, urlopen
+        from moltenprot.server import AnalysisServer
+
+        with AnalysisServer(
+            ("127.0.0.1", 0), n_jobs=1, max_pending=1, timeout=0.01, quiet=True
+        ) as server:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            url = "http://127.0.0.1:{}/analyse".format(server.server_address[1])
+            try:
+                for status in (504, 503):
+                    request = Request(
+                        url + "?filename=Ratio96.csv",
+                        data=(DEMO_DATA_PATH / "Ratio96.csv").read_bytes(),
+                        method="POST",
+                    )
+                    with self.assertRaises(HTTPError) as error:
+                        urlopen(request)
+                    self.assertEqual(error.exception.code, status)
+                # the slot is free once the analysis is finished
+                self.assertTrue(server.slots.acquire(timeout=120))
+                server.slots.release()
+            finally:
+                server.shutdown()
+
+
+class TestStartup(TestCase):
+    "Checks that importing core stays fast and that headless runs do not load pyplot"
+
+    def test_lazy_imports(self):
+        "plotting, fitting and parallelization modules are not loaded by importing core"
+        heavy = (
+            "matplotlib.pyplot",
+            "scipy.optimize",
+            "scipy.signal",
+            "scipy.interpolate",
+            "scipy.integrate",
+            "joblib",
+            "pypdf",
+        )
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, moltenprot.core; print(' '.join(sys.modules))",
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        loaded = result.stdout.strip().splitlines()[-1].split()
+        for module in heavy:
+            self.assertNotIn(module, loaded)
+
+    def test_headless_output(self):
+        "reports and images are rendered without pyplot"
+        with TemporaryDirectory() as outfolder:
+            code = (
+                "import sys; from moltenprot import core; "
+                "mp = core.parse_plain_csv(sys.argv[1]); "
+                "mp.SetAnalysisOptions(shrink=3.0); mp.PrepareAndAnalyseAll(); "
+                "mp.WriteOutputAll(outfolder=sys.argv[2], report_format='pdf', "
+                "genpics=True, heatmaps=['Tm_fit'], session=False); "
+                "print('matplotlib.pyplot' in sys.modules)"
+            )
+            result = subprocess.run(
+                [
+                    sys.executable,
+                    "-c",
+                    code,
+                    str(DEMO_DATA_PATH / "Ratio96.csv"),
+                    outfolder,
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            self.assertEqual(result.stdout.strip().splitlines()[-1], "False")
+            self.assertTrue((Path(outfolder) / "Signal_report.pdf").exists())
+
+    def test_serial_without_joblib(self):
+        "serial analysis and output work if joblib is not installed"
+        with TemporaryDirectory() as outfolder:
+            code = (
+                "import sys; sys.modules['joblib'] = None; "
+                "from moltenprot import core; "
+                "mp = core.parse_plain_csv(sys.argv[1]); "
+                "mp.SetAnalysisOptions(shrink=3.0); mp.PrepareAndAnalyseAll(n_jobs=2); "
+                "mp.WriteOutputAll(outfolder=sys.argv[2], n_jobs=2, genpics=True, "
+                "session=False); print(core.parallelization)"
+            )
+            result = subprocess.run(
+                [
+                    sys.executable,
+                    "-c",
+                    code,
+                    str(DEMO_DATA_PATH / "Ratio96.csv"),
+                    outfolder,
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            self.assertEqual(result.stdout.strip().splitlines()[-1], "False")
+            self.assertTrue(any(Path(outfolder).rglob("*.png")))
+
+
+class TestBenchmark(TestCase):
+    "Runs a small benchmark case"
+
+    def test_bench(self):
+        "benchmark results are written as JSON and can be compared"
+        from moltenprot import bench
+
+        with TemporaryDirectory() as outfolder:
+            output = str(Path(outfolder) / "bench.json")
+            args = [
+                "--wells",
+                "48",
+                "--models",
+                "santoro1988",
+                "--stages",
+                "read",
+                "prepare",
+                "process",
+                "json_write",
+                "json_read",
+            ]
+            bench.main(args + ["-o", output])
+            with open(output) as output_file:
+                data = json.load(output_file)
+            stages = [i["stage"] for i in data["results"]]
+            self.assertEqual(
+                stages, ["read", "prepare", "process", "json_write", "json_read"]
+            )
+            self.assertTrue(all(i["peak_memory_mb"] > 0 for i in data["results"]))
+            comparison = bench.compare_results(data, data)
+            self.assertEqual(len(comparison), 5)
+            self.assertFalse(comparison["regression"].any())
+
+
+class SyntheticPrototype(TestCase):
+    "Provides shared methods for tests on synthetic data"
+
+    def _analyse(self, data, n_jobs=1, lead=None, **options):
+        """
+        Analyses copies of synthetic data (a DataFrame or a dict readout: DataFrame)
+        with the options of SetAnalysisOptions (by default with the santoro1988 model)
+        """
+        if isinstance(data, pd.DataFrame):
+            data = {"Signal": data}
+        mp = core.MoltenProtFitMultiple(
+            denaturant="C",
+            layout=pd.DataFrame(index=core.alphanumeric_index, columns=["Condition"]),
+        )
+        for readout, readout_data in data.items():
+            mp.AddDataset(readout_data.copy(), readout)
+        options.setdefault("model", "santoro1988")
+        mp.SetAnalysisOptions(**options)
+        mp.PrepareAndAnalyseAll(n_jobs=n_jobs, lead=lead)
+        return mp
+
+
+class TestSynthetic(SyntheticPrototype):
+    "Synthetic data with known parameters"
+
+    def test_parameter_recovery(self):
+        "fitted Tm and dHm are close to the ground truth"
+        from moltenprot import synthetic
+
+        data, truth = synthetic.synthetic_plate(
+            "santoro1988", n_wells=96, noise=0.002, seed=1
+        )
+        results = self._analyse(data).datasets["Signal"].plate_results
+        self.assertEqual(len(results), 96)
+        Tm_error = (results["Tm_fit"] - truth.loc[results.index, "Tm"]).abs()
+        self.assertLess(Tm_error.median(), 0.2)
+        dHm_error = (results["dHm_fit"] / truth.loc[results.index, "dHm"] - 1).abs()
+        self.assertLess(dHm_error.median(), 0.1)
+
+    def test_add_dataset_copy(self):
+        "AddDataset leaves the DataFrame of the caller untouched"
+        from moltenprot import synthetic
+
+        data, _ = synthetic.synthetic_plate("santoro1988", n_wells=4, seed=6)
+        original = data.copy()
+        mp = core.MoltenProtFitMultiple(denaturant="C")
+        mp.AddDataset(data, "Signal")
+        pd.testing.assert_frame_equal(data, original)
+        self.assertTrue(
+            (mp.datasets["Signal"].plate.index == original.index + 273.15).all()
+        )
+
+    def test_file_formats(self):
+        "synthetic plain CSV, spectrum CSV and XLSX files are read by the parsers"
+        from moltenprot import synthetic
+
+        with TemporaryDirectory() as folder:
+            folder = Path(folder)
+            data, _ = synthetic.synthetic_plate(
+                n_wells=384, spike_rate=0.01, drift=0.1, seed=2
+            )
+            synthetic.write_plain_csv(data, folder / "plate.csv")
+            synthetic.write_layout(data, folder / "layout.csv")
+            mp = core.parse_plain_csv(
+                folder / "plate.csv", layout=folder / "layout.csv"
+            )
+            self.assertEqual(mp.datasets["Signal"].plate_raw.shape[1], 384)
+
+            spectrum, _ = synthetic.synthetic_spectrum(seed=3)
+            synthetic.write_spectrum_csv(spectrum, folder / "spectrum.csv")
+            mp = core.parse_spectrum_csv(folder / "spectrum.csv")
+            self.assertEqual(mp.datasets["Signal"].plate_raw.shape[1], 50)
+
+            readouts = {
+                name: synthetic.synthetic_plate(model, n_wells=48, seed=4)[0]
+                for name, model in (
+                    ("Ratio", "santoro1988"),
+                    ("330nm", "santoro1988"),
+                    ("350nm", "santoro1988"),
+                    ("Scattering", "irrev"),
+                )
+            }
+            synthetic.write_prom_xlsx(readouts, folder / "plate.xlsx", scan_rate=1.5)
+            mp = core.parse_prom_xlsx(folder / "plate.xlsx")
+            for readout_name in EXPECTED_READOUTS:
+                self.assertTrue(readout_name in mp.datasets)
+            self.assertAlmostEqual(mp.scan_rate, 1.5, places=3)
+
+
+class TestKernels(TestCase):
+    "Model functions used for fitting"
+
+    def test_linear_basis(self):
+        "the linear basis of the models reproduces the model function"
+        from moltenprot import synthetic
+
+        for model_name in (
+            "santoro1988",
+            "santoro1988d",
+            "santoro1988i",
+            "santoro1988di",
+            "irrev",
+        ):
+            model = core.avail_models[model_name](scan_rate=1.0)
+            n_linear = len(model.linear_params)
+            data, _ = synthetic.synthetic_plate(model_name, n_wells=48, seed=5)
+            T = np.float64(data.index.values) + 273.15
+            p = np.array(model.param_init(data.iloc[:, 0].set_axis(T)), dtype=float)
+            p[:n_linear] = [0.01, 0.5, -0.02, 2.0, 0.3][:n_linear]
+            np.testing.assert_allclose(
+                model.linear_basis(T, *p[n_linear:]) @ p[:n_linear],
+                model.fun(T, *p),
+                rtol=1e-6,
+            )
+
+    def test_kernels(self):
+        "optimised model kernels agree with the model functions and do not overflow"
+        rng = np.random.default_rng(7)
+        T = np.linspace(298.15, 368.15, 141)
+        parameters = {
+            "santoro1988": lambda: (
+                150000 * rng.uniform(0.5, 2),
+                rng.uniform(320, 350),
+            ),
+            "santoro1988d": lambda: (rng.uniform(305, 320), rng.uniform(325, 350)),
+            "santoro1988i": lambda: (
+                150000 * rng.uniform(0.5, 2),
+                rng.uniform(315, 335),
+                200000,
+                rng.uniform(0, 20),
+            ),
+            "santoro1988di": lambda: (
+                rng.uniform(305, 315),
+                rng.uniform(320, 330),
+                rng.uniform(330, 340),
+                rng.uniform(345, 355),
+            ),
+        }
+        for model_name, nonlinear in parameters.items():
+            model = core.avail_models[model_name]()
+            for _ in range(20):
+                baselines = rng.normal(size=len(model.linear_params))
+                p = (*baselines, *nonlinear())
+                np.testing.assert_allclose(
+                    model.kernel(T, *p), model.fun(T, *p), rtol=1e-7, atol=1e-9
+                )
+        # the exponent overflows in the model function, but not in the kernel
+        model = core.avail_models["santoro1988"]()
+        with np.errstate(over="ignore", invalid="ignore"):
+            self.assertFalse(np.isfinite(model.fun(T, 0, 1, 0, 2, 2e7, 299)).all())
+        signal = model.kernel(T, 0, 1, 0, 2, 2e7, 299)
+        self.assertTrue(np.isfinite(signal).all())
+        self.assertAlmostEqual(signal[-1], 2)
+
+    def test_jit_kernels(self):
+        "compiled model functions and Jacobians agree with the model functions"
+        if not core.jit_compilation:
+            self.skipTest("numba is not installed")
+        from moltenprot import jit
+
+        T = np.linspace(298.15, 368.15, 141)
+        nonlinear = {
+            "santoro1988": (150000, 330),
+            "santoro1988d": (315, 335),
+            "santoro1988i": (150000, 325, 200000, 10),
+            "santoro1988di": (310, 325, 335, 350),
+            "irrev": (340, 200000),
+        }
+        for model_name, params in nonlinear.items():
+            model = core.avail_models[model_name](scan_rate=1.0)
+            p = np.array(
+                [0.01, 0.5, -0.02, 2.0, 0.3][: len(model.linear_params)] + list(params),
+                dtype=float,
+            )
+            kernel, jacobian = jit.get_kernels(model)
+            np.testing.assert_allclose(
+                kernel(T, *p), model.fun(T, *p), rtol=1e-6, atol=1e-9
+            )
+            if jacobian is None:
+                continue
+            numeric = np.empty((len(T), len(p)))
+            for j in range(len(p)):
+                step = 1e-6 * max(1.0, abs(p[j]))
+                shifted = p.copy()
+                shifted[j] += step
+                numeric[:, j] = (model.fun(T, *shifted) - model.fun(T, *p)) / step
+            np.testing.assert_allclose(jacobian(T, *p), numeric, rtol=1e-3, atol=1e-6)
+
+
+class TestFitModes(SyntheticPrototype):
+    "Alternative fitting modes give the same results as the default fit"
+
+    def test_varpro(self):
+        "variable projection fits give the same Tm as the full fit"
+        from moltenprot import synthetic
+
+        data, truth = synthetic.synthetic_plate(
+            "santoro1988", n_wells=48, noise=0.002, seed=6
+        )
+        results = {
+            varpro: self._analyse(data, varpro=varpro).datasets["Signal"].plate_results
+            for varpro in (False, True)
+        }
+        Tm_error = (
+            results[True]["Tm_fit"] - truth.loc[results[True].index, "Tm"]
+        ).abs()
+        self.assertLess(Tm_error.median(), 0.2)
+        Tm_difference = (results[True]["Tm_fit"] - results[False]["Tm_fit"]).abs()
+        self.assertLess(Tm_difference.median(), 0.05)
+
+    def test_coarse_fit(self):
+        "coarse-to-fine fits give the same parameters as the direct fits"
+        from moltenprot import synthetic
+
+        data, _ = synthetic.synthetic_plate(
+            "santoro1988", n_wells=48, t_step=0.1, noise=0.002, seed=11
+        )
+        results = {
+            coarse: self._analyse(data, coarse=coarse).datasets["Signal"].plate_results
+            for coarse in (0, 1)
+        }
+        self.assertEqual(len(results[1]), 48)
+        Tm_difference = (results[1]["Tm_fit"] - results[0]["Tm_fit"]).abs()
+        self.assertLess(Tm_difference.max(), 0.01)
+        dHm_difference = (results[1]["dHm_fit"] / results[0]["dHm_fit"] - 1).abs()
+        self.assertLess(dHm_difference.max(), 0.001)
+
+
+class TestStartingValues(SyntheticPrototype):
+    "Starting values of the fits from the derivative peaks and from other readouts"
+
+    def test_peak_init(self):
+        "starting values from the derivative peaks are close to the ground truth"
+        from moltenprot import synthetic
+
+        data, truth = synthetic.synthetic_plate(
+            "santoro1988", n_wells=48, noise=0.002, seed=10
+        )
+        results = self._analyse(data, peak_init=True).datasets["Signal"].plate_results
+        self.assertEqual(len(results), 48)
+        Tm_error = (results["Tm_init"] - truth.loc[results.index, "Tm"]).abs()
+        self.assertLess(Tm_error.median(), 1)
+        dHm_ratio = results["dHm_init"] / truth.loc[results.index, "dHm"]
+        self.assertTrue(0.5 < dHm_ratio.median() < 2)
+        Tm_error = (results["Tm_fit"] - truth.loc[results.index, "Tm"]).abs()
+        self.assertLess(Tm_error.median(), 0.2)
+        # two peaks give the two transitions of a three-state model
+        model = core.avail_models["santoro1988i"]()
+        p0 = model.param_init_peaks(
+            model.param_init(data.iloc[:, 0]), [(320, 8, 1), (335, 6, 1)]
+        )
+        self.assertEqual((p0[6], p0[8]), (320, 15))
+
+    def test_warm_start(self):
+        "the fits of a lead readout are the starting values of another readout of the same samples"
+        from moltenprot import synthetic
+
+        data, _ = synthetic.synthetic_plate(
+            "santoro1988", n_wells=48, noise=0.002, seed=12
+        )
+        nfev = {}
+        results = {}
+        for lead in (None, "Lead"):
+            # same transitions, different baselines
+            mp = self._analyse({"Lead": data, "Follower": data * 2 + 1}, lead=lead)
+            stats = mp.GetFitStatistics()
+            nfev[lead] = stats.loc[stats["Dataset"] == "Follower", "nfev"].sum()
+            results[lead] = mp.datasets["Follower"].plate_results
+        self.assertLess(nfev["Lead"], nfev[None])
+        Tm_difference = (results["Lead"]["Tm_fit"] - results[None]["Tm_fit"]).abs()
+        self.assertLess(Tm_difference.median(), 0.01)
+        if core.parallelization:
+            # the wells of the follower are fit as soon as the lead batch is done
+            mp = self._analyse(
+                {"Lead": data, "Follower": data * 2 + 1}, n_jobs=2, lead="Lead"
+            )
+            stats = mp.GetFitStatistics()
+            self.assertEqual(
+                stats.loc[stats["Dataset"] == "Follower", "nfev"].sum(), nfev["Lead"]
+            )
+            actual = mp.datasets["Follower"].plate_results.filter(regex="_fit$")
+            expected = results["Lead"].filter(regex="_fit$")
+            self.assertEqual(list(actual.index), list(expected.index))
+            np.testing.assert_allclose(actual.values, expected.values, rtol=1e-6)
+            self.assertIsNotNone(mp.datasets["Follower"].warm_start)
+        with self.assertRaises(ValueError):
+            mp.PrepareAndAnalyseAll(lead="missing")
+
+
+class TestPrescreen(SyntheticPrototype):
+    "Curves without a transition are not fit"
+
+    def test_prescreen(self):
+        "flat and constant curves are skipped by the pre-screen, the transitions are fit"
+        from moltenprot import synthetic
+
+        data, _ = synthetic.synthetic_plate(
+            "santoro1988", n_wells=48, noise=0.002, seed=8
+        )
+        rng = np.random.default_rng(8)
+        flat = list(data.columns[:3])
+        data[flat] = 1 + rng.normal(scale=0.002, size=(len(data), len(flat)))
+        data[data.columns[3]] = 1.0
+        skipped = set(flat) | {data.columns[3]}
+        mp = self._analyse(data, prescreen=10)
+        stats = mp.GetFitStatistics().set_index("well")
+        self.assertEqual(set(stats.index[stats["status"] == "skipped"]), skipped)
+        self.assertTrue((stats.loc[list(skipped), "nfev"] == 0).all())
+        self.assertFalse(skipped & set(mp.datasets["Signal"].plate_results.index))
+        screen = core.prescreen_curve(
+            data.iloc[:, 10].set_axis(data.index + 273.15),
+            data.iloc[:, 10].diff().bfill().set_axis(data.index + 273.15),
+            fit_length=10,
+            min_snr=10,
+        )
+        self.assertEqual(screen["reason"], "")
+        self.assertGreater(screen["snr"], 10)
+        # a derivative with missing values is replaced, a flat one cannot pass the screen
+        curve = data.iloc[:, 10].set_axis(data.index + 273.15)
+        for derivative, reason in ((np.nan, ""), (0.0, "derivative is undefined")):
+            screen = core.prescreen_curve(
+                curve,
+                pd.Series(derivative, index=curve.index),
+                fit_length=10,
+                min_snr=10,
+            )
+            self.assertEqual(screen["reason"], reason)
+
+    def test_prescreen_all_skipped(self):
+        "a plate without transitions is reported as not fit, the output is still written"
+        from moltenprot import synthetic
+
+        data, _ = synthetic.synthetic_plate("santoro1988", n_wells=8, seed=8)
+        rng = np.random.default_rng(8)
+        data[:] = 1 + rng.normal(scale=0.002, size=data.shape)
+        mp = self._analyse(data, prescreen=10)
+        self.assertFalse(mp.datasets["Signal"].analysisHasBeenDone())
+        self.assertTrue((mp.GetFitStatistics()["status"] == "skipped").all())
+        self.assertIn("No samples were fit", set(mp.GetMessages()["text"]))
+        with TemporaryDirectory() as outfolder:
+            mp.WriteOutputAll(outfolder=outfolder, report_format="html")
+            self.assertTrue((Path(outfolder) / "report.html").exists())
+
+
+class TestFitBudget(SyntheticPrototype):
+    "Fits are stopped when they run out of their budget"
+
+    def test_fit_budget(self):
+        "fits that run out of evaluations get a distinct status and are not in the results"
+        from moltenprot import synthetic
+
+        data, _ = synthetic.synthetic_plate(
+            "santoro1988", n_wells=48, noise=0.002, seed=9
+        )
+        stats = {}
+        for max_nfev in (0, None):
+            if max_nfev is None:
+                # half of the samples need more evaluations than this
+                max_nfev = int(stats[0]["nfev"].median())
+            mp = self._analyse(data, max_nfev=max_nfev)
+            stats[max_nfev] = mp.GetFitStatistics().set_index("well")
+        limited = stats[max_nfev]
+        stopped = limited.index[limited["status"] == "nfev_limit"]
+        self.assertTrue(len(stopped) > 0)
+        self.assertTrue((limited.loc[stopped, "nfev"] == max_nfev).all())
+        self.assertTrue((stats[0].loc[stopped, "nfev"] > max_nfev).all())
+        dataset = mp.datasets["Signal"]
+        self.assertEqual(set(dataset.over_budget), set(stopped))
+        self.assertFalse(set(stopped) & set(dataset.plate_results.index))
+
+    def test_fit_budget_all_stopped(self):
+        "a dataset where every fit runs out of evaluations is reported, not crashed"
+        from moltenprot import synthetic
+
+        data, _ = synthetic.synthetic_plate("santoro1988", n_wells=8, seed=9)
+        mp = self._analyse(data, max_nfev=2)
+        dataset = mp.datasets["Signal"]
+        self.assertFalse(dataset.analysisHasBeenDone())
+        self.assertEqual(set(dataset.over_budget), set(data.columns))
+        self.assertTrue((mp.GetFitStatistics()["status"] == "nfev_limit").all())
+        with TemporaryDirectory() as outfolder:
+            mp.WriteOutputAll(outfolder=outfolder, report_format="xlsx")
+
+
+class TestWellBatches(SyntheticPrototype):
+    "Fits of batches of wells are combined into the results of the dataset"
+
+    def test_merge_wells(self):
+        "results of subsets of wells are merged and sorted as in a single fit"
+        from moltenprot import synthetic
+
+        data, _ = synthetic.synthetic_plate(
+            "santoro1988", n_wells=12, noise=0.002, seed=14
+        )
+        dataset = self._analyse(data).datasets["Signal"]
+        expected = dataset.plate_results
+        parts = [
+            dataset._subset(wells) for wells in (data.columns[:6], data.columns[6:])
+        ]
+        for part in parts:
+            part.ProcessData()
+        dataset._merge_wells(parts)
+        self.assertEqual(list(dataset.plate_results.index), list(expected.index))
+        self.assertEqual(dataset.plate_results.index.name, "ID")
+        self.assertEqual(dataset.plate_results_stdev.index.name, "ID")
+
+
+class TestModelComparison(SyntheticPrototype):
+    "Several models fit to the same samples"
+
+    def test_compare_models(self):
+        "information criteria of several models fit in one pass select the model of the data"
+        from moltenprot import synthetic
+
+        data, _ = synthetic.synthetic_plate(
+            "santoro1988i", n_wells=24, noise=0.002, seed=13
+        )
+        results = {}
+        for n_jobs in (1, 2) if core.parallelization else (1,):
+            mp = self._analyse(data, n_jobs=n_jobs, compare_models=["santoro1988i"])
+            stats = mp.GetFitStatistics()
+            self.assertEqual(set(stats["model"]), {"santoro1988", "santoro1988i"})
+            # the baselines are estimated once for both models
+            self.assertEqual(list(mp.GetStageTimes()["stage"]).count("baselines"), 1)
+            output = mp.datasets["Signal"].plate_results
+            # the fit parameters are those of the main model
+            self.assertIn("Tm_fit", output.columns)
+            self.assertNotIn("T1_fit", output.columns)
+            self.assertGreater((output["best_BIC"] == "santoro1988i").mean(), 0.8)
+            # the sorting measure stays the last column
+            self.assertEqual(output.columns[-1], "dG_std")
+            self.assertTrue(output["dG_std"].is_monotonic_decreasing)
+            self.assertEqual(output.index.name, "ID")
+            results[n_jobs] = output
+        if 2 in results:
+            np.testing.assert_allclose(
+                results[2].loc[results[1].index, "AIC_santoro1988i"],
+                results[1]["AIC_santoro1988i"],
+                rtol=1e-6,
+            )
+
+    def test_exact_fit(self):
+        "exact fits have finite information criteria, the model with less parameters is better"
+        from moltenprot import synthetic
+
+        data, _ = synthetic.synthetic_plate("santoro1988", n_wells=4, seed=13)
+        dataset = self._analyse(data).datasets["Signal"]
+        wells = list(dataset.plate_results.index)
+        dataset.plate_fit[wells] = dataset.plate[wells]
+        aic, bic = dataset._information_criteria()
+        self.assertTrue(np.isfinite(aic).all() and np.isfinite(bic).all())
+        dataset.model = "santoro1988i"
+        aic_rich, _ = dataset._information_criteria()
+        self.assertTrue((aic < aic_rich).all())
+
+    def test_compare_serial(self):
+        "without parallelization the models are compared in the main process"
+        from concurrent import futures
+        from unittest import mock
+        from moltenprot import synthetic
+
+        data, _ = synthetic.synthetic_plate("santoro1988", n_wells=4, seed=13)
+        with mock.patch.object(core, "parallelization", False), mock.patch.object(
+            futures, "ProcessPoolExecutor", side_effect=AssertionError
+        ):
+            mp = self._analyse(data, n_jobs=2, compare_models=["santoro1988i"])
+        self.assertIn("best_BIC", mp.datasets["Signal"].plate_results.columns)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,308 @@
+"Watch a folder and analyse new instrument exports as they appear (moltenprot watch)"
+# Copyright 2018-2021,2025 Vadim Kotov, Thomas C. Marlovits
+#
+#     This file is part of MoltenProt.
+#
+#     MoltenProt is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     MoltenProt is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with MoltenProt.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import sys
+import json
+import time
+import signal
+
+# a persistent pool of workers that keep all modules imported
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from moltenprot import core
+from moltenprot.__main__ import (
+    CLIparser,
+    UseHeadlessBackend,
+    _batch_task,
+    _claim_result_folder,
+    _result_folder,
+)
+
+# file types picked up from the watched folder
+WATCH_EXTENSIONS = (".xlsx", ".csv")
+
+
+def WatchParser():
+    """
+    Creates the argument parser for the watch mode: all CLI options plus watch-specific ones
+
+    Returns
+    -------
+    parser
+        arparse.ArgumentParser
+    """
+    parser = CLIparser()
+    parser.prog = "moltenprot watch"
+    parser.description = "Analyse instrument exports as they appear in a folder. Input files are taken from the watched folder, all other options are the same as for the command line."
+    watch_grp = parser.add_argument_group("Watch mode")
+    watch_grp.add_argument("folder", type=str, help="Folder to watch for new files")
+    watch_grp.add_argument(
+        "--interval",
+        type=float,
+        default=5.0,
+        help="How often the folder is checked, in seconds",
+    )
+    watch_grp.add_argument(
+        "--queue_size",
+        type=int,
+        default=None,
+        help="Maximum amount of files queued for processing (default: two per job); other new files wait in the folder",
+    )
+    watch_grp.add_argument(
+        "--ledger",
+        type=str,
+        default=None,
+        help="File to record the processed files (default: .moltenprot_ledger.jsonl in the output folder or in the watched folder)",
+    )
+    watch_grp.add_argument(
+        "--once",
+        action="store_true",
+        help="Process the files currently in the folder and exit",
+    )
+    return parser
+
+
+class Ledger:
+    """
+    A record of processed files that survives restarts
+
+    Every processed file is appended as a line of JSON with its size, modification time
+    and status, so after a crash only the files that were not finished (or changed since)
+    are processed again. Failed files are not processed again in the same session, but
+    they are retried after a restart.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters
+        ----------
+        path
+            location of the ledger file (created if it does not exist)
+        """
+        self.path = path
+        self.finished = set()
+        # files that failed in this session
+        self.failed = set()
+        if os.path.isfile(path):
+            with open(path, "r") as ledger_file:
+                for line in ledger_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line can be cut if the program was stopped while writing it
+                        continue
+                    if entry["status"] == "done":
+                        self.finished.add((entry["file"], entry["size"], entry["mtime"]))
+
+    def __contains__(self, key):
+        return key in self.finished or key in self.failed
+
+    def add(self, key, status, description, run_time):
+        """
+        Record a processed file
+
+        Parameters
+        ----------
+        key
+            a tuple of file path, size and modification time
+        status, description, run_time
+            the processing results
+        """
+        input_file, size, mtime = key
+        entry = {
+            "file": input_file,
+            "size": size,
+            "mtime": mtime,
+            "status": status,
+            "details": description,
+            "time": round(run_time, 1),
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with open(self.path, "a") as ledger_file:
+            ledger_file.write(json.dumps(entry) + "\n")
+            ledger_file.flush()
+            os.fsync(ledger_file.fileno())
+        if status == "done":
+            self.finished.add(key)
+        else:
+            self.failed.add(key)
+
+
+def scan_folder(folder):
+    """
+    Returns a dict of input files in the folder (subfolders are not checked) with their (size, mtime)
+    """
+    found = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if (
+                entry.is_file()
+                and entry.name.lower().endswith(WATCH_EXTENSIONS)
+                and not entry.name.startswith((".", "~$"))
+            ):
+                stat = entry.stat()
+                found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+    return found
+
+
+def _ignore_interrupt():
+    """
+    Worker initializer: Ctrl+C is handled by the main process, which lets the running files finish
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _record(ledger, key, future):
+    """
+    Add the result of a finished future to the ledger and print it
+
+    Returns
+    -------
+    the status of the file
+    """
+    input_file, status, description, run_time = future.result()
+    ledger.add(key, status, description, run_time)
+    print(
+        "Information: {} {} in {:.1f} s ({})".format(
+            input_file, status, run_time, description
+        )
+    )
+    return status
+
+
+def Watch(args):
+    """
+    Watch a folder and process new files in a pool of args.n_jobs workers
+
+    Parameters
+    ----------
+    args : namespace
+        parsed WatchParser arguments
+
+    Notes
+    -----
+    * a file is processed once its size and modification time did not change between two checks
+    (i.e. the instrument or the file share finished writing it)
+    * at most queue_size files are submitted to the workers, the rest is picked up later
+    * files recorded in the ledger are not processed again, unless they were modified;
+    results of unfinished files (e.g. after a crash) are overwritten; failed files are
+    retried after a restart
+    * a file is not processed if another input file has the same result folder
+    (e.g. X.csv and X.xlsx), the first one is processed
+    * on Ctrl+C the files being processed are finished and recorded, queued files are left
+    for the next start
+    """
+    # absolute paths, so that the ledger does not depend on the working folder
+    folder = os.path.abspath(args.folder)
+    if not os.path.isdir(folder):
+        print("Fatal: {} is not a folder!".format(folder))
+        sys.exit(1)
+    if args.output is not None:
+        os.makedirs(args.output, exist_ok=True)
+    if args.ledger is None:
+        args.ledger = os.path.join(
+            args.output if args.output is not None else folder,
+            ".moltenprot_ledger.jsonl",
+        )
+    ledger = Ledger(args.ledger)
+    n_jobs = max(1, args.n_jobs)
+    queue_size = args.queue_size if args.queue_size is not None else 2 * n_jobs
+    # the results of files that are not in the ledger are incomplete and can be removed
+    args.force = True
+    # result folders of the processed files (result folder -> input file)
+    claimed = {}
+    for input_file, _, _ in sorted(ledger.finished):
+        _claim_result_folder(input_file, args, claimed)
+    conflicts = set()
+
+    print(
+        "Information: watching {} with {} jobs (ledger: {})".format(
+            folder, n_jobs, args.ledger
+        )
+    )
+    previous_scan = {}
+    running = {}  # future -> ledger key
+    with ProcessPoolExecutor(
+        max_workers=n_jobs, initializer=_ignore_interrupt
+    ) as executor:
+        try:
+            while True:
+                current_scan = scan_folder(folder)
+                in_progress = set(key[0] for key in running.values())
+                for input_file, (size, mtime) in sorted(current_scan.items()):
+                    if len(running) >= queue_size:
+                        break
+                    key = (input_file, size, mtime)
+                    # skip finished files, files being processed and files that are still being written
+                    if key in ledger or input_file in in_progress:
+                        continue
+                    if previous_scan.get(input_file) != (size, mtime) and not args.once:
+                        continue
+                    if not _claim_result_folder(input_file, args, claimed):
+                        if input_file not in conflicts:
+                            conflicts.add(input_file)
+                            print(
+                                "Warning: {} was not processed, it has the same result folder as {}".format(
+                                    input_file, claimed[_result_folder(input_file, args)]
+                                )
+                            )
+                        continue
+                    print("Information: queued {}".format(input_file))
+                    running[executor.submit(_batch_task, input_file, args)] = key
+                previous_scan = current_scan
+
+                if args.once and not running:
+                    break
+                # wait for the next check or for a file to be finished
+                done, _ = wait(
+                    list(running), timeout=args.interval, return_when=FIRST_COMPLETED
+                )
+                if not running:
+                    time.sleep(args.interval)
+                for future in done:
+                    key = running.pop(future)
+                    if _record(ledger, key, future) != "done":
+                        # another file with the same result folder can be processed
+                        claimed.pop(_result_folder(key[0], args), None)
+                        conflicts.clear()
+        except KeyboardInterrupt:
+            # queued files are not in the ledger and will be processed after restart
+            running = {
+                future: key for future, key in running.items() if not future.cancel()
+            }
+            print(
+                "Information: stopping after {} running files are finished".format(
+                    len(running)
+                )
+            )
+            for future in wait(list(running)).done:
+                _record(ledger, running[future], future)
+
+
+def main(argv=None):
+    """Entry point for moltenprot watch"""
+    args = WatchParser().parse_args(argv)
+    UseHeadlessBackend()
+    if args.quiet:
+        core.set_quiet()
+    Watch(args)
+
+
+if __name__ == "__main__":
+    main()
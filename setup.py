@@ -47,6 +47,8 @@ setup(
     extras_require={
                     "gui": ["pyside6"],
                     "multiproc": ["joblib>=1.0"],
+                    "jit": ["numba"],
+                    "pdf": ["pypdf"],
                     "dev": ['black', 'pylint', 'pyinstaller']
                     },
     # shortcuts to be installed system-wide